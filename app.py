@@ -1,10 +1,21 @@
-from os import WCONTINUED
+import io
+import uuid
 
 import streamlit as st
-import tempfile
-import os
 
-from backend.soc_report_gen import generate_part_i_ii, generate_part_iii_iv, generate_final_report
+from backend.output.part_ingest import PartValidationError
+from backend.soc_report_gen import (
+    assemble_final_report,
+    generate_part_i_ii,
+    generate_part_iii_iv,
+    ingest_final_report_parts,
+)
+from backend.utils.artifact_store import artifact_store
+from backend.utils.job_queue import CANCELLED, DONE, FAILED, JobLimitError, JobManager
+from backend.utils.output_cache import output_cache
+from backend.utils.tracing import start_trace
+
+POLL_INTERVAL = 1.0
 
 st.set_page_config(page_title="SOC Report Generator", layout="centered")
 st.title("SOC Report Generator")
@@ -16,39 +27,183 @@ This application helps you generate a formatted SOC report (Parts I–V).
 - Generate final PDF and DOCX files.
 """)
 
+
+@st.cache_resource
+def get_job_manager():
+    # One pool shared by every session of this server process
+    return JobManager()
+
+
+@st.cache_resource
+def get_artifact_store():
+    # Generated files of every session; the janitor evicts abandoned ones
+    artifact_store.start_janitor()
+    return artifact_store
+
+
+job_manager = get_job_manager()
+store = get_artifact_store()
+
 # Initialize state
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if 'function_1' not in st.session_state:
     st.session_state.function_1 = ""
 if 'function_2' not in st.session_state:
     st.session_state.function_2 = ""
 if 'function_3' not in st.session_state:
     st.session_state.function_3 = ""
-if 'generate_clicked_1' not in st.session_state:
-    st.session_state.generate_clicked_1 = False
-if 'generate_clicked_2' not in st.session_state:
-    st.session_state.generate_clicked_2 = False
-if 'generate_clicked_3' not in st.session_state:
-    st.session_state.generate_clicked_3 = False
-if 'output_path_1_pdf' not in st.session_state:
-    st.session_state.output_path_1_pdf = ""
-if 'output_path_1_docx' not in st.session_state:
-    st.session_state.output_path_1_docx = ""
-if 'output_path_2' not in st.session_state:
-    st.session_state.output_path_2 = ""
-if 'output_path_3' not in st.session_state:
-    st.session_state.output_path_3 = ""
-
-def handle_generation_1():
-    st.session_state.output_path_1_pdf, st.session_state.output_path_1_docx = generate_part_i_ii(word_file)
-    st.session_state.generate_clicked_1 = True
-
-def handle_generation_2():
-    st.session_state.output_path_2 = generate_part_iii_iv(excel_file)
-    st.session_state.generate_clicked_2 = True
-
-def handle_generation_3():
-    st.session_state.output_path_3 = generate_final_report(files)
-    st.session_state.generate_clicked_3 = True
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = {}
+if 'artifacts' not in st.session_state:
+    st.session_state.artifacts = {}
+
+
+def snapshot_upload(uploaded_file):
+    # Jobs outlive the rerun that submitted them, so hand them a private copy
+    buffer = io.BytesIO(uploaded_file.getvalue())
+    buffer.name = uploaded_file.name
+    return buffer
+
+
+ARTIFACT_EXTENSIONS = (".pdf", ".docx")
+
+
+def outputs_of(output_base):
+    return tuple(output_base + ext for ext in ARTIFACT_EXTENSIONS)
+
+
+def publish_outputs(session_id, artifact_id, generate, cancel_event):
+    # Each job writes into its own workspace, then moves the outputs into the
+    # store, unless its section was reset (and its job cancelled) meanwhile
+    with store.workspace(session_id, artifact_id) as work_dir:
+        paths = generate(work_dir)
+        store.publish(session_id, artifact_id, {"report" + ext: path for ext, path in zip(ARTIFACT_EXTENSIONS, paths)},
+                      cancel_event=cancel_event)
+
+
+def run_part_i_ii(word_file, session_id, artifact_id, progress, cancel_event):
+    with start_trace("part_i_ii") as trace:
+        publish_outputs(session_id, artifact_id,
+                        lambda work_dir: generate_part_i_ii(word_file, progress=progress, output_dir=work_dir),
+                        cancel_event)
+    return trace.summary()
+
+
+def run_part_iii_iv(excel_file, session_id, artifact_id, progress, cancel_event):
+    with start_trace("part_iii_iv") as trace:
+        publish_outputs(session_id, artifact_id,
+                        lambda work_dir: outputs_of(generate_part_iii_iv(excel_file, progress=progress, output_dir=work_dir)),
+                        cancel_event)
+    return trace.summary()
+
+
+def prepare_final_report(files, progress):
+    # Part PDFs ride along with the Word parts and are matched by file name.
+    # Bad uploads fail here, before any merging or PDF conversion.
+    progress("Checking the uploaded parts...")
+    return ingest_final_report_parts([f for f in files if not f.name.lower().endswith(".pdf")],
+                                     [f for f in files if f.name.lower().endswith(".pdf")])
+
+
+def run_final_report(files, session_id, artifact_id, progress, cancel_event):
+    with start_trace("final_report") as trace:
+        parts = prepare_final_report(files, progress)
+        publish_outputs(session_id, artifact_id, lambda work_dir: outputs_of(assemble_final_report(
+            parts, progress=progress, output_dir=work_dir)), cancel_event)
+    return trace.summary()
+
+
+TIMING_COLUMNS = ["stage", "wall_s", "cpu_s", "child_cpu_s", "child_peak_rss_kb", "input_bytes", "output_bytes", "cache"]
+
+
+def show_timings(timings):
+    with st.expander("⏱️ Timing breakdown"):
+        st.dataframe([{c: t.get(c) for c in TIMING_COLUMNS} for t in timings], hide_index=True)
+
+
+def submit_job(section, label, fn, upload):
+    payload = [snapshot_upload(f) for f in upload] if isinstance(upload, list) else snapshot_upload(upload)
+    artifact_id = uuid.uuid4().hex
+    try:
+        job = job_manager.submit(st.session_state.session_id, label, fn, payload,
+                                 st.session_state.session_id, artifact_id, with_progress=True,
+                                 with_cancel_event=True)
+    except JobLimitError as e:
+        st.session_state[f"job_error_{section}"] = str(e)
+        return
+    st.session_state.pop(f"job_error_{section}", None)
+    st.session_state.jobs[section] = job.id
+    st.session_state.artifacts[section] = artifact_id
+
+
+def reset_section(section):
+    st.session_state.pop(f"job_error_{section}", None)
+    job_id = st.session_state.jobs.pop(section, None)
+    if job_id:
+        job_manager.cancel(job_id)
+    artifact_id = st.session_state.artifacts.pop(section, None)
+    if artifact_id:
+        store.remove(st.session_state.session_id, artifact_id)
+
+
+def open_artifact(session_id, artifact_id, name):
+    # Deferred download: the file is read from the store only when clicked.
+    # Streamlit calls this on a worker thread without the session's
+    # st.session_state, so the session id is bound at render time. It is not
+    # streamed: Streamlit keeps the whole file in memory while serving it.
+    def read():
+        handle = store.open(session_id, artifact_id, name)
+        if handle is None:
+            raise FileNotFoundError(f"{name} has expired, please generate it again")
+        with handle:
+            return handle.read()
+    return read
+
+
+@st.fragment(run_every=POLL_INTERVAL)
+def poll_job(section):
+    job = job_manager.get(st.session_state.jobs.get(section))
+    if job is None or not job.active:
+        # Finished: rerun the whole page so the section shows its downloads
+        st.rerun()
+    st.info(f"⏳ {job.label}: {job.progress or job.status}…")
+    st.button("Cancel", key=f"cancel_{section}", on_click=job_manager.cancel, args=(job.id,))
+
+
+def render_section(section, label, button_label, fn, upload, success_message, file_names):
+    job = job_manager.get(st.session_state.jobs.get(section))
+
+    if job is None:
+        st.button(button_label, key=f"generate_{section}", on_click=submit_job,
+                  args=(section, label, fn, upload))
+        if f"job_error_{section}" in st.session_state:
+            st.warning(st.session_state[f"job_error_{section}"])
+    elif job.active:
+        poll_job(section)
+    elif job.status == DONE:
+        artifact_id = st.session_state.artifacts[section]
+        if any(store.path(st.session_state.session_id, artifact_id, "report" + ext) is None
+               for ext in ARTIFACT_EXTENSIONS):
+            st.warning(f"The generated {label} files have expired.")
+            st.button("Generate again", key=f"expired_{section}", on_click=reset_section, args=(section,))
+            return
+        st.success(success_message)
+        for (button_label, file_name), ext in zip(file_names, ARTIFACT_EXTENSIONS):
+            st.download_button(button_label, open_artifact(st.session_state.session_id, artifact_id, "report" + ext),
+                               file_name=file_name)
+        show_timings(job.result)
+    else:
+        if job.status == FAILED and isinstance(job.error, PartValidationError):
+            st.warning("The uploaded parts cannot be assembled:\n"
+                       + "\n".join(f"- {name}: {message}" if name else f"- {message}"
+                                    for name, message in job.error.problems))
+        elif job.status == FAILED:
+            st.error(f"❌ {label} failed: {job.error}")
+        elif job.status == CANCELLED:
+            st.warning(f"{label} was cancelled.")
+        st.button("Try again", key=f"retry_{section}", on_click=reset_section, args=(section,))
+
 
 with st.expander("1. Upload and Generate Part I & II (MA & AR)"):
     st.caption("📄 Only `.docx` Word files are supported for this section.")
@@ -57,23 +212,12 @@ with st.expander("1. Upload and Generate Part I & II (MA & AR)"):
     if word_file:
         # Detect new upload
         if st.session_state.function_1 != word_file.file_id:
-            st.session_state.generate_clicked_1 = False
+            reset_section(1)
             st.session_state.function_1 = word_file.file_id
 
-        # === Show Button Conditionally ===
-        if not st.session_state.generate_clicked_1:
-            st.button("Generate Part I & II", on_click=handle_generation_1())
-        else:
-            st.success("Formatted Part I & II generated!")
-
-            # st.button("Formatted Part I & II generated, click here to download.")
-            st.download_button("Download PDF", open(st.session_state.output_path_1_pdf, "rb"),
-                               file_name="Part_I_II.pdf")
-            st.download_button("Download Word", open(st.session_state.output_path_1_docx, "rb"),
-                               file_name="Part_I_II.docx")
-        # else:
-        #     st.download_button("Download PDF", open(st.session_state.output_path + ".pdf", "rb"), file_name="Part_I_II.pdf")
-        #     st.download_button("Download Word", open(st.session_state.output_path + ".docx", "rb"), file_name="Part_I_II.docx")
+        render_section(1, "Part I & II", "Generate Part I & II", run_part_i_ii, word_file,
+                       "Formatted Part I & II generated!",
+                       [("Download PDF", "Part_I_II.pdf"), ("Download Word", "Part_I_II.docx")])
 
 with (st.expander("2. Upload and Generate Part III & IV (Control + Test)")):
     st.caption("📄 Only `.xlsx` Excel files are supported for this section.")
@@ -81,33 +225,28 @@ with (st.expander("2. Upload and Generate Part III & IV (Control + Test)")):
     if excel_file:
         # Detect new upload
         if st.session_state.function_2 != excel_file.file_id:
-            st.session_state.generate_clicked_2 = False
+            reset_section(2)
             st.session_state.function_2 = excel_file.file_id
 
-        # === Show Button Conditionally ===
-        if not st.session_state.generate_clicked_2:
-            st.button("Generate Part III & IV", on_click = handle_generation_2())
-        else:
-            st.success("Formatted Part III & IV generated!")
-            st.download_button("Download PDF", open(st.session_state.output_path_2 + ".pdf", "rb"), file_name="Part_III_IV.pdf")
-            st.download_button("Download Word", open(st.session_state.output_path_2 + ".docx", "rb"), file_name="Part_III_IV.docx")
+        render_section(2, "Part III & IV", "Generate Part III & IV", run_part_iii_iv, excel_file,
+                       "Formatted Part III & IV generated!",
+                       [("Download PDF", "Part_III_IV.pdf"), ("Download Word", "Part_III_IV.docx")])
 
 with st.expander("3. Generate Final Report"):
-    st.caption("📄 Only `.docx` Word files are supported for this section.")
-    files = st.file_uploader("Upload All Parts (Word)", type=["docx"], accept_multiple_files=True)
-    files_id = []
-    for file in files:
-        files_id.append(file.file_id)
+    st.caption("📄 Upload the Word parts; add each part's PDF with the same file name to skip PDF conversion.")
+    files = st.file_uploader("Upload All Parts (Word, optional PDF)", type=["docx", "pdf"], accept_multiple_files=True)
+    files_id = [file.file_id for file in files]
     if files:
         if st.session_state.function_3 != files_id:
-            st.session_state.generate_clicked_3 = False
+            reset_section(3)
             st.session_state.function_3 = files_id
-        if not st.session_state.generate_clicked_3:
-            st.button("Generate Final Report", on_click = handle_generation_3())
-        else:
-            st.success("Final Report generated!")
-            st.download_button("Download Final PDF", open(st.session_state.output_path_3 + ".pdf", "rb"), file_name="SOC_Final_Report.pdf")
-            st.download_button("Download Final Word", open(st.session_state.output_path_3 + ".docx", "rb"), file_name="SOC_Final_Report.docx")
+
+        render_section(3, "Final Report", "Generate Final Report", run_final_report, files,
+                       "Final Report generated!",
+                       [("Download Final PDF", "SOC_Final_Report.pdf"), ("Download Final Word", "SOC_Final_Report.docx")])
+
+cache_stats = output_cache.stats()
+st.sidebar.caption(f"Output cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
 
 st.markdown("---")
 st.markdown("### 💬 Need Help?")
@@ -0,0 +1,3 @@
+# Bumped whenever a change to the generators alters their output, so cached
+# artifacts produced by an older version are never served.
+GENERATOR_VERSION = "7"
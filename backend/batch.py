@@ -0,0 +1,265 @@
+"""
+Generates SOC reports for many engagements from a manifest, without the UI.
+
+    python -m backend.batch manifest.csv --output-dir out/ --jobs 8
+
+The manifest is a CSV file, or a JSON list of objects, with the columns
+
+    name      Output folder for the engagement (required)
+    ma_ar     MA & AR Word file (.docx), optional
+    controls  Description & testing workbook (.xlsx), optional
+
+Relative paths are resolved against the manifest's directory. Each
+engagement writes Part_I_II, Part_III_IV and SOC_Report (.pdf and .docx) to
+``<output-dir>/<name>/``; the final report needs both parts, so an
+engagement with only one input gets that part alone. Engagements whose outputs already exist are skipped, so an
+interrupted run can simply be restarted.
+"""
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from backend.utils.tool_limits import TOOLS, install_tool_semaphores
+
+logger = logging.getLogger(__name__)
+
+PARTS = ("Part_I_II", "Part_III_IV", "SOC_Report")
+EXTENSIONS = (".pdf", ".docx")
+
+DONE = "done"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+def default_tool_limits(jobs):
+    """
+    Default concurrency caps for the external tools across all batch workers.
+    LibreOffice is memory hungry, so it gets half the workers.
+    """
+    return {"xelatex": jobs, "libreoffice": max(jobs // 2, 1), "pandoc": jobs}
+
+
+def load_manifest(path):
+    """
+    Reads a CSV or JSON manifest.
+
+    Returns:
+        A list of dicts with keys name, ma_ar and controls (absolute paths or None).
+
+    Raises:
+        ValueError: on a missing or duplicate name, an engagement without
+            inputs, or an input file that does not exist.
+    """
+    with open(path, encoding="utf-8-sig") as f:
+        if path.lower().endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    entries, seen = [], set()
+    for line, row in enumerate(rows, start=1):
+        name = (row.get("name") or "").strip()
+        if not name or name in (".", "..") or os.sep in name or (os.altsep and os.altsep in name):
+            raise ValueError(f"Manifest entry {line}: invalid name {name!r}")
+        if name in seen:
+            raise ValueError(f"Manifest entry {line}: duplicate name {name!r}")
+        seen.add(name)
+
+        entry = {"name": name}
+        for key in ("ma_ar", "controls"):
+            value = (row.get(key) or "").strip()
+            entry[key] = os.path.join(base_dir, value) if value else None
+            if entry[key] and not os.path.isfile(entry[key]):
+                raise ValueError(f"Manifest entry {line} ({name}): {key} file not found: {entry[key]}")
+        if not entry["ma_ar"] and not entry["controls"]:
+            raise ValueError(f"Manifest entry {line} ({name}): needs ma_ar and/or controls")
+        entries.append(entry)
+    return entries
+
+
+def expected_outputs(entry, output_dir):
+    """
+    Returns the output paths of ``entry`` as {part: {extension: path}}.
+    """
+    parts = []
+    if entry["ma_ar"]:
+        parts.append("Part_I_II")
+    if entry["controls"]:
+        parts.append("Part_III_IV")
+    if len(parts) == 2:
+        parts.append("SOC_Report")
+    target = os.path.join(output_dir, entry["name"])
+    return {part: {ext: os.path.join(target, part + ext) for ext in EXTENSIONS} for part in parts}
+
+
+def is_complete(entry, output_dir):
+    return all(os.path.exists(p) for paths in expected_outputs(entry, output_dir).values() for p in paths.values())
+
+
+def _publish(sources: dict, targets: dict):
+    # The scratch folder sits next to the targets, so this is an atomic
+    # rename and a file at the target path is always complete
+    for ext, src in sources.items():
+        os.replace(src, targets[ext])
+
+
+def run_report(entry, output_dir):
+    """
+    Generates every missing output of one engagement. Runs in a worker process.
+
+    Returns:
+        A dict with name, status, seconds and error.
+    """
+    from backend.soc_report_gen import generate_final_report, generate_part_i_ii, generate_part_iii_iv
+
+    start = time.perf_counter()
+    outputs = expected_outputs(entry, output_dir)
+    target = os.path.join(output_dir, entry["name"])
+    os.makedirs(target, exist_ok=True)
+    # Generators name their files after the inputs, so concurrent runs of the
+    # same inputs each write into their own scratch folder
+    scratch = tempfile.mkdtemp(prefix=".work-", dir=target)
+
+    def missing(part):
+        return not all(os.path.exists(p) for p in outputs[part].values())
+
+    try:
+        if "Part_I_II" in outputs and missing("Part_I_II"):
+            with open(entry["ma_ar"], "rb") as f:
+                pdf_path, docx_path = generate_part_i_ii(f, output_dir=scratch)
+            _publish({".pdf": pdf_path, ".docx": docx_path}, outputs["Part_I_II"])
+
+        if "Part_III_IV" in outputs and missing("Part_III_IV"):
+            with open(entry["controls"], "rb") as f:
+                output_base = generate_part_iii_iv(f, output_dir=scratch)
+            _publish({ext: output_base + ext for ext in EXTENSIONS}, outputs["Part_III_IV"])
+
+        if "SOC_Report" in outputs and missing("SOC_Report"):
+            # The parts' own PDFs are spliced in, so nothing is re-rendered
+            part_files = [open(outputs[part][ext], "rb") for part in PARTS[:2] if part in outputs for ext in EXTENSIONS]
+            try:
+                output_base = generate_final_report([f for f in part_files if f.name.endswith(".docx")],
+                                                    pdf_files=[f for f in part_files if f.name.endswith(".pdf")],
+                                                    output_dir=scratch)
+            finally:
+                for f in part_files:
+                    f.close()
+            _publish({ext: output_base + ext for ext in EXTENSIONS}, outputs["SOC_Report"])
+    except Exception as e:
+        logger.exception("Report %s failed", entry["name"])
+        return {"name": entry["name"], "status": FAILED, "seconds": time.perf_counter() - start,
+                "error": f"{type(e).__name__}: {e}"}
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {"name": entry["name"], "status": DONE, "seconds": time.perf_counter() - start, "error": None}
+
+
+def _init_worker(semaphores):
+    install_tool_semaphores(semaphores)
+
+
+def run_batch(entries, output_dir, jobs=None, tool_limits=None, on_result=None):
+    """
+    Generates the reports for ``entries`` on a pool of ``jobs`` processes.
+
+    Args:
+        entries: Manifest entries, see ``load_manifest``.
+        output_dir: Root folder for the per-engagement outputs.
+        jobs: Worker processes (default: CPU count).
+        tool_limits: Max concurrent runs per external tool across all
+            workers (default: ``default_tool_limits(jobs)``).
+        on_result: Called with each result dict as it finishes.
+
+    Returns:
+        The list of result dicts, in completion order, including skipped entries.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    limits = default_tool_limits(jobs)
+    limits.update(tool_limits or {})
+
+    results = []
+
+    def report(result):
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    pending = []
+    for entry in entries:
+        if is_complete(entry, output_dir):
+            report({"name": entry["name"], "status": SKIPPED, "seconds": 0.0, "error": None})
+        else:
+            pending.append(entry)
+    if not pending:
+        return results
+
+    ctx = multiprocessing.get_context()
+    semaphores = {tool: ctx.BoundedSemaphore(limits[tool]) for tool in TOOLS}
+    with ProcessPoolExecutor(max_workers=min(jobs, len(pending)), mp_context=ctx,
+                             initializer=_init_worker, initargs=(semaphores,)) as executor:
+        futures = {executor.submit(run_report, entry, output_dir): entry for entry in pending}
+        for future in as_completed(futures):
+            try:
+                report(future.result())
+            except Exception as e:  # the worker process died
+                report({"name": futures[future]["name"], "status": FAILED, "seconds": 0.0,
+                        "error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+def format_summary(results, elapsed):
+    counts = {status: sum(r["status"] == status for r in results) for status in (DONE, SKIPPED, FAILED)}
+    rate = counts[DONE] / elapsed * 60 if elapsed > 0 else 0.0
+    lines = [f"{counts[DONE]} generated, {counts[SKIPPED]} skipped, {counts[FAILED]} failed "
+             f"in {elapsed:.1f}s ({rate:.1f} reports/min)"]
+    lines += [f"  FAILED {r['name']}: {r['error']}" for r in results if r["status"] == FAILED]
+    return "\n".join(lines)
+
+
+def _parse_tool_limit(value):
+    tool, sep, count = value.partition("=")
+    if not sep or tool not in TOOLS or not count.isdigit() or int(count) < 1:
+        raise argparse.ArgumentTypeError(f"expected TOOL=N with TOOL one of {', '.join(TOOLS)}")
+    return tool, int(count)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.batch", description="Generate SOC reports from a manifest.")
+    parser.add_argument("manifest", help="CSV or JSON manifest with name, ma_ar and controls columns")
+    parser.add_argument("--output-dir", default=os.path.join(os.getcwd(), "generated_reports", "batch"))
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--tool-limit", type=_parse_tool_limit, action="append", default=[], metavar="TOOL=N",
+                        help="max concurrent runs of xelatex, libreoffice or pandoc (repeatable)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    try:
+        entries = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    total = len(entries)
+
+    def progress(result):
+        progress.count += 1
+        print(f"[{progress.count}/{total}] {result['status']:7} {result['name']} ({result['seconds']:.1f}s)", flush=True)
+    progress.count = 0
+
+    start = time.perf_counter()
+    results = run_batch(entries, args.output_dir, jobs=args.jobs, tool_limits=dict(args.tool_limit), on_result=progress)
+    print(format_summary(results, time.perf_counter() - start))
+    return 1 if any(r["status"] == FAILED for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+import datetime
+import numbers
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas and openpyxl are imported where used: together they take longer to
+# import than the rest of the backend, and most callers never touch a workbook
+
+# Canonical column order of the Part III & IV control matrix
+CONTROL_COLUMNS = ("control_id", "description", "test_procedure", "result", "exceptions")
+
+# Display headers used in the generated reports
+CONTROL_HEADERS = {
+    "control_id": "控制编号",
+    "description": "控制描述",
+    "test_procedure": "测试程序",
+    "result": "测试结果",
+    "exceptions": "例外事项",
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Accepted workbook headers (lower-cased, stripped) for each canonical column
+COLUMN_ALIASES = {
+    "control_id": ("control id", "control_id", "control no.", "control no", "id", "控制编号", "控制点编号", "编号"),
+    "description": ("description", "control description", "control activity", "控制描述", "控制活动"),
+    "test_procedure": ("test procedure", "test procedures", "testing procedure", "testing procedures", "测试程序"),
+    "result": ("result", "results", "test result", "test results", "测试结果"),
+    "exceptions": ("exception", "exceptions", "exceptions noted", "例外", "例外事项"),
+}
+
+
+def match_control_columns(headers):
+    """
+    Maps workbook headers to canonical control-matrix columns.
+
+    Returns a dict of canonical column -> original header for every column
+    that could be recognised.
+
+    Raises:
+        ValueError: if two headers map to the same column, e.g. "ID" and
+            "Control ID", since it is unclear which one holds the data.
+    """
+    lookup = {alias: canonical for canonical, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    mapping = {}
+    for header in headers:
+        canonical = lookup.get(str(header).strip().lower())
+        if not canonical:
+            continue
+        if canonical in mapping:
+            raise ValueError(f"Columns '{mapping[canonical]}' and '{header}' are both read as {CONTROL_HEADERS[canonical]}; "
+                             "rename or remove one of them")
+        mapping[canonical] = header
+    return mapping
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _is_date(value):
+    return isinstance(value, (datetime.date, datetime.datetime))
+
+
+def _cell_text(value) -> str:
+    """
+    The text a report shows for one typed cell.
+    """
+    if _is_date(value):
+        if isinstance(value, datetime.datetime) and value.time() != datetime.time():
+            return value.strftime("%Y-%m-%d %H:%M")
+        return value.strftime("%Y-%m-%d")
+    if _is_number(value) and float(value).is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _typed(series: "pd.Series") -> "pd.Series":
+    """
+    Types a workbook column: integral numbers as Int64 (Excel stores IDs as
+    floats once a column has blanks), other numbers as Float64, dates as
+    datetime64 and anything else as stripped strings.
+    """
+    import pandas as pd
+
+    def clean(value):
+        if isinstance(value, str):
+            return value.strip() or None
+        return None if pd.isna(value) else value
+
+    values = pd.Series([clean(v) for v in series.tolist()], index=series.index, dtype=object)
+    present = values.dropna()
+    if len(present) and present.map(_is_number).all():
+        numeric = pd.to_numeric(values)
+        return numeric.astype("Int64" if (numeric.dropna() % 1 == 0).all() else "Float64")
+    if len(present) and present.map(_is_date).all():
+        return pd.to_datetime(values)
+    return values.map(lambda v: "" if v is None else _cell_text(v)).astype("string")
+
+
+def normalize_control_matrix(df: "pd.DataFrame") -> "pd.DataFrame":
+    """
+    Returns a DataFrame with exactly the CONTROL_COLUMNS.
+
+    Columns holding only numbers or only dates keep their type (Int64,
+    Float64, datetime64); all others are stripped strings, see
+    ``control_cells_text`` for how reports show them. Columns absent from
+    the workbook are filled with empty strings, and rows with no content at
+    all are dropped.
+    """
+    import pandas as pd
+
+    mapping = match_control_columns(df.columns)
+    if not mapping:
+        raise ValueError(
+            "No control-matrix columns recognised in the workbook. "
+            f"Expected headers such as: {', '.join(a[0] for a in COLUMN_ALIASES.values())}"
+        )
+
+    normalized = pd.DataFrame(index=df.index)
+    non_empty = pd.Series(False, index=df.index)
+    for column in CONTROL_COLUMNS:
+        if column in mapping:
+            normalized[column] = _typed(df[mapping[column]])
+            filled = normalized[column] != "" if pd.api.types.is_string_dtype(normalized[column]) \
+                else normalized[column].notna()
+            non_empty |= filled.fillna(False).astype(bool)
+        else:
+            normalized[column] = pd.Series("", index=df.index, dtype="string")
+
+    return normalized[non_empty].reset_index(drop=True)
+
+
+def control_cells_text(chunk: "pd.DataFrame") -> "pd.DataFrame":
+    """
+    Returns the CONTROL_COLUMNS of a normalized chunk as the strings the
+    reports show: whole numbers without a decimal point, dates as
+    YYYY-MM-DD (with the time when it is not midnight), blanks as "".
+    """
+    import pandas as pd
+
+    text = {}
+    for column in CONTROL_COLUMNS:
+        series = chunk[column]
+        if pd.api.types.is_string_dtype(series):
+            text[column] = series.fillna("")
+        else:
+            text[column] = series.map(_cell_text, na_action="ignore").astype("string").fillna("")
+    return pd.DataFrame(text, index=chunk.index)
+
+
+def _header_names(header_row):
+    return [str(h).strip() if h is not None else f"column_{i}" for i, h in enumerate(header_row)]
+
+
+def iter_control_chunks(excel_source, sheet_name=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams control records from a workbook in normalized DataFrame chunks.
+
+    The workbook is opened read-only and rows are pulled with iter_rows, so
+    at most ``chunk_size`` rows are held in memory at a time.
+
+    Args:
+        excel_source: Path or binary file-like object of the .xlsx workbook.
+        sheet_name: A sheet name, a list of names, or None for every sheet
+            whose first row contains recognised control-matrix headers.
+        chunk_size: Number of workbook rows per yielded chunk.
+
+    Yields:
+        DataFrames with exactly the CONTROL_COLUMNS, see
+        ``normalize_control_matrix``.
+    """
+    import openpyxl
+    import pandas as pd
+
+    workbook = openpyxl.load_workbook(excel_source, read_only=True, data_only=True)
+    try:
+        if sheet_name is None:
+            sheets, explicit = workbook.worksheets, False
+        else:
+            names = [sheet_name] if isinstance(sheet_name, str) else list(sheet_name)
+            missing = [n for n in names if n not in workbook.sheetnames]
+            if missing:
+                raise ValueError(f"Sheet(s) not found in workbook: {', '.join(missing)}")
+            sheets, explicit = [workbook[n] for n in names], True
+
+        matched_any = False
+        for sheet in sheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = _header_names(next(rows, ()))
+            try:
+                matched = match_control_columns(header)
+            except ValueError as e:
+                raise ValueError(f"Sheet '{sheet.title}': {e}") from None
+            if not matched:
+                if explicit:
+                    raise ValueError(f"No control-matrix columns recognised on sheet '{sheet.title}'")
+                continue
+            matched_any = True
+
+            width = len(header)
+            buffer = []
+            for row in rows:
+                # read-only sheets may return short rows when trailing cells are empty
+                buffer.append(row[:width] if len(row) >= width else row + (None,) * (width - len(row)))
+                if len(buffer) >= chunk_size:
+                    yield normalize_control_matrix(pd.DataFrame.from_records(buffer, columns=header))
+                    buffer = []
+            if buffer:
+                yield normalize_control_matrix(pd.DataFrame.from_records(buffer, columns=header))
+
+        if not matched_any:
+            raise ValueError("No sheet with recognised control-matrix columns found in the workbook")
+    finally:
+        workbook.close()
@@ -1,34 +1,133 @@
 from docx import Document
+from lxml import etree
 import re
+import zipfile
 
-def extract_ma_ar_sections(doc: Document):
+# One pass over each paragraph finds every section marker
+SECTION_MARKERS = re.compile(r"(?P<ma>管理层认定|第一部分)|(?P<ar>审计师报告|第二部分)")
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_W = "{%s}" % W_NS
+_BODY = _W + "body"
+_P = _W + "p"
+# Body-level elements worth handling; other siblings are dropped as parsing moves on
+_BLOCK_TAGS = (_P, _W + "tbl", _W + "sdt", _W + "sectPr")
+_BR_TYPE = _W + "type"
+
+# Run content that python-docx's Paragraph.text renders, in document order
+_RUN_CONTENT = etree.XPath("w:r/* | w:hyperlink/w:r/*", namespaces={"w": W_NS})
+_RUN_TEXT = {
+    _W + "tab": "\t",
+    _W + "ptab": "\t",
+    _W + "cr": "\n",
+    _W + "noBreakHyphen": "-",
+}
+
+
+def _split_sections(paragraphs):
     """
-        Split paragraphs into MA and AR sections based on keywords:
-        - Start collecting MA section after detecting '管理层认定' or '第一部分'
-        - Start collecting AR section after detecting '审计师报告' or '第二部分'
+    Assigns (offset, text) pairs to the MA and AR sections.
+
+    Returns the MA texts, the AR texts and the paragraph offsets of each.
     """
-    paragraphs = [p.text.strip() for p in doc.paragraphs if p.text.strip()]
-    ma_text = []
-    ar_text = []
+    ma_text, ar_text = [], []
+    ma_offsets, ar_offsets = [], []
     section = None
 
-    for para in paragraphs:
+    for offset, para in paragraphs:
+        markers = {m.lastgroup for m in SECTION_MARKERS.finditer(para)}
+
         # Detect the beginning of MA section
-        if re.search(r"(管理层认定|第一部分)", para) and not ma_text:
+        if "ma" in markers and not ma_text:
             section = "ma"
             ma_text.append(para)
+            ma_offsets.append(offset)
             continue
 
         # Detect the beginning of AR section
-        elif re.search(r"(审计师报告|第二部分)", para) and not ar_text:
+        elif "ar" in markers and not ar_text:
             section = "ar"
             ar_text.append(para)
+            ar_offsets.append(offset)
             continue
 
         # Append to the correct section
         if section == "ma" and not ar_text:
             ma_text.append(para)
+            ma_offsets.append(offset)
         elif section == "ar":
             ar_text.append(para)
+            ar_offsets.append(offset)
+
+    return ma_text, ar_text, (ma_offsets, ar_offsets)
 
-    return ma_text, ar_text
\ No newline at end of file
+
+def extract_ma_ar_sections(doc: Document):
+    """
+        Split paragraphs into MA and AR sections based on keywords:
+        - Start collecting MA section after detecting '管理层认定' or '第一部分'
+        - Start collecting AR section after detecting '审计师报告' or '第二部分'
+    """
+    paragraphs = ((i, p.text.strip()) for i, p in enumerate(doc.paragraphs))
+    ma_text, ar_text, _ = _split_sections((i, text) for i, text in paragraphs if text)
+    return ma_text, ar_text
+
+
+def _paragraph_text(p):
+    parts = []
+    for child in _RUN_CONTENT(p):
+        tag = child.tag
+        if tag == _W + "t":
+            parts.append(child.text or "")
+        elif tag == _W + "br":
+            # Only text-wrapping breaks produce a newline, as in python-docx
+            if child.get(_BR_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        else:
+            parts.append(_RUN_TEXT.get(tag, ""))
+    return "".join(parts)
+
+
+def iter_body_paragraphs(source):
+    """
+    Streams the text of every top-level body paragraph of a .docx file.
+
+    ``word/document.xml`` is read with iterparse and each body element is
+    discarded once handled, so memory stays bounded by the largest single
+    paragraph or table rather than the document.
+
+    Args:
+        source: Path or binary file-like object of the .docx file.
+
+    Yields:
+        (offset, text) pairs, where offset is the paragraph's index in
+        ``Document.paragraphs``.
+    """
+    with zipfile.ZipFile(source) as archive, archive.open("word/document.xml") as xml:
+        offset = 0
+        for _, elem in etree.iterparse(xml, events=("end",), tag=_BLOCK_TAGS):
+            parent = elem.getparent()
+            if parent is None or parent.tag != _BODY:
+                continue
+            if elem.tag == _P:
+                yield offset, _paragraph_text(elem)
+                offset += 1
+            elem.clear()
+            while elem.getprevious() is not None:
+                del parent[0]
+
+
+def extract_ma_ar_sections_xml(source):
+    """
+    Same split as ``extract_ma_ar_sections``, read straight from the .docx
+    XML without building python-docx objects.
+
+    Args:
+        source: Path or binary file-like object of the .docx file.
+
+    Returns:
+        (ma_text, ar_text, (ma_offsets, ar_offsets)), where the offsets are
+        the paragraph indexes each text came from.
+    """
+    paragraphs = ((i, text.strip()) for i, text in iter_body_paragraphs(source))
+    return _split_sections((i, text) for i, text in paragraphs if text)
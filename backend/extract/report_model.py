@@ -0,0 +1,106 @@
+import hashlib
+import json
+from typing import NamedTuple, Tuple
+
+from backend.extract.ma_ar_parser import extract_ma_ar_sections_xml
+from backend.extract.section_index import SECTION_TITLES
+from backend.utils.tracing import trace_stage
+
+# Trailing paragraphs of each MA/AR section that form its signature block
+SIGNATURE_LINES = {"part_i": 1, "part_ii": 3}
+# Blank lines left above each signature block, shared by the DOCX and PDF renderers
+SIGNATURE_SPACING = {"part_i": 4, "part_ii": 8}
+DEFAULT_SIGNATURE_SPACING = 4
+
+
+class Paragraph(NamedTuple):
+    text: str
+
+
+class Section(NamedTuple):
+    """
+    One report part: its key in SECTIONS, display title, body paragraphs and
+    the lines of its trailing signature block (possibly empty).
+    """
+    key: str
+    title: str
+    paragraphs: Tuple[Paragraph, ...]
+    signature: Tuple[str, ...] = ()
+
+    def fingerprint(self) -> bytes:
+        """
+        SHA-256 of everything the renderers read from this section, so an
+        unchanged section keeps its cached fragments when others change.
+        """
+        content = [self.key, self.title, [p.text for p in self.paragraphs], list(self.signature)]
+        return hashlib.sha256(json.dumps(content, ensure_ascii=False).encode("utf-8")).digest()
+
+
+class Report(NamedTuple):
+    """
+    Parsed input shared by every renderer, so an upload is parsed once no
+    matter how many output formats are built from it.
+
+    Nodes are tuples: immutable, hashable and slot-only, so one Report can be
+    handed to concurrent renderers and cached as is.
+    """
+    sections: Tuple[Section, ...]
+
+    def section(self, key):
+        for section in self.sections:
+            if section.key == key:
+                return section
+        raise KeyError(key)
+
+    def fingerprint(self) -> bytes:
+        """
+        SHA-256 over the section fingerprints; equal for reports that render
+        the same.
+        """
+        return hashlib.sha256(b"".join(s.fingerprint() for s in self.sections)).digest()
+
+    @property
+    def paragraph_count(self):
+        return sum(len(s.paragraphs) + len(s.signature) for s in self.sections)
+
+    def to_dict(self):
+        return {"sections": [
+            {"key": s.key, "title": s.title, "paragraphs": [p.text for p in s.paragraphs],
+             "signature": list(s.signature)}
+            for s in self.sections
+        ]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(tuple(
+            Section(s["key"], s["title"], tuple(Paragraph(t) for t in s["paragraphs"]), tuple(s["signature"]))
+            for s in data["sections"]
+        ))
+
+
+def make_section(key, texts, signature_lines=0):
+    """
+    Builds a Section from paragraph texts, splitting off the last
+    ``signature_lines`` as its signature block.
+    """
+    split = max(len(texts) - signature_lines, 0)
+    return Section(key, SECTION_TITLES[key], tuple(Paragraph(t) for t in texts[:split]), tuple(texts[split:]))
+
+
+def parse_ma_ar_report(source):
+    """
+    Parses an MA & AR Word file into a Report with sections part_i (MA) and
+    part_ii (AR).
+
+    Args:
+        source: Path or binary file-like object of the .docx file.
+    """
+    with trace_stage("parse_ma_ar") as span:
+        span.record_file("input", source)
+        ma_text, ar_text, _ = extract_ma_ar_sections_xml(source)
+        report = Report((
+            make_section("part_i", ma_text, SIGNATURE_LINES["part_i"]),
+            make_section("part_ii", ar_text, SIGNATURE_LINES["part_ii"]),
+        ))
+        span.set(paragraphs=report.paragraph_count)
+    return report
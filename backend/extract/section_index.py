@@ -0,0 +1,225 @@
+from collections import deque
+
+from backend.extract.ma_ar_parser import iter_body_paragraphs
+
+# Report sections, in the order they appear in a combined SOC report
+SECTIONS = ("part_i", "part_ii", "part_iii", "part_iv", "part_v")
+
+SECTION_TITLES = {
+    "part_i": "第一部分 – 管理层认定",
+    "part_ii": "第二部分 – 独立服务审计师报告",
+    "part_iii": "第三部分 – 系统描述",
+    "part_iv": "第四部分 – 控制目标、控制活动及测试结果",
+    "part_v": "第五部分 – 其他信息",
+}
+
+# Declarative heading markers: (section, pattern, priority).
+# Numbered headings outrank descriptive ones, so a heading such as
+# "第二部分 – 对管理层认定的审计师报告" opens Part II, not Part I.
+# A tuple of sections marks a combined heading, such as the generated
+# "第三及第四部分 – 控制描述及测试程序", which opens all of them at once.
+# English patterns are matched case-insensitively and on word boundaries.
+SECTION_MARKER_TABLE = (
+    (("part_iii", "part_iv"), "第三及第四部分", 20),
+    (("part_iii", "part_iv"), "第三、四部分", 20),
+    (("part_iii", "part_iv"), "Parts III and IV", 20),
+    (("part_iii", "part_iv"), "Parts III & IV", 20),
+    (("part_iii", "part_iv"), "Part III & IV", 20),
+    (("part_iii", "part_iv"), "Sections III and IV", 20),
+
+    ("part_i", "第一部分", 10),
+    ("part_i", "Part I", 10),
+    ("part_i", "Section I", 10),
+    ("part_i", "管理层认定", 5),
+    ("part_i", "Management's Assertion", 5),
+    ("part_i", "Management Assertion", 5),
+
+    ("part_ii", "第二部分", 10),
+    ("part_ii", "Part II", 10),
+    ("part_ii", "Section II", 10),
+    ("part_ii", "审计师报告", 5),
+    ("part_ii", "Service Auditor's Report", 5),
+
+    ("part_iii", "第三部分", 10),
+    ("part_iii", "Part III", 10),
+    ("part_iii", "Section III", 10),
+    ("part_iii", "系统描述", 5),
+    ("part_iii", "Description of the System", 5),
+    ("part_iii", "System Description", 5),
+
+    ("part_iv", "第四部分", 10),
+    ("part_iv", "Part IV", 10),
+    ("part_iv", "Section IV", 10),
+    ("part_iv", "控制目标", 5),
+    ("part_iv", "Control Objectives", 5),
+    ("part_iv", "Tests of Controls", 5),
+
+    ("part_v", "第五部分", 10),
+    ("part_v", "Part V", 10),
+    ("part_v", "Section V", 10),
+    ("part_v", "其他信息", 5),
+    ("part_v", "Other Information", 5),
+)
+
+# Longer paragraphs, or ones ending like a sentence, are body text: a part
+# mentioned there is a reference, not a heading
+DEFAULT_MAX_HEADING_LENGTH = 80
+SENTENCE_ENDINGS = tuple("。．.！!？?；;，,")
+
+
+def _sections(label):
+    # A marker or paragraph label is one section or a tuple of them
+    return label if isinstance(label, tuple) else (label,)
+
+
+def _normalize(text):
+    return text.casefold().replace("’", "'")
+
+
+class MarkerMatcher:
+    """
+    Aho–Corasick automaton over all section markers, so each paragraph is
+    scanned once regardless of how many markers the table holds.
+    """
+
+    def __init__(self, table=SECTION_MARKER_TABLE):
+        self.entries = [(section, _normalize(pattern), priority) for section, pattern, priority in table]
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for entry_id, (_, pattern, _) in enumerate(self.entries):
+            state = 0
+            for ch in pattern:
+                if ch not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][ch] = len(self._goto) - 1
+                state = self._goto[state][ch]
+            self._out[state].append(entry_id)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """
+        Returns (start, section, priority) for every marker occurrence in ``text``.
+        """
+        text = _normalize(text)
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for entry_id in self._out[state]:
+                section, pattern, priority = self.entries[entry_id]
+                # "Part I" must not match inside "Part IV"
+                if pattern[-1].isascii() and pattern[-1].isalnum() and i + 1 < len(text) and text[i + 1].isalnum():
+                    continue
+                start = i - len(pattern) + 1
+                if pattern[0].isascii() and pattern[0].isalnum() and start > 0 and text[start - 1].isalnum():
+                    continue
+                matches.append((start, section, priority))
+        return matches
+
+
+class SectionIndex:
+    """
+    Maps every paragraph offset to the report section it belongs to.
+    """
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.boundaries = {}
+        for offset, label in enumerate(labels):
+            if label is None:
+                continue
+            # Sections opened by one combined heading share their paragraphs
+            for section in _sections(label):
+                start, _ = self.boundaries.get(section, (offset, offset))
+                self.boundaries[section] = (start, offset + 1)
+
+    def section_of(self, offset):
+        return self.labels[offset]
+
+    def slice(self, paragraphs, section):
+        """
+        Returns the paragraphs of ``section``, or an empty list if it is absent.
+        """
+        if section not in self.boundaries:
+            return []
+        start, end = self.boundaries[section]
+        return paragraphs[start:end]
+
+
+def build_section_index(paragraphs, matcher=None, max_heading_length=DEFAULT_MAX_HEADING_LENGTH):
+    """
+    Assigns each paragraph to a section in one pass over the document.
+
+    A section starts at the first heading-like paragraph (short, not ending
+    in sentence punctuation) matching one of its markers; later mentions
+    are ignored (first-match). Sections only move forward, so a reference
+    back to Part I from Part III does not reopen Part I. When a paragraph
+    matches several eligible sections, the highest-priority marker wins,
+    then the earliest in the paragraph.
+
+    Args:
+        paragraphs: Paragraph texts in document order.
+        matcher: A ``MarkerMatcher``; defaults to SECTION_MARKER_TABLE.
+        max_heading_length: Longer paragraphs are never treated as headings.
+
+    Returns:
+        A ``SectionIndex``.
+    """
+    matcher = matcher or _default_matcher()
+    order = {section: i for i, section in enumerate(SECTIONS)}
+    current = None
+    labels = []
+
+    for para in paragraphs:
+        if len(para) <= max_heading_length and not para.endswith(SENTENCE_ENDINGS):
+            floor = order[_sections(current)[-1]] if current is not None else -1
+            candidates = [(-priority, start, section) for start, section, priority in matcher.find(para)
+                          if order.get(_sections(section)[0], -1) > floor]
+            if candidates:
+                current = min(candidates, key=lambda c: c[:2])[2]
+        labels.append(current)
+
+    return SectionIndex(labels)
+
+
+def extract_report_sections(source, matcher=None):
+    """
+    Splits a combined report .docx into its Parts I–V.
+
+    Args:
+        source: Path or binary file-like object of the .docx file.
+
+    Returns:
+        A dict of section -> list of non-empty paragraph texts, for every
+        section found.
+    """
+    paragraphs = [text.strip() for _, text in iter_body_paragraphs(source)]
+    paragraphs = [p for p in paragraphs if p]
+    index = build_section_index(paragraphs, matcher)
+    return {section: index.slice(paragraphs, section) for section in SECTIONS if section in index.boundaries}
+
+
+_matcher = None
+
+
+def _default_matcher():
+    global _matcher
+    if _matcher is None:
+        _matcher = MarkerMatcher()
+    return _matcher
@@ -0,0 +1,153 @@
+import copy
+import io
+import os
+import re
+import threading
+import zipfile
+
+from docx import Document
+from docx.shared import Emu
+
+from backend.output.word_generator import (
+    CONTROL_COLUMN_WIDTHS,
+    XML_TEXT_ESCAPE_TABLE,
+    control_rows_xml,
+    control_table_start_xml,
+    set_default_font,
+)
+
+DOCUMENT_PART = "word/document.xml"
+
+# Run text as python-docx writes it: tabs and newlines become <w:tab/> and <w:br/>
+RUN_TEXT_ESCAPE_TABLE = {**XML_TEXT_ESCAPE_TABLE, ord("\t"): '</w:t><w:tab/><w:t xml:space="preserve">'}
+
+# Pre-built run and paragraph properties, matching what add_section_heading,
+# add_paragraphs and add_signature_block set through python-docx
+HEADING_RPR = '<w:rPr><w:b/><w:sz w:val="28"/></w:rPr>'
+BODY_RPR = '<w:rPr><w:sz w:val="24"/></w:rPr>'
+INDENT_PPR = '<w:pPr><w:ind w:firstLine="566"/></w:pPr>'  # Pt(28.3) ≈ 1cm
+RIGHT_PPR = '<w:pPr><w:jc w:val="right"/></w:pPr>'
+EMPTY_PARAGRAPH = "<w:p/>"
+PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+# Paragraph XML is buffered and flushed to the zip stream in blocks of this size
+FLUSH_CHARS = 1 << 20
+
+_template = None
+_template_lock = threading.Lock()
+
+
+class _Template:
+    """
+    The parts of an empty python-docx document with the default font applied,
+    split around the body so document.xml can be streamed between them.
+    """
+
+    def __init__(self):
+        doc = Document()
+        set_default_font(doc)
+        section = doc.sections[-1]
+        self.text_width = Emu(section.page_width - section.left_margin - section.right_margin).twips
+
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        with zipfile.ZipFile(buffer) as package:
+            self.parts = [(info, package.read(info)) for info in package.infolist() if info.filename != DOCUMENT_PART]
+            document_xml = package.read(DOCUMENT_PART).decode("utf-8")
+
+        match = re.search(r"<w:body>(.*)</w:body>", document_xml, re.S)
+        self.head = document_xml[:match.start(1)]
+        # The empty template body holds only the section properties, which must stay last
+        self.tail = document_xml[match.start(1):]
+
+
+def _get_template():
+    global _template
+    with _template_lock:
+        if _template is None:
+            _template = _Template()
+        return _template
+
+
+def _run_text(text):
+    return '<w:t xml:space="preserve">' + text.translate(RUN_TEXT_ESCAPE_TABLE) + "</w:t>"
+
+
+class DocxStreamWriter:
+    """
+    Writes a .docx in one pass: the package parts of a cached template are
+    copied and word/document.xml is streamed into the zip as paragraphs are
+    added, with no python-docx objects per paragraph.
+
+    The output matches the python-docx helpers in word_generator (same
+    styles, run properties and Times New Roman / Noto Sans CJK SC fonts).
+    Use as a context manager; the file is removed if the block raises.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._template = _get_template()
+        self._zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        for info, data in self._template.parts:
+            # writestr records offsets and sizes on the ZipInfo it is given, so
+            # writers running in parallel each need their own copy
+            self._zip.writestr(copy.copy(info), data)
+        self._stream = self._zip.open(DOCUMENT_PART, "w", force_zip64=True)
+        self._buffer = [self._template.head]
+        self._buffered = 0
+
+    def _write(self, xml):
+        self._buffer.append(xml)
+        self._buffered += len(xml)
+        if self._buffered >= FLUSH_CHARS:
+            self._flush()
+
+    def _flush(self):
+        self._stream.write("".join(self._buffer).encode("utf-8"))
+        self._buffer = []
+        self._buffered = 0
+
+    def add_heading(self, text):
+        self._write("<w:p><w:r>" + HEADING_RPR + _run_text(text) + "</w:r></w:p>")
+
+    def add_paragraphs(self, paragraphs, indent=False):
+        prefix = "<w:p>" + (INDENT_PPR if indent else "") + "<w:r>" + BODY_RPR
+        for p in paragraphs:
+            self._write(prefix + _run_text(p.strip()) + "</w:r></w:p>")
+
+    def add_signature_block(self, signer_name, lines_before=4):
+        self._write(EMPTY_PARAGRAPH * lines_before)
+        self._write("<w:p>" + RIGHT_PPR + "<w:r>" + BODY_RPR + _run_text(signer_name.strip()) + "</w:r></w:p>")
+
+    def add_page_break(self):
+        self._write(PAGE_BREAK)
+
+    def add_control_table(self, chunks, headers, widths=CONTROL_COLUMN_WIDTHS):
+        """
+        Streams a table with one row per record in ``chunks``, see
+        ``word_generator.add_control_table``.
+        """
+        self._write(control_table_start_xml(headers, widths, self._template.text_width))
+        for chunk in chunks:
+            self._write(control_rows_xml(chunk))
+        self._write("</w:tbl>")
+
+    def close(self):
+        self._write(self._template.tail)
+        self._flush()
+        self._stream.close()
+        self._zip.close()
+
+    def abort(self):
+        self._stream.close()
+        self._zip.close()
+        os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
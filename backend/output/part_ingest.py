@@ -0,0 +1,145 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, NamedTuple, Tuple
+
+from backend.extract.section_index import SECTION_TITLES
+from backend.output.report_merger import (
+    docx_paragraph_texts,
+    open_docx,
+    order_by_sections,
+    part_sections,
+    pdf_merge_available,
+)
+from backend.utils.tracing import annotate, submit_with_context, trace_stage
+
+DEFAULT_INGEST_WORKERS = int(os.environ.get("SOC_INGEST_WORKERS", "8"))
+# Part I & II and Part III & IV; Part V is optional
+REQUIRED_SECTIONS = ("part_i", "part_ii", "part_iii", "part_iv")
+
+
+class PartValidationError(ValueError):
+    """
+    Raised when uploaded parts cannot be assembled. ``problems`` holds a
+    (file name, message) pair per problem; the name is empty for problems
+    of the upload as a whole.
+    """
+
+    def __init__(self, problems):
+        self.problems = list(problems)
+        super().__init__("; ".join(f"{name}: {message}" if name else message for name, message in self.problems))
+
+
+class IngestedPart(NamedTuple):
+    name: str
+    stem: str
+    digest: str
+    data: bytes
+    sections: Tuple[str, ...] = ()
+    # DOCX parts: the package from open_docx, consumed by merge_docx
+    package: object = None
+
+
+class IngestedParts(NamedTuple):
+    """
+    Validated final-report inputs: the DOCX parts in report order and the
+    part PDFs by file stem.
+    """
+    docx: Tuple[IngestedPart, ...]
+    pdf: Dict[str, IngestedPart]
+
+
+def _stem(name):
+    return os.path.splitext(os.path.basename(name or ""))[0]
+
+
+def _ingest_docx(name, data):
+    if not data:
+        raise ValueError("the file is empty")
+    digest = hashlib.sha256(data).hexdigest()
+    package = open_docx(data)
+    sections = part_sections(docx_paragraph_texts(package))
+    if not sections:
+        raise ValueError("no report section heading (Part I–V) found")
+    return IngestedPart(name, _stem(name), digest, data, tuple(sections), package)
+
+
+def _ingest_pdf(name, data):
+    if not data.startswith(b"%PDF-"):
+        raise ValueError("not a PDF file")
+    digest = hashlib.sha256(data).hexdigest()
+    if pdf_merge_available():
+        from pypdf import PdfReader
+
+        try:
+            pages = len(PdfReader(io.BytesIO(data)).pages)
+        except Exception as e:  # pypdf raises many error types on damaged files
+            raise ValueError(f"corrupt PDF ({e})") from e
+        if not pages:
+            raise ValueError("the PDF has no pages")
+    return IngestedPart(name, _stem(name), digest, data)
+
+
+def _ingest(ingest, name, data):
+    try:
+        return ingest(name, data), None
+    except ValueError as e:
+        return None, (name, str(e))
+
+
+def ingest_parts(docx_files, pdf_files=(), max_workers=DEFAULT_INGEST_WORKERS):
+    """
+    Validates and parses final-report parts concurrently, so a bad upload
+    is rejected with every problem found before any merging starts.
+
+    Besides each file on its own, the Word parts must cover the
+    REQUIRED_SECTIONS with no report section in two parts, and every PDF
+    needs a Word part with the same file name.
+
+    Args:
+        docx_files: (file name, bytes) of the Word parts.
+        pdf_files: (file name, bytes) of their PDFs, optional.
+
+    Returns:
+        An ``IngestedParts``.
+
+    Raises:
+        PartValidationError: listing every problem found.
+    """
+    jobs = [(_ingest_docx, name, data) for name, data in docx_files]
+    jobs += [(_ingest_pdf, name, data) for name, data in pdf_files]
+    if not any(ingest is _ingest_docx for ingest, _, _ in jobs):
+        raise PartValidationError([("", "No report parts to assemble")])
+
+    with trace_stage("ingest_parts"):
+        annotate(input_bytes=sum(len(data) for _, _, data in jobs), parts=len(jobs))
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+            futures = [submit_with_context(executor, _ingest, *job) for job in jobs]
+            results = [future.result() for future in futures]
+
+    problems = [problem for _, problem in results if problem]
+    docx = [part for (part, _), job in zip(results, jobs) if part and job[0] is _ingest_docx]
+    pdf = [part for (part, _), job in zip(results, jobs) if part and job[0] is _ingest_pdf]
+
+    by_digest, seen = {}, {}
+    for part in docx + pdf:
+        if part.digest in by_digest:
+            problems.append((part.name, f"same file as {by_digest[part.digest]}"))
+            continue
+        by_digest[part.digest] = part.name
+        for section in part.sections:
+            if section in seen:
+                problems.append((part.name, f"{SECTION_TITLES[section]} is also in {seen[section]}"))
+            seen.setdefault(section, part.name)
+    # The sections of an unreadable part are unknown, so only a fully read upload is checked for gaps
+    missing = [SECTION_TITLES[s] for s in REQUIRED_SECTIONS if s not in seen]
+    if missing and len(docx) == sum(job[0] is _ingest_docx for job in jobs):
+        problems.append(("", f"Missing {', '.join(missing)}"))
+    stems = {part.stem for part in docx}
+    problems += [(part.name, "no Word part with the same file name") for part in pdf if part.stem not in stems]
+
+    if problems:
+        raise PartValidationError(problems)
+    order = order_by_sections([part.sections for part in docx])
+    return IngestedParts(tuple(docx[i] for i in order), {part.stem: part for part in pdf})
@@ -2,67 +2,142 @@
 import os
 import tempfile
 import shutil
-from docx import Document
-import streamlit as st
 
-from backend.extract.ma_ar_parser import extract_ma_ar_sections
+from backend.extract.control_matrix import CONTROL_COLUMNS, CONTROL_HEADERS, control_cells_text
+from backend.extract.report_model import DEFAULT_SIGNATURE_SPACING, SIGNATURE_SPACING, parse_ma_ar_report
+from backend.utils.latex_templates import LatexSafe, render_latex, render_latex_stream
 from backend.utils.latex_utils import (
-    format_paragraphs_to_latex,
-    latex_signature_block,
-    latex_document_wrapper,
+    LATEX_LONGTABLE_END,
+    latex_document_context,
+    latex_longtable_begin,
+    latex_longtable_rows,
     render_latex_to_pdf
 )
+from backend.utils.progress import ProgressCallback, null_progress
+from backend.utils.tracing import trace_stage
 
+# longtable column widths, in CONTROL_COLUMNS order
+CONTROL_COL_SPEC = (r"|p{0.10\textwidth}|p{0.25\textwidth}|p{0.29\textwidth}"
+                    r"|p{0.10\textwidth}|p{0.14\textwidth}|")
 
-def generate_ma_ar_pdf(tmp_word_path, word_file, output_base_path: str) -> str:
+
+def _control_rows(chunk):
+    # Escaped column by column in latex_longtable_rows
+    return LatexSafe(latex_longtable_rows(control_cells_text(chunk)))
+
+
+def iter_controls_latex(chunks):
     """
-    Generates a PDF report (Part I & II) from an uploaded Word file.
+    Yields the Part III & IV LaTeX document (templates/latex/controls.tex.j2)
+    piece by piece; rows are rendered one control-matrix chunk at a time,
+    so the full table is never held in memory.
+    """
+    return render_latex_stream(
+        "controls.tex.j2",
+        title="第三及第四部分 – 控制描述及测试程序",
+        table_begin=LatexSafe(latex_longtable_begin([CONTROL_HEADERS[c] for c in CONTROL_COLUMNS], CONTROL_COL_SPEC)),
+        table_end=LatexSafe(LATEX_LONGTABLE_END),
+        chunks=chunks,
+        rows=_control_rows,
+        **latex_document_context(),
+    )
+
+
+def build_controls_latex(df) -> str:
+    """
+    Builds the full Part III & IV LaTeX document from a normalized control matrix.
+    """
+    return "".join(iter_controls_latex([df]))
+
+
+def generate_controls_pdf(chunks, output_base_path: str, progress: ProgressCallback = null_progress) -> str:
+    """
+    Generates the Part III & IV PDF report from a normalized control matrix.
 
     Args:
-        tmp_word_path: The word uploaded.
-        word_file: A file-like object containing the .docx Word input.
-        output_base_path: Path without extension, e.g., 'generated_reports/Part_I_II'
+        chunks: Iterable of DataFrames with the CONTROL_COLUMNS, see
+            ``iter_control_chunks``.
+        output_base_path: Path without extension.
+        progress: Called with a message as each step starts.
 
     Returns:
         The full path to the generated PDF file.
     """
-    doc = Document(tmp_word_path)
-
-    # Extract and format text
-    ma_text, ar_text = extract_ma_ar_sections(doc)
-    ma_latex = format_paragraphs_to_latex(ma_text[:-1])
-    ar_latex = format_paragraphs_to_latex(ar_text[:-3])
-
-    body = rf"""
-    \section*{{第一部分 – 管理层认定}}
-    
-    {ma_latex}
-    
-    {latex_signature_block(ma_text[-1], lines_before=4)}
-    
-    \newpage
-    
-    \section*{{第二部分 – 独立服务审计师报告}}
-    
-    {ar_latex}
-    
-    {latex_signature_block(r"\\".join(ar_text[-3:]), lines_before=8)}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tex_path = os.path.join(tmp_dir, os.path.basename(output_base_path) + ".tex")
+        progress("Building Part III & IV LaTeX...")
+        with trace_stage("controls_latex") as span:
+            with open(tex_path, "w", encoding="utf-8") as f:
+                f.writelines(iter_controls_latex(chunks))
+            span.record_file("output", tex_path)
+
+        progress("Processing Part III & IV...")
+        # One workspace for every control matrix, so a new upload reuses its aux files
+        pdf_path = render_latex_to_pdf(tex_path, "part3_4")
+
+        final_pdf_path = output_base_path + ".pdf"
+        shutil.copy(pdf_path, final_pdf_path)
+    return final_pdf_path
+
+
+def _signature_spacing(key):
+    return SIGNATURE_SPACING.get(key, DEFAULT_SIGNATURE_SPACING)
+
+
+def _report_context(report):
+    return {"report": report, "signature_spacing": _signature_spacing}
+
+
+def build_report_latex(report) -> str:
+    """
+    Builds the LaTeX body of a parsed Report (templates/latex/report_body.tex.j2),
+    laid out like ``render_report_docx``: per section a bold heading, one
+    paragraph per input paragraph and a right-aligned signature block, with
+    a page break between sections.
     """
+    return render_latex("report_body.tex.j2", **_report_context(report))
 
-    # Wrap into full LaTeX document
-    tex_content = latex_document_wrapper(body)
 
-    # Render to PDF
+def render_report_pdf(report, output_base_path: str, progress: ProgressCallback = null_progress,
+                      build_name: str = None) -> str:
+    """
+    Renders a parsed Report to PDF with XeLaTeX.
+
+    Args:
+        build_name: XeLaTeX workspace name; defaults to "part1_2", so a
+            re-uploaded or edited report reuses the previous build's aux files.
+
+    Returns:
+        The full path to the generated PDF file.
+    """
+    build_name = build_name or "part1_2"
     with tempfile.TemporaryDirectory() as tmp_dir:
-        tex_path = os.path.join(tmp_dir, "part1_2.tex")
+        tex_path = os.path.join(tmp_dir, build_name + ".tex")
         with open(tex_path, "w", encoding="utf-8") as f:
-            f.write(tex_content)
+            f.writelines(render_latex_stream("report.tex.j2", **_report_context(report), **latex_document_context()))
 
-            with st.spinner("Processing Part I & II..."):
-                pdf_path = render_latex_to_pdf(tex_path)
+        progress("Processing Part I & II...")
+        pdf_path = render_latex_to_pdf(tex_path)
 
         # === Copy only final outputs to persistent directory ===
         final_pdf_path = output_base_path + ".pdf"
         shutil.copy(pdf_path, final_pdf_path)
     # Temp files automatically cleaned
-    return final_pdf_path
\ No newline at end of file
+    return final_pdf_path
+
+
+def generate_ma_ar_pdf(word_source, word_file, output_base_path: str,
+                       progress: ProgressCallback = null_progress) -> str:
+    """
+    Generates a PDF report (Part I & II) from an uploaded Word file.
+
+    Args:
+        word_source: Path or binary file-like object of the uploaded .docx.
+        word_file: A file-like object containing the .docx Word input.
+        output_base_path: Path without extension, e.g., 'generated_reports/Part_I_II'
+        progress: Called with a message as each step starts.
+
+    Returns:
+        The full path to the generated PDF file.
+    """
+    return render_report_pdf(parse_ma_ar_report(word_source), output_base_path, progress)
@@ -0,0 +1,561 @@
+"""
+Assembles the final SOC report from already-generated parts.
+
+DOCX parts are spliced at the XML level into the first part's package:
+body content, styles, numbering, footnotes, endnotes, comments,
+relationships and the parts they point to (images, headers, footers, ...)
+are carried over with renumbered ids, and each part keeps its own page
+setup through a section break. PDF parts are concatenated page by page.
+Both outputs get the same navigation built from the section index: PDF
+bookmarks, and bookmarked outline-level headings that Word lists in its
+navigation pane. Assembly costs about the size of the inputs instead of a
+LaTeX/LibreOffice rebuild.
+"""
+import copy
+import io
+import posixpath
+import zipfile
+import zlib
+
+from lxml import etree
+
+from backend.extract.section_index import SECTIONS, build_section_index
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+WP_NS = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+STYLES_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+NUMBERING_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/numbering"
+NUMBERING_CT = "application/vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml"
+FOOTNOTES_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/footnotes"
+ENDNOTES_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/endnotes"
+COMMENTS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments"
+
+_W = "{%s}" % W_NS
+_R = "{%s}" % R_NS
+
+# Parts whose entries the body refers to by w:id:
+# (relationship type, entry tag, reference tags)
+NOTE_PARTS = (
+    (FOOTNOTES_REL, _W + "footnote", (_W + "footnoteReference",)),
+    (ENDNOTES_REL, _W + "endnote", (_W + "endnoteReference",)),
+    (COMMENTS_REL, _W + "comment", (_W + "commentReference", _W + "commentRangeStart", _W + "commentRangeEnd")),
+)
+
+BOOKMARK_PREFIX = "_soc_"
+# pPr children that must follow w:outlineLvl
+_AFTER_OUTLINE_LEVEL = (_W + "divId", _W + "cnfStyle", _W + "rPr", _W + "sectPr", _W + "pPrChange")
+
+
+def _rels_name(part_name):
+    directory, name = posixpath.split(part_name)
+    return posixpath.join(directory, "_rels", name + ".rels")
+
+
+def _resolve(source_part, target):
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+
+def _relative(source_part, target_part):
+    return posixpath.relpath(target_part, posixpath.dirname(source_part) or ".")
+
+
+class _Package:
+    """
+    An OPC package (.docx) held as part name -> bytes, with parsed XML
+    parts cached until ``save``.
+    """
+
+    def __init__(self, data):
+        with zipfile.ZipFile(io.BytesIO(data)) as package:
+            self.parts = {info.filename: package.read(info) for info in package.infolist()}
+        self._xml = {}
+        self.content_types = self.xml("[Content_Types].xml")
+        root_rels = self.xml("_rels/.rels")
+        self.document_name = next(_resolve("", rel.get("Target")) for rel in root_rels
+                                  if rel.get("Type") == OFFICE_DOCUMENT_REL)
+
+    def xml(self, name):
+        if name not in self._xml:
+            self._xml[name] = etree.fromstring(self.parts[name])
+        return self._xml[name]
+
+    def rels(self, part_name):
+        name = _rels_name(part_name)
+        if name not in self.parts:
+            self.parts[name] = b'<Relationships xmlns="%s"/>' % PKG_REL_NS.encode()
+        return self.xml(name)
+
+    def related(self, part_name, rel_type):
+        for rel in self.rels(part_name):
+            if rel.get("Type") == rel_type:
+                return _resolve(part_name, rel.get("Target"))
+        return None
+
+    def content_type(self, part_name):
+        for override in self.content_types.iter("{%s}Override" % CT_NS):
+            if override.get("PartName") == "/" + part_name:
+                return ("Override", override.get("ContentType"))
+        ext = posixpath.splitext(part_name)[1][1:].lower()
+        for default in self.content_types.iter("{%s}Default" % CT_NS):
+            if default.get("Extension").lower() == ext:
+                return ("Default", default.get("ContentType"))
+        return None
+
+    def add_content_type(self, part_name, content_type):
+        if content_type is None or self.content_type(part_name) == content_type:
+            return
+        kind, value = content_type
+        if kind == "Default":
+            ext = posixpath.splitext(part_name)[1][1:]
+            if self.content_type(part_name) is None:
+                etree.SubElement(self.content_types, "{%s}Default" % CT_NS, Extension=ext, ContentType=value)
+                return
+        etree.SubElement(self.content_types, "{%s}Override" % CT_NS, PartName="/" + part_name, ContentType=value)
+
+    def add_rel(self, part_name, rel_type, target, external=False):
+        rels = self.rels(part_name)
+        existing = {rel.get("Id") for rel in rels}
+        n = len(existing) + 1
+        while f"rId{n}" in existing:
+            n += 1
+        attrs = {"Id": f"rId{n}", "Type": rel_type, "Target": target}
+        if external:
+            attrs["TargetMode"] = "External"
+        etree.SubElement(rels, "{%s}Relationship" % PKG_REL_NS, attrs)
+        return attrs["Id"]
+
+    def save(self, path):
+        for name, tree in self._xml.items():
+            self.parts[name] = etree.tostring(tree, xml_declaration=True, encoding="UTF-8", standalone=True)
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as package:
+            # [Content_Types].xml first, as Word and most readers expect
+            for name in sorted(self.parts, key=lambda n: n != "[Content_Types].xml"):
+                package.writestr(name, self.parts[name])
+
+
+class _PartImporter:
+    """
+    Copies the parts a source document's content refers to into the target
+    package, renaming them on collision, and maps the source relationship
+    ids to new ones on the target document.
+    """
+
+    def __init__(self, target, source):
+        self.target = target
+        self.source = source
+        self.copied = {}  # source part name -> target part name
+
+    def copy_part(self, name):
+        if name in self.copied:
+            return self.copied[name]
+        data = self.source.parts[name]
+        # Identical parts (e.g. the same logo) are shared, unless they have
+        # relationships of their own that may point elsewhere
+        shareable = _rels_name(name) not in self.source.parts
+        new_name = name
+        stem, ext = posixpath.splitext(name)
+        n = 1
+        while new_name in self.target.parts and (self.target.parts[new_name] != data or not shareable):
+            n += 1
+            new_name = f"{stem}_{n}{ext}"
+        self.copied[name] = new_name
+        self.target.parts[new_name] = data
+        self.target.add_content_type(new_name, self.source.content_type(name))
+
+        # Parts such as headers have relationships of their own
+        if not shareable:
+            rels = copy.deepcopy(self.source.xml(_rels_name(name)))
+            for rel in rels:
+                if rel.get("TargetMode") != "External":
+                    dependency = self.copy_part(_resolve(name, rel.get("Target")))
+                    rel.set("Target", _relative(new_name, dependency))
+            self.target.parts[_rels_name(new_name)] = etree.tostring(rels)
+        return new_name
+
+    def remap_relationships(self, elements, source_part=None, target_part=None):
+        """
+        Rewrites the relationship ids in ``elements``, taken from
+        ``source_part`` (default: the source document), to relationships of
+        ``target_part`` (default: the target document).
+        """
+        source_part = source_part or self.source.document_name
+        target_part = target_part or self.target.document_name
+        source_rels = {rel.get("Id"): rel for rel in self.source.rels(source_part)}
+        mapping = {}
+        for element in elements:
+            for node in element.iter():
+                for attr, value in node.attrib.items():
+                    if not attr.startswith(_R) or value not in source_rels:
+                        continue
+                    if value not in mapping:
+                        rel = source_rels[value]
+                        if rel.get("TargetMode") == "External":
+                            mapping[value] = self.target.add_rel(target_part, rel.get("Type"),
+                                                                 rel.get("Target"), external=True)
+                        else:
+                            part = self.copy_part(_resolve(source_part, rel.get("Target")))
+                            mapping[value] = self.target.add_rel(target_part, rel.get("Type"),
+                                                                 _relative(target_part, part))
+                    node.set(attr, mapping[value])
+
+
+def _merge_styles(target, source, remap_numbering):
+    target_styles_name = target.related(target.document_name, STYLES_REL)
+    source_styles_name = source.related(source.document_name, STYLES_REL)
+    if not target_styles_name or not source_styles_name:
+        return
+    target_styles = target.xml(target_styles_name)
+    known = {s.get(_W + "styleId") for s in target_styles.iter(_W + "style")}
+    # Styles the target already defines keep the target's definition
+    for style in source.xml(source_styles_name).iter(_W + "style"):
+        if style.get(_W + "styleId") not in known:
+            style = copy.deepcopy(style)
+            remap_numbering(style)
+            target_styles.append(style)
+
+
+def _merge_numbering(target, source):
+    """
+    Appends the source's list definitions with fresh ids. Returns a function
+    that rewrites numId references in copied elements.
+    """
+    source_name = source.related(source.document_name, NUMBERING_REL)
+    if not source_name:
+        return lambda element: None
+
+    target_name = target.related(target.document_name, NUMBERING_REL)
+    if not target_name:
+        target_name = "word/numbering.xml"
+        target.parts[target_name] = b'<w:numbering xmlns:w="%s"/>' % W_NS.encode()
+        target.add_rel(target.document_name, NUMBERING_REL, _relative(target.document_name, target_name))
+        target.add_content_type(target_name, ("Override", NUMBERING_CT))
+    numbering = target.xml(target_name)
+
+    abstract_offset = 1 + max((int(a.get(_W + "abstractNumId")) for a in numbering.iter(_W + "abstractNum")), default=-1)
+    num_offset = max((int(n.get(_W + "numId")) for n in numbering.iter(_W + "num")), default=0)
+    first_num = next(numbering.iter(_W + "num"), None)
+
+    for abstract in source.xml(source_name).iter(_W + "abstractNum"):
+        abstract = copy.deepcopy(abstract)
+        abstract.set(_W + "abstractNumId", str(int(abstract.get(_W + "abstractNumId")) + abstract_offset))
+        # All abstractNum elements must precede the num elements
+        if first_num is not None:
+            first_num.addprevious(abstract)
+        else:
+            numbering.append(abstract)
+    for num in source.xml(source_name).iter(_W + "num"):
+        num = copy.deepcopy(num)
+        num.set(_W + "numId", str(int(num.get(_W + "numId")) + num_offset))
+        ref = num.find(_W + "abstractNumId")
+        ref.set(_W + "val", str(int(ref.get(_W + "val")) + abstract_offset))
+        numbering.append(num)
+
+    def remap(element):
+        for num_id in element.iter(_W + "numId"):
+            if num_id.get(_W + "val") != "0":  # 0 means "no numbering"
+                num_id.set(_W + "val", str(int(num_id.get(_W + "val")) + num_offset))
+    return remap
+
+
+def _merge_notes(target, source, importer, elements):
+    """
+    Carries over the footnotes, endnotes and comments that ``elements``
+    refer to, renumbering them and their references after the target's own.
+    The first part with notes of a kind lends the target its whole notes
+    part, separators included.
+    """
+    for rel_type, entry_tag, reference_tags in NOTE_PARTS:
+        references = [node for element in elements for node in element.iter(*reference_tags)]
+        if not references:
+            continue
+        source_name = source.related(source.document_name, rel_type)
+        if source_name is None:
+            # Dangling references would make the merged document invalid
+            for node in references:
+                node.getparent().remove(node)
+            continue
+        target_name = target.related(target.document_name, rel_type)
+        if target_name is None:
+            target_name = importer.copy_part(source_name)
+            target.add_rel(target.document_name, rel_type, _relative(target.document_name, target_name))
+            continue
+
+        container = target.xml(target_name)
+        next_id = 1 + max((int(e.get(_W + "id")) for e in container.iter(entry_tag)), default=0)
+        mapping = {}
+        for node in references:
+            if node.get(_W + "id") not in mapping:
+                mapping[node.get(_W + "id")] = str(next_id)
+                next_id += 1
+            node.set(_W + "id", mapping[node.get(_W + "id")])
+        entries = {e.get(_W + "id"): e for e in source.xml(source_name).iter(entry_tag)}
+        copied = []
+        for old_id, new_id in mapping.items():
+            if old_id in entries:
+                entry = copy.deepcopy(entries[old_id])
+                entry.set(_W + "id", new_id)
+                container.append(entry)
+                copied.append(entry)
+        importer.remap_relationships(copied, source_name, target_name)
+
+
+def _body_parts(package):
+    body = package.xml(package.document_name).find(_W + "body")
+    children = list(body)
+    sect_pr = children.pop() if children and children[-1].tag == _W + "sectPr" else None
+    return body, children, sect_pr
+
+
+def _renumber(elements, tag, attr, offset):
+    highest = offset
+    for element in elements:
+        for node in element.iter(tag):
+            value = int(node.get(attr)) + offset
+            node.set(attr, str(value))
+            highest = max(highest, value)
+    return highest
+
+
+def _paragraph_text(p):
+    return "".join(t.text or "" for t in p.iter(_W + "t")).strip()
+
+
+def _w(xml):
+    return etree.fromstring(f'<w:root xmlns:w="{W_NS}">{xml}</w:root>')[0]
+
+
+def part_sections(paragraphs):
+    """
+    Returns the sections a part covers, in order, using the section index.
+    """
+    index = build_section_index(paragraphs)
+    return [s for s in SECTIONS if s in index.boundaries]
+
+
+def open_docx(data):
+    """
+    Opens a .docx payload, reading every part, for ``docx_paragraph_texts``
+    and ``merge_docx``.
+
+    Raises:
+        ValueError: if ``data`` is not a readable Word package.
+    """
+    try:
+        package = _Package(data)
+        package.xml(package.document_name)
+    except (zipfile.BadZipFile, zlib.error) as e:
+        raise ValueError("not a valid .docx file (corrupt or not a zip archive)") from e
+    except (KeyError, StopIteration, etree.XMLSyntaxError) as e:
+        raise ValueError("not a Word document") from e
+    return package
+
+
+def _open(payload):
+    return payload if isinstance(payload, _Package) else _Package(payload)
+
+
+def docx_paragraph_texts(data):
+    """
+    Returns the texts of the top-level body paragraphs of a .docx payload
+    or of a package from ``open_docx``.
+    """
+    _, children, _ = _body_parts(_open(data))
+    return [_paragraph_text(p) for p in children if p.tag == _W + "p"]
+
+
+def order_by_sections(sections):
+    """
+    Orders parts by the first report section each contains; parts without a
+    recognisable section keep their relative order at the end.
+
+    Args:
+        sections: The sections of each part, see ``part_sections``.
+
+    Returns:
+        The part indexes in report order.
+    """
+    return sorted(range(len(sections)),
+                  key=lambda i: SECTIONS.index(sections[i][0]) if sections[i] else len(SECTIONS))
+
+
+def order_parts(payloads):
+    """
+    Orders DOCX part payloads by the first report section each contains.
+
+    Returns:
+        A list of (original index, sections) in report order.
+    """
+    sections = [part_sections(docx_paragraph_texts(data)) for data in payloads]
+    return [(i, sections[i]) for i in order_by_sections(sections)]
+
+
+def merge_docx(payloads, output_path, outline=True):
+    """
+    Concatenates DOCX payloads into ``output_path`` at the XML level.
+
+    The first payload is the base: its styles win when a style id is defined
+    by several parts. Every part keeps its page setup (and headers/footers)
+    behind a section break, and its footnotes, endnotes and comments.
+
+    Unless ``outline`` is false, the first paragraph of each detected
+    section gets a bookmark and Word outline level 1, matching the bookmarks of
+    ``merge_pdfs``.
+
+    Args:
+        payloads: .docx bytes, or packages from ``open_docx``; packages are
+            modified by the merge and cannot be reused.
+
+    Returns:
+        ``output_path``.
+    """
+    target = _open(payloads[0])
+    body, first_children, first_sect_pr = _body_parts(target)
+    blocks = [(first_children, first_sect_pr)]
+
+    bookmark_max = _renumber(first_children, _W + "bookmarkStart", _W + "id", 0)
+    doc_pr_max = _renumber(first_children, "{%s}docPr" % WP_NS, "id", 0)
+
+    for data in payloads[1:]:
+        source = _open(data)
+        _, children, sect_pr = _body_parts(source)
+        elements = children + ([sect_pr] if sect_pr is not None else [])
+
+        remap_numbering = _merge_numbering(target, source)
+        _merge_styles(target, source, remap_numbering)
+        for element in elements:
+            remap_numbering(element)
+        importer = _PartImporter(target, source)
+        _merge_notes(target, source, importer, elements)
+        importer.remap_relationships(elements)
+
+        offset = bookmark_max + 1
+        _renumber(children, _W + "bookmarkEnd", _W + "id", offset)
+        bookmark_max = _renumber(children, _W + "bookmarkStart", _W + "id", offset)
+        doc_pr_max = _renumber(children, "{%s}docPr" % WP_NS, "id", doc_pr_max + 1)
+        blocks.append((children, sect_pr))
+
+    for child in list(body):
+        body.remove(child)
+
+    paragraphs = []
+    for i, (children, sect_pr) in enumerate(blocks):
+        body.extend(children)
+        paragraphs.extend(c for c in children if c.tag == _W + "p")
+        if i == len(blocks) - 1:
+            if sect_pr is not None:
+                body.append(sect_pr)
+        elif sect_pr is not None:
+            # A paragraph carrying the part's sectPr ends its section on its own page setup
+            body.append(_w(f"<w:p><w:pPr>{etree.tostring(sect_pr).decode()}</w:pPr></w:p>"))
+        else:
+            body.append(_w('<w:p><w:r><w:br w:type="page"/></w:r></w:p>'))
+
+    if outline:
+        _mark_sections(paragraphs, bookmark_max + 1)
+    target.save(output_path)
+    return output_path
+
+
+def _set_outline_level(paragraph):
+    ppr = paragraph.find(_W + "pPr")
+    if ppr is None:
+        ppr = _w("<w:pPr/>")
+        paragraph.insert(0, ppr)
+    level = ppr.find(_W + "outlineLvl")
+    if level is None:
+        level = _w('<w:outlineLvl w:val="0"/>')
+        following = next((c for c in ppr if c.tag in _AFTER_OUTLINE_LEVEL), None)
+        if following is not None:
+            following.addprevious(level)
+        else:
+            ppr.append(level)
+    level.set(_W + "val", "0")
+
+
+def _mark_sections(paragraphs, first_bookmark_id):
+    # Sections sharing a heading (Part III & IV) share its outline entry
+    index = build_section_index([_paragraph_text(p) for p in paragraphs])
+    for n, section in enumerate(s for s in SECTIONS if s in index.boundaries):
+        start, _ = index.boundaries[section]
+        bookmark_id = first_bookmark_id + n
+        paragraph = paragraphs[start]
+        _set_outline_level(paragraph)
+        position = paragraph.index(paragraph.find(_W + "pPr")) + 1
+        while position < len(paragraph) and paragraph[position].tag == _W + "bookmarkStart":
+            position += 1
+        paragraph.insert(position, _w(f'<w:bookmarkStart w:id="{bookmark_id}" w:name="{BOOKMARK_PREFIX + section}"/>'))
+        paragraph.append(_w(f'<w:bookmarkEnd w:id="{bookmark_id}"/>'))
+
+
+def pdf_section_pages(reader):
+    """
+    Returns {section: page number} for the sections the section index finds
+    in the text of ``reader``'s pages (one paragraph per text line).
+    """
+    lines, pages = [], []
+    for number, page in enumerate(reader.pages):
+        try:
+            text = page.extract_text() or ""
+        except Exception:  # pypdf raises many error types on unusual content streams
+            text = ""
+        for line in text.splitlines():
+            if line.strip():
+                lines.append(line.strip())
+                pages.append(number)
+    index = build_section_index(lines)
+    return {section: pages[start] for section, (start, _) in index.boundaries.items()}
+
+
+def merge_pdfs(payloads, output_path, outline=()):
+    """
+    Concatenates PDF payloads page by page with pypdf.
+
+    Args:
+        payloads: PDF bytes, in report order.
+        outline: (title, payload index, section) bookmarks. A bookmark points
+            at the page of that payload where ``pdf_section_pages`` finds the
+            section, or at its first page when section is None. Only
+            payloads holding several sections are searched; a section that is
+            not found shares the page of the bookmark before it.
+
+    Returns:
+        ``output_path``.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    readers = [PdfReader(io.BytesIO(data)) for data in payloads]
+    sections_per_part = {}
+    for _, part, section in outline:
+        if section:
+            sections_per_part[part] = sections_per_part.get(part, 0) + 1
+    section_pages = {part: pdf_section_pages(readers[part]) for part, count in sections_per_part.items() if count > 1}
+
+    writer = PdfWriter()
+    starts = []
+    for reader in readers:
+        starts.append(len(writer.pages))
+        writer.append(reader)
+    previous = {}
+    for title, part, section in outline:
+        page = max(section_pages.get(part, {}).get(section, 0), previous.get(part, 0))
+        previous[part] = page
+        writer.add_outline_item(title, starts[part] + page)
+    with open(output_path, "wb") as f:
+        writer.write(f)
+    return output_path
+
+
+def pdf_merge_available():
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
@@ -2,10 +2,41 @@ import os
 import tempfile
 import shutil
 from docx import Document
-from docx.shared import Pt
-from docx.oxml.ns import qn
-
-from backend.extract.ma_ar_parser import extract_ma_ar_sections
+from docx.shared import Emu, Pt
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+
+from backend.extract.control_matrix import CONTROL_COLUMNS, CONTROL_HEADERS, control_cells_text
+from backend.extract.report_model import DEFAULT_SIGNATURE_SPACING, SIGNATURE_SPACING, parse_ma_ar_report
+from backend.utils.tracing import trace_stage
+
+# Escapes text for a <w:t> element; newlines become line breaks inside the run
+XML_TEXT_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    "\n": '</w:t><w:br/><w:t xml:space="preserve">',
+    "\r": "",
+    # Control characters are not allowed in XML 1.0
+    **{chr(c): "" for c in range(32) if chr(c) not in "\t\n\r"},
+})
+
+# "stream" writes document.xml directly (docx_stream); "python-docx" builds
+# the document object model. Both produce the same document.
+DOCX_WRITERS = ("stream", "python-docx")
+DEFAULT_DOCX_WRITER = os.environ.get("SOC_DOCX_WRITER", "stream")
+
+# Relative widths of the control-matrix columns, in CONTROL_COLUMNS order
+CONTROL_COLUMN_WIDTHS = (0.12, 0.28, 0.30, 0.12, 0.18)
+
+
+def set_default_font(doc):
+    style = doc.styles["Normal"]
+    font = style.font
+    font.name = "Times New Roman"
+    font.size = Pt(12)
+    rFonts = style.element.rPr.rFonts
+    rFonts.set(qn("w:eastAsia"), "Noto Sans CJK SC")
 
 
 def add_section_heading(doc, text):
@@ -33,48 +64,170 @@ def add_signature_block(doc, signer_name, lines_before=4):
     run.font.size = Pt(12)
 
 
-def generate_ma_ar_docx(tmp_word_path, word_file, output_base_path: str) -> str:
+def control_rows_xml(df) -> str:
     """
-    Generates a DOCX report (Part I & II) from an uploaded Word file.
+    Renders every row of ``df`` as <w:tr> XML, escaping column by column.
+    """
+    if df.empty:
+        return ""
+    cells = None
+    for column in df.columns:
+        column_xml = '<w:tc><w:p><w:r><w:t xml:space="preserve">' + df[column].str.translate(XML_TEXT_ESCAPE_TABLE) + "</w:t></w:r></w:p></w:tc>"
+        cells = column_xml if cells is None else cells + column_xml
+    return "".join(("<w:tr>" + cells + "</w:tr>").tolist())
+
+
+def control_table_start_xml(headers, widths, text_width) -> str:
+    """
+    Returns an open <w:tbl> with its grid and a header row repeated on
+    every page; rows from ``control_rows_xml`` follow it.
+    """
+    grid = "".join(f'<w:gridCol w:w="{int(text_width * w)}"/>' for w in widths)
+    header = "".join(
+        f'<w:tc><w:p><w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">{h.translate(XML_TEXT_ESCAPE_TABLE)}</w:t></w:r></w:p></w:tc>'
+        for h in headers
+    )
+    return (
+        f"<w:tbl {nsdecls('w')}>"
+        '<w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:w="5000" w:type="pct"/></w:tblPr>'
+        f"<w:tblGrid>{grid}</w:tblGrid>"
+        f"<w:tr><w:trPr><w:tblHeader/></w:trPr>{header}</w:tr>"
+    )
+
+
+def add_control_table(doc, chunks, headers, widths=CONTROL_COLUMN_WIDTHS):
+    """
+    Appends a table with one row per record in ``chunks``.
+
+    Each chunk is rendered to XML column by column and parsed in one call,
+    instead of creating every cell through python-docx.
+    """
+    section = doc.sections[-1]
+    text_width = Emu(section.page_width - section.left_margin - section.right_margin).twips
+    tbl = parse_xml(control_table_start_xml(headers, widths, text_width) + "</w:tbl>")
+    for chunk in chunks:
+        rows_xml = control_rows_xml(chunk)
+        if rows_xml:
+            tbl.extend(parse_xml(f"<w:tbl {nsdecls('w')}>{rows_xml}</w:tbl>"))
+    doc.element.body._insert_tbl(tbl)
+    return tbl
+
+
+def _check_writer(writer):
+    if writer not in DOCX_WRITERS:
+        raise ValueError(f"Unknown DOCX writer '{writer}', expected one of: {', '.join(DOCX_WRITERS)}")
+
+
+def _stream_writer(path):
+    # docx_stream builds on the helpers in this module
+    from backend.output.docx_stream import DocxStreamWriter
+    return DocxStreamWriter(path)
+
+
+def generate_controls_docx(chunks, output_base_path: str, writer: str = DEFAULT_DOCX_WRITER) -> str:
+    """
+    Generates the Part III & IV DOCX report from a normalized control matrix.
 
     Args:
-        tmp_word_path: The word uploaded.
-        word_file: A file-like object containing the .docx Word input.
-        output_base_path: Path without extension, e.g., 'generated_reports/Part_I_II'
+        chunks: Iterable of DataFrames with the CONTROL_COLUMNS, see
+            ``iter_control_chunks``.
+        output_base_path: Path without extension.
+        writer: One of DOCX_WRITERS.
 
     Returns:
         The full path to the generated DOCX file.
     """
-    doc = Document(tmp_word_path)
+    _check_writer(writer)
+    rows = (control_cells_text(chunk) for chunk in chunks)
+    headers = [CONTROL_HEADERS[c] for c in CONTROL_COLUMNS]
+    final_docx_path = output_base_path + ".docx"
+    with trace_stage("controls_docx", writer=writer) as span:
+        if writer == "stream":
+            with _stream_writer(final_docx_path) as out:
+                out.add_heading("第三及第四部分 – 控制描述及测试程序")
+                out.add_control_table(rows, headers)
+            span.record_file("output", final_docx_path)
+            return final_docx_path
+
+        output_doc = Document()
+        set_default_font(output_doc)
+
+        add_section_heading(output_doc, "第三及第四部分 – 控制描述及测试程序")
+        add_control_table(output_doc, rows, headers)
+        output_doc.save(final_docx_path)
+        span.record_file("output", final_docx_path)
+    return final_docx_path
 
-    # Extract raw text
-    ma_text, ar_text = extract_ma_ar_sections(doc)
 
-    # === Build New Word Document ===
-    output_doc = Document()
+def render_report_docx(report, output_base_path: str, writer: str = DEFAULT_DOCX_WRITER) -> str:
+    """
+    Renders a parsed Report to DOCX: per section a bold heading, its
+    paragraphs and a right-aligned signature block, with a page break
+    between sections.
 
-    # Set default font
-    style = output_doc.styles["Normal"]
-    font = style.font
-    font.name = "Times New Roman"
-    font.size = Pt(12)
-    rFonts = style.element.rPr.rFonts
-    rFonts.set(qn("w:eastAsia"), "Noto Sans CJK SC")
+    Args:
+        report: A ``report_model.Report``.
+        output_base_path: Path without extension.
+        writer: One of DOCX_WRITERS.
+
+    Returns:
+        The full path to the generated DOCX file.
+    """
+    _check_writer(writer)
+    final_docx_path = output_base_path + ".docx"
+    with trace_stage("save_docx", writer=writer) as span:
+        if writer == "stream":
+            with _stream_writer(final_docx_path) as out:
+                _write_report(out, report)
+        else:
+            output_doc = Document()
+            set_default_font(output_doc)
+            _write_report(_DocumentAdapter(output_doc), report)
+            output_doc.save(final_docx_path)
+        span.record_file("output", final_docx_path)
 
-    # Part I – 管理层认定
-    add_section_heading(output_doc, "第一部分 – 管理层认定")
-    add_paragraphs(output_doc, ma_text[:-1])
-    add_signature_block(output_doc, signer_name=ma_text[-1], lines_before=4)
+    return final_docx_path
 
-    output_doc.add_page_break()
 
-    # Part II – 审计师报告
-    add_section_heading(output_doc, "第二部分 – 独立服务审计师报告")
-    add_paragraphs(output_doc, ar_text[:-3])
-    add_signature_block(output_doc, signer_name="\n".join(ar_text[-3:]), lines_before=8)
+class _DocumentAdapter:
+    # Gives a python-docx Document the DocxStreamWriter interface
+    def __init__(self, doc):
+        self.doc = doc
 
-    # Save output
-    final_docx_path = output_base_path + ".docx"
-    output_doc.save(final_docx_path)
+    def add_heading(self, text):
+        add_section_heading(self.doc, text)
 
-    return final_docx_path
+    def add_paragraphs(self, paragraphs, indent=False):
+        add_paragraphs(self.doc, paragraphs, indent)
+
+    def add_signature_block(self, signer_name, lines_before=4):
+        add_signature_block(self.doc, signer_name, lines_before)
+
+    def add_page_break(self):
+        self.doc.add_page_break()
+
+
+def _write_report(out, report):
+    for i, section in enumerate(report.sections):
+        if i:
+            out.add_page_break()
+        out.add_heading(section.title)
+        out.add_paragraphs([p.text for p in section.paragraphs])
+        if section.signature:
+            out.add_signature_block("\n".join(section.signature),
+                                    lines_before=SIGNATURE_SPACING.get(section.key, DEFAULT_SIGNATURE_SPACING))
+
+
+def generate_ma_ar_docx(word_source, word_file, output_base_path: str) -> str:
+    """
+    Generates a DOCX report (Part I & II) from an uploaded Word file.
+
+    Args:
+        word_source: Path or binary file-like object of the uploaded .docx.
+        word_file: A file-like object containing the .docx Word input.
+        output_base_path: Path without extension, e.g., 'generated_reports/Part_I_II'
+
+    Returns:
+        The full path to the generated DOCX file.
+    """
+    return render_report_docx(parse_ma_ar_report(word_source), output_base_path)
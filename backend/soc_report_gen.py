@@ -1,34 +1,150 @@
+import io
 import os
 import tempfile
 import shutil
-from typing import final
-
-from docx import Document
-import pandas as pd
-import subprocess
-import streamlit as st
-from backend.output.pdf_generator import generate_ma_ar_pdf
-from backend.output.word_generator import generate_ma_ar_docx
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from backend.extract.control_matrix import iter_control_chunks
+from backend.extract.report_model import Report, parse_ma_ar_report
+from backend.extract.section_index import SECTION_TITLES
+from backend.output.pdf_generator import generate_controls_pdf, render_report_pdf
+from backend.output.part_ingest import ingest_parts
+from backend.output.report_merger import merge_docx, merge_pdfs, pdf_merge_available
+from backend.output.word_generator import generate_controls_docx, render_report_docx
 from backend.utils.convert_docx_to_pdf import convert_docx_to_pdf
+from backend.utils.output_cache import output_cache, render_settings
+from backend.utils.progress import ProgressCallback, null_progress
+from backend.utils.tool_runner import run_tool
+from backend.utils.tracing import annotate, submit_with_context, trace_stage, traced
 
 # === Utility Functions ===
-def save_uploaded_file(uploaded_file, suffix):
-    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    tmp_file.write(uploaded_file.read())
-    tmp_file.close()
-    return tmp_file.name
+def read_upload(uploaded_file) -> bytes:
+    # Leave the upload readable for whoever consumes it next
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    data = uploaded_file.read()
+    uploaded_file.seek(0)
+    return data
+
+def upload_view(data: bytes) -> io.BytesIO:
+    """
+    Returns a fresh read-only stream over the upload bytes.
+
+    python-docx, lxml and openpyxl all read from file-like objects, so
+    uploads never go through a temp file. Each concurrent reader needs its
+    own stream position; the views share the underlying buffer.
+    """
+    return io.BytesIO(data)
 
 def convert_tex_to_docx(tex_path):
     docx_path = tex_path.replace(".tex", ".docx")
-    result = subprocess.run(
-        ["pandoc", tex_path, "-o", docx_path],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
-    if result.returncode != 0:
-        raise RuntimeError(f"Pandoc failed: {result.stderr.decode()}")
+    with trace_stage("pandoc") as span:
+        span.record_file("input", tex_path)
+        result = run_tool(["pandoc", tex_path, "-o", docx_path], check=False)
+        if result.returncode != 0:
+            raise RuntimeError(f"Pandoc failed: {result.stderr.decode()}")
+        span.record_file("output", docx_path)
     return docx_path
 
+# === Stage Pipeline ===
+DEFAULT_STAGE_TIMEOUT = float(os.environ.get("SOC_STAGE_TIMEOUT", "600"))
+
+class Stage:
+    """
+    One output stage of a report part.
+
+    ``fn`` is called with the results of ``deps``, in order, as positional
+    arguments. ``timeout`` is in seconds from the moment the stage starts.
+    """
+
+    def __init__(self, fn, deps=(), timeout=DEFAULT_STAGE_TIMEOUT):
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.timeout = timeout
+
+class PipelineError(RuntimeError):
+    """
+    Raised by ``run_stages`` with every failed stage, after all stages that
+    could run have finished.
+    """
+
+    def __init__(self, errors: dict, skipped=()):
+        self.errors = errors
+        self.skipped = tuple(skipped)
+        details = "; ".join(f"{name}: {type(e).__name__}: {e}" for name, e in errors.items())
+        if self.skipped:
+            details += f" (skipped: {', '.join(self.skipped)})"
+        super().__init__(f"{len(errors)} stage(s) failed: {details}")
+
+def run_stages(stages: dict) -> dict:
+    """
+    Runs a DAG of ``Stage`` objects, starting every stage as soon as its
+    dependencies have finished, so independent stages run concurrently.
+
+    Stages whose dependencies failed are skipped. A stage that exceeds its
+    timeout is reported as failed; its thread is abandoned, not killed.
+
+    Returns:
+        A dict mapping stage name to result.
+
+    Raises:
+        PipelineError: if any stage failed or timed out.
+    """
+    for name, stage in stages.items():
+        unknown = [d for d in stage.deps if d not in stages]
+        if unknown:
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s): {', '.join(unknown)}")
+
+    results, errors, skipped = {}, {}, []
+    waiting = dict(stages)
+    running = {}  # future -> (name, deadline)
+    executor = ThreadPoolExecutor(max_workers=max(len(stages), 1), thread_name_prefix="soc-stage")
+    try:
+        while waiting or running:
+            for name, stage in list(waiting.items()):
+                if any(d in errors or d in skipped for d in stage.deps):
+                    skipped.append(name)
+                    del waiting[name]
+                elif all(d in results for d in stage.deps):
+                    future = submit_with_context(executor, stage.fn, *(results[d] for d in stage.deps))
+                    running[future] = (name, time.monotonic() + stage.timeout if stage.timeout else None)
+                    del waiting[name]
+
+            if not running:
+                if waiting:
+                    raise ValueError(f"Dependency cycle between stages: {', '.join(waiting)}")
+                break
+
+            deadlines = [d for _, d in running.values() if d is not None]
+            wait_for = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+            done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name, _ = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = e
+
+            now = time.monotonic()
+            for future, (name, deadline) in list(running.items()):
+                if deadline is not None and now >= deadline and not future.done():
+                    errors[name] = TimeoutError(f"Stage '{name}' timed out after {stages[name].timeout}s")
+                    del running[future]
+    finally:
+        # Do not block on abandoned (timed-out) stages
+        executor.shutdown(wait=False)
+
+    if errors:
+        raise PipelineError(errors, skipped)
+    return results
+
+# PDF engines for Part I & II: LibreOffice renders the generated DOCX, XeLaTeX
+# lays out the extracted sections directly and runs alongside the DOCX stage
+PART_I_II_PDF_ENGINES = ("libreoffice", "xelatex")
+DEFAULT_PART_I_II_PDF_ENGINE = os.environ.get("SOC_PART_I_II_PDF_ENGINE", "libreoffice")
+
 output_dir = os.path.join(os.getcwd(), "generated_reports")
 os.makedirs(output_dir, exist_ok=True)
 
@@ -37,68 +153,234 @@ def make_final_output_base(prefix):
     return os.path.join(output_dir, f"{prefix}")
 
 # === Part I & II: MA & AR Word Input ===
-def generate_part_i_ii(word_file, base_name: str = "Part_I_II"):
-    output_base = os.path.join("generated_reports", base_name)
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def _render_part_i_ii(word_bytes, output_base, pdf_engine, progress):
     output_dir = os.path.dirname(output_base)
 
+    def to_pdf(docx_path):
+        progress("Converting Part I & II to PDF...")
+        return convert_docx_to_pdf(docx_path, output_dir)
+
+    # Parsed once; both outputs render from the same Report
+    stages = {
+        "parse": Stage(lambda: parse_ma_ar_report(upload_view(word_bytes))),
+        "docx": Stage(lambda report: render_report_docx(report, output_base), deps=("parse",)),
+    }
+    if pdf_engine == "xelatex":
+        stages["pdf"] = Stage(lambda report: render_report_pdf(report, output_base, progress), deps=("parse",))
+    else:
+        # LibreOffice renders the PDF from the DOCX produced above
+        stages["pdf"] = Stage(to_pdf, deps=("docx",))
+    results = run_stages(stages)
+    return results["pdf"], results["docx"]
+
+def render_sections(report, output_base, progress: ProgressCallback = null_progress):
+    """
+    Renders each section of ``report`` on its own, the PDF with XeLaTeX,
+    and concatenates the fragments into ``output_base`` .docx and .pdf.
+
+    Fragments are cached by section fingerprint, so only sections whose
+    content changed are rendered again. Every section starts on a new page
+    and the LaTeX report template sets \\pagestyle{empty}, so the result
+    reads like a single render.
+
+    Returns:
+        (pdf_path, docx_path)
+    """
+    settings = dict(render_settings(), pdf_engine="xelatex")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fragments, keys, stages = {}, {}, {}
+        for section in report.sections:
+            base = os.path.join(tmp_dir, section.key)
+            keys[section.key] = output_cache.make_key("report_section", [section.fingerprint()], settings)
+            fragments[section.key] = output_cache.fetch(keys[section.key], base, (".pdf", ".docx"))
+            if fragments[section.key]:
+                continue
+            part = Report((section,))
+            stages[section.key + ".docx"] = Stage(lambda part=part, base=base: render_report_docx(part, base))
+            stages[section.key + ".pdf"] = Stage(lambda part=part, base=base, name="part1_2_" + section.key:
+                                                 render_report_pdf(part, base, progress, name))
+
+        changed = [key for key, cached in fragments.items() if not cached]
+        annotate(sections=len(fragments), sections_rendered=len(changed))
+        if changed:
+            progress(f"Rendering {len(changed)} changed section(s) of Part I & II...")
+            results = run_stages(stages)
+            for key in changed:
+                fragments[key] = {".pdf": results[key + ".pdf"], ".docx": results[key + ".docx"]}
+                output_cache.put(keys[key], fragments[key])
+
+        with trace_stage("merge_sections"):
+            docx_path = merge_docx([_read_file(f[".docx"]) for f in fragments.values()], output_base + ".docx",
+                                   outline=False)
+            pdf_path = merge_pdfs([_read_file(f[".pdf"]) for f in fragments.values()], output_base + ".pdf")
+    return pdf_path, docx_path
+
+@traced("part_i_ii")
+def generate_part_i_ii(word_file, base_name: str = "Part_I_II", progress: ProgressCallback = null_progress,
+                       pdf_engine: str = DEFAULT_PART_I_II_PDF_ENGINE, output_dir: str = "generated_reports"):
+    if pdf_engine not in PART_I_II_PDF_ENGINES:
+        raise ValueError(f"Unknown PDF engine '{pdf_engine}', expected one of: {', '.join(PART_I_II_PDF_ENGINES)}")
+    output_base = os.path.join(output_dir, base_name)
+
     os.makedirs(output_dir, exist_ok=True)
 
-    # Save uploaded file to temporary disk
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp_word:
-        tmp_word.write(word_file.read())
-        tmp_word_path = tmp_word.name
+    word_bytes = read_upload(word_file)
+    annotate(input_bytes=len(word_bytes), pdf_engine=pdf_engine)
+    cache_key = output_cache.make_key("part_i_ii", [word_bytes], dict(render_settings(), pdf_engine=pdf_engine))
+    cached = output_cache.fetch(cache_key, output_base, (".pdf", ".docx"))
+    if cached:
+        return cached[".pdf"], cached[".docx"]
 
-    try:
-        docx_path = generate_ma_ar_docx(tmp_word_path, word_file, output_base)
-        pdf_path = convert_docx_to_pdf(docx_path, output_dir)
-    finally:
-        # ✅ This ensures the file is always cleaned up, even on error
-        os.remove(tmp_word_path)
+    progress("Generating Part I & II...")
+    if pdf_engine == "xelatex" and output_cache.enabled and pdf_merge_available():
+        # Sections are cached on their own, so an edit re-renders only the sections it touched.
+        # Not with LibreOffice: every section would cost a conversion of its own.
+        pdf_path, docx_path = render_sections(parse_ma_ar_report(upload_view(word_bytes)), output_base, progress)
+    else:
+        pdf_path, docx_path = _render_part_i_ii(word_bytes, output_base, pdf_engine, progress)
 
+    output_cache.put(cache_key, {".pdf": pdf_path, ".docx": docx_path})
     return pdf_path, docx_path
 
 # === Part III & IV: Excel Input ===
-def generate_part_iii_iv(excel_file):
-    excel_path = save_uploaded_file(excel_file, ".xlsx")
-    df = pd.read_excel(excel_path)
+@traced("part_iii_iv")
+def generate_part_iii_iv(excel_file, progress: ProgressCallback = null_progress, output_dir: str = None):
+    excel_bytes = read_upload(excel_file)
+    annotate(input_bytes=len(excel_bytes))
+    cache_key = output_cache.make_key("part_iii_iv", [excel_bytes])
+    output_base = os.path.join(output_dir or tempfile.gettempdir(), f"part3_4_{cache_key[:16]}")
+    cached = output_cache.fetch(cache_key, output_base, (".pdf", ".docx"))
+    if cached:
+        return output_base
+
+    # Each output streams the workbook on its own, so neither holds the whole sheet
+    results = run_stages({
+        "pdf": Stage(lambda: generate_controls_pdf(iter_control_chunks(upload_view(excel_bytes)), output_base, progress)),
+        "docx": Stage(lambda: generate_controls_docx(iter_control_chunks(upload_view(excel_bytes)), output_base)),
+    })
+    pdf_path, docx_path = results["pdf"], results["docx"]
+
+    output_cache.put(cache_key, {".pdf": pdf_path, ".docx": docx_path})
+    return output_base
 
-    # TODO: Convert each control/test into LaTeX entries, check 'latex word generation'
-    tex_content = r"""
-    \documentclass{article}
-    \usepackage[margin=1in]{geometry}
-    \begin{document}
-    \section*{Description of Controls and Testing Procedures}
-    Sample content from Excel goes here.
-    \end{document}
+# === Final Report Assembly ===
+def _upload_name(uploaded_file):
+    return os.path.basename(getattr(uploaded_file, "name", "") or "")
+
+def ingest_final_report_parts(files, pdf_files=()):
     """
+    Reads, validates and parses the final report's part uploads, see
+    ``part_ingest.ingest_parts``.
 
-    tex_path = excel_path.replace(".xlsx", ".tex")
-    with open(tex_path, "w") as f:
-        f.write(tex_content)
+    Raises:
+        PartValidationError: if the parts cannot be assembled.
+    """
+    return ingest_parts([(_upload_name(f), read_upload(f)) for f in files],
+                        [(_upload_name(f), read_upload(f)) for f in pdf_files])
 
-    with st.spinner("Generating Part III & IV..."):
-        pdf_path = render_latex_to_pdf(tex_path)
-        docx_path = convert_tex_to_docx(tex_path)
+def convert_part_to_pdf(part, work_dir):
+    """
+    Converts one ingested DOCX part to PDF with LibreOffice, reusing the PDF
+    cached for the same part content.
 
-    return tex_path.replace(".tex", "")
+    Returns:
+        The path of the PDF in ``work_dir``.
+    """
+    key = output_cache.make_key("part_pdf", [bytes.fromhex(part.digest)])
+    base = os.path.join(work_dir, f"part_{part.digest[:16]}")
+    cached = output_cache.fetch(key, base, (".pdf",))
+    if cached:
+        return cached[".pdf"]
+    with open(base + ".docx", "wb") as f:
+        f.write(part.data)
+    pdf_path = convert_docx_to_pdf(base + ".docx", work_dir)
+    output_cache.put(key, {".pdf": pdf_path})
+    return pdf_path
 
-# === Final Report Assembly ===
-def generate_final_report(files):
-    combined_tex = r"""
-    \documentclass{article}
-    \usepackage[margin=1in]{geometry}
-    \begin{document}
-    \section*{SOC Report}
-    Placeholder for merged content.
-    \end{document}
-    """
-    tmp_dir = tempfile.mkdtemp()
-    tex_path = os.path.join(tmp_dir, "soc_final.tex")
-    with open(tex_path, "w") as f:
-        f.write(combined_tex)
-
-    with st.spinner("Generating final report..."):
-        pdf_path = render_latex_to_pdf(tex_path)
-        docx_path = convert_tex_to_docx(tex_path)
-
-    return tex_path.replace(".tex", "")
+def generate_final_report(files, progress: ProgressCallback = null_progress, pdf_files=(), output_dir: str = None):
+    """
+    Assembles the final report from already-generated part files, without
+    re-rendering them; see ``assemble_final_report``.
+
+    Raises:
+        PartValidationError: if the parts cannot be assembled.
+    """
+    return assemble_final_report(ingest_final_report_parts(files, pdf_files), progress, output_dir)
+
+@traced("final_report")
+def assemble_final_report(parts, progress: ProgressCallback = null_progress, output_dir: str = None):
+    """
+    Assembles the final report from validated parts.
+
+    The DOCX parts, already in report order, are spliced together and each
+    section heading is bookmarked at outline level 1. The PDF concatenates
+    each part's PDF with matching bookmarks; parts uploaded without one are
+    converted on their own with LibreOffice (``convert_part_to_pdf``). Without pypdf, the merged DOCX
+    is converted instead.
+
+    Args:
+        parts: The ``IngestedParts`` of ``ingest_final_report_parts``; the
+            DOCX packages are consumed.
+        output_dir: Folder for the outputs, the system temp folder by default.
+
+    Returns:
+        The output path without extension; ``.docx`` and ``.pdf`` exist next to it.
+    """
+    stems = [part.stem for part in parts.docx]
+    pdf_stems = sorted(parts.pdf)
+    annotate(input_bytes=sum(len(part.data) for part in parts.docx) + sum(len(part.data) for part in parts.pdf.values()),
+             parts=len(parts.docx))
+    cache_key = output_cache.make_key(
+        "final_report", [bytes.fromhex(part.digest) for part in parts.docx]
+        + [bytes.fromhex(parts.pdf[stem].digest) for stem in pdf_stems],
+        dict(render_settings(), part_names=stems, pdf_names=pdf_stems))
+    output_base = os.path.join(output_dir or tempfile.gettempdir(), f"soc_final_{cache_key[:16]}")
+    cached = output_cache.fetch(cache_key, output_base, (".pdf", ".docx"))
+    if cached:
+        return output_base
+
+    # One bookmark per section, at its heading in the first part that contains it
+    outline, seen = [], set()
+    for position, part in enumerate(parts.docx):
+        for section in part.sections:
+            if section not in seen:
+                seen.add(section)
+                outline.append((SECTION_TITLES[section], position, section))
+
+    def merge_word():
+        with trace_stage("merge_docx") as span:
+            path = merge_docx([part.package for part in parts.docx], output_base + ".docx")
+            span.record_file("output", path)
+        return path
+
+    def merge_pdf(*converted):
+        payloads = dict(zip(missing, map(_read_file, converted)))
+        with trace_stage("merge_pdf") as span:
+            path = merge_pdfs([parts.pdf[stem].data if stem in parts.pdf else payloads[stem] for stem in stems],
+                              output_base + ".pdf", outline)
+            span.record_file("output", path)
+        return path
+
+    progress("Assembling final report...")
+    missing = [stem for stem in stems if stem not in parts.pdf]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stages = {"docx": Stage(merge_word)}
+        if pdf_merge_available():
+            # Parts without a PDF are converted one by one and cached by content,
+            # so after an edit only the changed part goes through LibreOffice
+            for part in parts.docx:
+                if part.stem in missing:
+                    stages["pdf:" + part.stem] = Stage(lambda part=part: convert_part_to_pdf(part, tmp_dir))
+            stages["pdf"] = Stage(merge_pdf, deps=tuple("pdf:" + stem for stem in missing))
+        else:
+            stages["pdf"] = Stage(lambda docx_path: convert_docx_to_pdf(docx_path, os.path.dirname(output_base)),
+                                  deps=("docx",))
+        results = run_stages(stages)
+    pdf_path, docx_path = results["pdf"], results["docx"]
+
+    output_cache.put(cache_key, {".pdf": pdf_path, ".docx": docx_path})
+    return output_base
@@ -0,0 +1,216 @@
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_ARTIFACT_DIR = os.environ.get("SOC_ARTIFACT_DIR", os.path.join(os.getcwd(), "generated_reports", "sessions"))
+DEFAULT_MAX_BYTES = int(os.environ.get("SOC_ARTIFACT_MAX_BYTES", str(1024 * 1024 * 1024)))
+DEFAULT_TTL_SECONDS = float(os.environ.get("SOC_ARTIFACT_TTL", str(4 * 3600)))
+DEFAULT_JANITOR_INTERVAL = float(os.environ.get("SOC_ARTIFACT_JANITOR_INTERVAL", "300"))
+
+# Scratch directories of running jobs; eviction only removes stale ones
+WORK_DIR = ".work"
+_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+logger = logging.getLogger(__name__)
+
+
+def _check_id(value):
+    # Ids become path components, so nothing that could escape the store root
+    if not isinstance(value, str) or not _ID_PATTERN.fullmatch(value):
+        raise ValueError(f"Invalid artifact id {value!r}")
+    return value
+
+
+class ArtifactStore:
+    """
+    On-disk store of generated files, one directory per session and job:
+    ``root/<session_id>/<job_id>/<name>``.
+
+    Jobs build their outputs in a private ``workspace`` and ``publish``
+    them in one rename, so readers never see a partial file and concurrent
+    sessions never share a path. Job directories are evicted least recently
+    used first once the total size exceeds ``max_bytes``, and unconditionally
+    ``ttl_seconds`` after they were last read.
+    """
+
+    def __init__(self, root=DEFAULT_ARTIFACT_DIR, max_bytes=DEFAULT_MAX_BYTES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._janitor = None
+        self._stop = threading.Event()
+
+    def _job_dir(self, session_id, job_id):
+        return os.path.join(self.root, _check_id(session_id), _check_id(job_id))
+
+    @contextmanager
+    def workspace(self, session_id, job_id):
+        """
+        Yields a scratch directory for one job, removed when the block exits.
+        """
+        work_root = os.path.join(self.root, WORK_DIR)
+        os.makedirs(work_root, exist_ok=True)
+        path = tempfile.mkdtemp(prefix=f"{_check_id(session_id)}-{_check_id(job_id)}-", dir=work_root)
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def publish(self, session_id, job_id, artifacts: dict, cancel_event=None) -> dict:
+        """
+        Moves ``artifacts`` (name -> path) into the job's directory,
+        replacing anything published for that job before. If ``cancel_event``
+        is set by then, the artifacts are discarded instead, so a job that
+        was reset while running cannot publish after ``remove``.
+
+        Returns:
+            A dict mapping each name to its stored path, or None when discarded.
+        """
+        job_dir = self._job_dir(session_id, job_id)
+        session_dir = os.path.dirname(job_dir)
+        with self._lock:
+            # Under the lock: eviction removes session directories once empty
+            os.makedirs(session_dir, exist_ok=True)
+            tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=session_dir)
+        try:
+            for name, path in artifacts.items():
+                shutil.move(path, os.path.join(tmp_dir, os.path.basename(name)))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        with self._lock:
+            if cancel_event is not None and cancel_event.is_set():
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return None
+            shutil.rmtree(job_dir, ignore_errors=True)
+            os.rename(tmp_dir, job_dir)
+            self._evict(keep=job_dir)
+        return {name: os.path.join(job_dir, os.path.basename(name)) for name in artifacts}
+
+    def path(self, session_id, job_id, name):
+        """
+        Returns the stored path of ``name``, or None once it has been evicted.
+        """
+        job_dir = self._job_dir(session_id, job_id)
+        path = os.path.join(job_dir, os.path.basename(name))
+        with self._lock:
+            if not os.path.exists(path):
+                return None
+            # Directory mtime doubles as the LRU access time
+            os.utime(job_dir)
+        return path
+
+    def open(self, session_id, job_id, name):
+        """
+        Opens a stored artifact for reading, or returns None if it is gone;
+        the caller closes the file.
+        """
+        path = self.path(session_id, job_id, name)
+        if path is None:
+            return None
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            # Evicted between the lookup and the open
+            return None
+
+    def remove(self, session_id, job_id=None):
+        """
+        Deletes one job's artifacts, or the whole session's without ``job_id``.
+        """
+        path = self._job_dir(session_id, job_id) if job_id else os.path.join(self.root, _check_id(session_id))
+        with self._lock:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _entries(self):
+        for session in os.listdir(self.root):
+            session_dir = os.path.join(self.root, session)
+            if session.startswith(".") or not os.path.isdir(session_dir):
+                continue
+            for job in os.listdir(session_dir):
+                job_dir = os.path.join(session_dir, job)
+                if job.startswith(".") or not os.path.isdir(job_dir):
+                    continue
+                size = sum(os.path.getsize(os.path.join(job_dir, f)) for f in os.listdir(job_dir))
+                yield os.path.getmtime(job_dir), size, job_dir
+
+    def _evict(self, keep=None):
+        if not os.path.isdir(self.root):
+            return
+        now = time.time()
+        entries = []
+        for mtime, size, job_dir in self._entries():
+            if job_dir != keep and now - mtime > self.ttl_seconds:
+                shutil.rmtree(job_dir, ignore_errors=True)
+            else:
+                entries.append((mtime, size, job_dir))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, job_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if job_dir == keep:
+                continue
+            shutil.rmtree(job_dir, ignore_errors=True)
+            total -= size
+
+        for session in os.listdir(self.root):
+            session_dir = os.path.join(self.root, session)
+            if not session.startswith(".") and os.path.isdir(session_dir) and not os.listdir(session_dir):
+                os.rmdir(session_dir)
+
+        # Workspaces left behind by a crashed process
+        work_root = os.path.join(self.root, WORK_DIR)
+        if os.path.isdir(work_root):
+            for name in os.listdir(work_root):
+                path = os.path.join(work_root, name)
+                if now - os.path.getmtime(path) > self.ttl_seconds:
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def evict(self):
+        """
+        Drops expired job directories and enforces the size cap.
+        """
+        with self._lock:
+            self._evict()
+
+    def total_bytes(self):
+        if not os.path.isdir(self.root):
+            return 0
+        with self._lock:
+            return sum(size for _, size, _ in self._entries())
+
+    def start_janitor(self, interval=DEFAULT_JANITOR_INTERVAL):
+        """
+        Runs ``evict`` every ``interval`` seconds on a daemon thread, so
+        artifacts of sessions that never come back are still removed.
+        """
+        if self._janitor is not None:
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.evict()
+                except OSError as e:
+                    logger.warning("Artifact eviction failed: %s", e)
+
+        self._janitor = threading.Thread(target=loop, name="soc-artifact-janitor", daemon=True)
+        self._janitor.start()
+
+    def stop_janitor(self):
+        if self._janitor is not None:
+            self._stop.set()
+            self._janitor.join()
+            self._janitor = None
+
+
+artifact_store = ArtifactStore()
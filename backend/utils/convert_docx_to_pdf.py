@@ -1,21 +1,62 @@
+import logging
 import subprocess
 import os
+import tempfile
+
+from backend.utils.soffice_pool import get_converter_pool
+from backend.utils.tool_limits import tool_slot
+from backend.utils.tool_runner import run_tool
+from backend.utils.tracing import trace_stage
+
+logger = logging.getLogger(__name__)
+
 
 def convert_docx_to_pdf(docx_path: str, output_dir: str) -> str:
     """
     Converts a DOCX file to PDF using LibreOffice in headless mode.
+
+    Uses the shared pool of warm soffice workers when available and falls
+    back to a one-off ``libreoffice --headless`` process otherwise.
     Returns the path to the generated PDF.
     """
-    try:
-        subprocess.run([
-            "libreoffice",
-            "--headless",
-            "--convert-to", "pdf",
-            docx_path,
-            "--outdir", output_dir
-        ], check=True)
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"Failed to convert DOCX to PDF: {e}")
+    pool = get_converter_pool()
+    if pool is not None:
+        try:
+            with tool_slot("libreoffice"), trace_stage("libreoffice", engine="pool") as span:
+                span.record_file("input", docx_path)
+                pdf_path = pool.convert(docx_path, output_dir)
+                span.record_file("output", pdf_path)
+            return pdf_path
+        except Exception as e:
+            logger.warning("Converter pool failed for %s, falling back to subprocess: %s", docx_path, e)
+
+    return convert_docx_to_pdf_subprocess(docx_path, output_dir)
+
+
+def convert_docx_to_pdf_subprocess(docx_path: str, output_dir: str) -> str:
+    """
+    Converts a DOCX file to PDF with a cold ``libreoffice --headless`` spawn.
 
+    Each call gets its own throwaway user profile, like the pool workers, so
+    concurrent conversions do not fight over the default profile's lock.
+    """
     pdf_path = os.path.join(output_dir, os.path.splitext(os.path.basename(docx_path))[0] + ".pdf")
+    with trace_stage("libreoffice", engine="subprocess") as span, \
+            tempfile.TemporaryDirectory(prefix="soffice_profile_") as profile_dir:
+        span.record_file("input", docx_path)
+        try:
+            run_tool([
+                "libreoffice",
+                f"-env:UserInstallation=file://{profile_dir}",
+                "--headless",
+                "--convert-to", "pdf",
+                docx_path,
+                "--outdir", output_dir
+            ])
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Failed to convert DOCX to PDF: {e}")
+        if not os.path.exists(pdf_path):
+            raise RuntimeError(f"LibreOffice produced no PDF for {docx_path}")
+        span.record_file("output", pdf_path)
+
     return pdf_path
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = int(os.environ.get("SOC_JOB_WORKERS", "4"))
+DEFAULT_PER_SESSION_LIMIT = int(os.environ.get("SOC_JOBS_PER_SESSION", "2"))
+DEFAULT_RETENTION_SECONDS = float(os.environ.get("SOC_JOB_RETENTION", "3600"))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATES = (PENDING, RUNNING)
+
+
+class JobLimitError(RuntimeError):
+    """Raised when a session already has its maximum number of active jobs."""
+
+
+class Job:
+    """
+    State of one submitted report-generation job.
+
+    ``cancel_event`` is set when cancellation is requested; work that is
+    already running cannot be interrupted, but its result is discarded.
+    ``progress`` holds the latest message reported by the job, if any.
+    """
+
+    def __init__(self, session_id, label):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.label = label
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.progress = None
+
+    def report_progress(self, message: str):
+        # A ProgressCallback; a plain attribute write is atomic enough for display
+        self.progress = message
+
+    @property
+    def active(self):
+        return self.status in ACTIVE_STATES
+
+
+class JobManager:
+    """
+    Runs report generation on a shared thread pool so UI reruns never wait
+    on XeLaTeX, pandoc or LibreOffice.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, per_session_limit=DEFAULT_PER_SESSION_LIMIT,
+                 retention_seconds=DEFAULT_RETENTION_SECONDS):
+        self.per_session_limit = per_session_limit
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="soc-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, session_id, label, fn, *args, with_progress=False, with_cancel_event=False, **kwargs) -> Job:
+        """
+        Queues ``fn(*args, **kwargs)``. With ``with_progress``, ``fn`` also
+        receives ``progress=job.report_progress``; with ``with_cancel_event``,
+        ``cancel_event=job.cancel_event``.
+
+        Raises:
+            JobLimitError: if the session already has its maximum of active jobs.
+        """
+        with self._lock:
+            self._prune()
+            active = [j for j in self._jobs.values() if j.session_id == session_id and j.active]
+            if len(active) >= self.per_session_limit:
+                raise JobLimitError(
+                    f"At most {self.per_session_limit} reports can be generated at once per session")
+            job = Job(session_id, label)
+            if with_progress:
+                kwargs = dict(kwargs, progress=job.report_progress)
+            if with_cancel_event:
+                kwargs = dict(kwargs, cancel_event=job.cancel_event)
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        with self._lock:
+            if job.cancel_event.is_set():
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                return
+            job.status = RUNNING
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            error, result = e, None
+        else:
+            error = None
+        with self._lock:
+            job.finished_at = time.time()
+            if job.cancel_event.is_set():
+                job.status = CANCELLED
+            elif error is not None:
+                job.status, job.error = FAILED, error
+            else:
+                job.status, job.result = DONE, result
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs_for_session(self, session_id):
+        with self._lock:
+            return [j for j in self._jobs.values() if j.session_id == session_id]
+
+    def cancel(self, job_id) -> bool:
+        """
+        Requests cancellation. Pending jobs never start; running jobs finish
+        in the background and are reported as cancelled.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return False
+            job.cancel_event.set()
+            if job.status == PENDING and job.future.cancel():
+                job.status = CANCELLED
+                job.finished_at = time.time()
+            return True
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [i for i, j in self._jobs.items() if not j.active and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,311 @@
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+from backend.utils.tool_runner import run_tool
+from backend.utils.tracing import trace_stage
+
+try:
+    import fcntl
+except ImportError:  # Windows: workspaces are only locked within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUILD_DIR = os.environ.get("SOC_LATEX_BUILD_DIR", os.path.join(os.getcwd(), "generated_reports", ".latex_build"))
+USE_PREAMBLE_FORMAT = os.environ.get("SOC_LATEX_FORMAT", "1") != "0"
+DEFAULT_MAX_PASSES = 3
+# Parallel builds of the same report each get their own copy of its workspace
+DEFAULT_WORKSPACE_SLOTS = int(os.environ.get("SOC_LATEX_WORKSPACE_SLOTS", str(os.cpu_count() or 1)))
+# Workspaces (and their slot copies) unused for longer than the TTL, or
+# beyond the newest DEFAULT_MAX_WORKSPACES, are removed after each build
+DEFAULT_MAX_WORKSPACES = int(os.environ.get("SOC_LATEX_MAX_WORKSPACES", "32"))
+DEFAULT_WORKSPACE_TTL = float(os.environ.get("SOC_LATEX_WORKSPACE_TTL", str(7 * 24 * 3600)))
+FORMAT_DIR = "formats"
+
+# Marker emitted by latex_document_wrapper between the dumpable package
+# preamble and the font setup. It expands to \relax unless mylatexformat
+# defines \endofdump, so documents still compile without a format.
+ENDOFDUMP = r"\csname endofdump\endcsname"
+
+# Files whose change means cross-references or the TOC need another pass
+AUX_EXTENSIONS = (".aux", ".toc", ".lof", ".lot", ".out")
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class _WorkspaceLock:
+    """
+    Serializes builds in one workspace across threads and, where fcntl is
+    available, across processes.
+    """
+
+    def __init__(self, directory):
+        with _locks_guard:
+            self._thread_lock = _locks.setdefault(directory, threading.Lock())
+        self._path = os.path.join(directory, ".lock")
+        self._file = None
+
+    def acquire(self, blocking=True):
+        """
+        Returns False instead of waiting when ``blocking`` is false and
+        another build holds the workspace.
+        """
+        if not self._thread_lock.acquire(blocking):
+            return False
+        while fcntl is not None:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            self._file = open(self._path, "w")
+            try:
+                fcntl.flock(self._file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                self._file.close()
+                self._file = None
+                self._thread_lock.release()
+                return False
+            if self._still_linked():
+                break
+            # Another process evicted the workspace while we waited for it
+            self._file.close()
+        return True
+
+    def _still_linked(self):
+        try:
+            return os.path.samestat(os.fstat(self._file.fileno()), os.stat(self._path))
+        except OSError:
+            return False
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+@contextmanager
+def _claim_workspace(build_dir, build_name, slots):
+    """
+    Locks and yields the first free workspace among ``build_name``,
+    ``build_name-1``, ... ``build_name-(slots-1)``, waiting for the first
+    one when all are busy.
+    """
+    candidates = [build_name] + [f"{build_name}-{i}" for i in range(1, max(slots, 1))]
+    for blocking, names in ((False, candidates), (True, candidates[:1])):
+        for name in names:
+            workspace = os.path.join(build_dir, name)
+            os.makedirs(workspace, exist_ok=True)
+            lock = _WorkspaceLock(workspace)
+            if lock.acquire(blocking):
+                try:
+                    os.makedirs(workspace, exist_ok=True)
+                    # The directory's mtime orders workspaces for eviction
+                    os.utime(workspace)
+                    yield workspace
+                finally:
+                    lock.release()
+                return
+
+
+def _aux_digest(workspace, jobname):
+    digest = {}
+    for ext in AUX_EXTENSIONS:
+        path = os.path.join(workspace, jobname + ext)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest[ext] = hashlib.sha256(f.read()).hexdigest()
+    return digest
+
+
+def _remove_aux(workspace, jobname):
+    # Do not let aux files from a failed build poison the next one
+    for ext in AUX_EXTENSIONS:
+        try:
+            os.remove(os.path.join(workspace, jobname + ext))
+        except OSError:
+            pass
+
+
+def _run_xelatex(args, cwd, env=None):
+    run_tool(["xelatex", "-interaction=nonstopmode", "-halt-on-error", *args], cwd=cwd, env=env)
+
+
+def _preamble_format(tex_source, format_dir, tex_path):
+    """
+    Returns the name of a precompiled format for the document's package
+    preamble, building it with mylatexformat on first use. Returns None when
+    the document has no ENDOFDUMP marker or the format cannot be built.
+    """
+    if ENDOFDUMP not in tex_source:
+        return None
+    preamble = tex_source.split(ENDOFDUMP, 1)[0]
+    name = "soc_" + hashlib.sha256(preamble.encode("utf-8")).hexdigest()[:16]
+    fmt_path = os.path.join(format_dir, name + ".fmt")
+    failed_marker = os.path.join(format_dir, name + ".failed")
+
+    os.makedirs(format_dir, exist_ok=True)
+    with _WorkspaceLock(format_dir):
+        if os.path.exists(fmt_path):
+            return name
+        if os.path.exists(failed_marker):
+            return None
+
+        start = time.perf_counter()
+        with trace_stage("xelatex_format", format=name):
+            # Success is judged by the .fmt file below, not the exit code
+            try:
+                run_tool(["xelatex", "-ini", "-interaction=nonstopmode", f"-jobname={name}",
+                          f"-output-directory={format_dir}", "&xelatex", "mylatexformat.ltx", tex_path],
+                         cwd=format_dir, check=False)
+            except subprocess.TimeoutExpired:
+                pass
+        if not os.path.exists(fmt_path):
+            logger.warning("Could not build preamble format %s, compiling without it", name)
+            open(failed_marker, "w").close()
+            return None
+        logger.info("Built preamble format %s in %.2fs", name, time.perf_counter() - start)
+        return name
+
+
+def evict_workspaces(build_dir=DEFAULT_BUILD_DIR, max_workspaces=DEFAULT_MAX_WORKSPACES,
+                     ttl_seconds=DEFAULT_WORKSPACE_TTL):
+    """
+    Removes workspaces unused for more than ``ttl_seconds`` and the least
+    recently used ones beyond ``max_workspaces``. Workspaces with a build
+    in progress are kept.
+
+    Returns:
+        The names of the removed workspaces.
+    """
+    try:
+        names = [n for n in os.listdir(build_dir) if n != FORMAT_DIR and os.path.isdir(os.path.join(build_dir, n))]
+    except FileNotFoundError:
+        return []
+    entries = []
+    for name in names:
+        try:
+            entries.append((os.path.getmtime(os.path.join(build_dir, name)), name))
+        except OSError:
+            pass
+    entries.sort(reverse=True)
+
+    now, removed = time.time(), []
+    for i, (mtime, name) in enumerate(entries):
+        if i < max_workspaces and now - mtime <= ttl_seconds:
+            continue
+        workspace = os.path.join(build_dir, name)
+        lock = _WorkspaceLock(workspace)
+        if not lock.acquire(blocking=False):
+            continue
+        try:
+            shutil.rmtree(workspace, ignore_errors=True)
+        finally:
+            lock.release()
+        removed.append(name)
+    if removed:
+        logger.info("Evicted %d LaTeX workspace(s): %s", len(removed), ", ".join(removed))
+    return removed
+
+
+def compile_latex(tex_path, build_name, build_dir=None, max_passes=DEFAULT_MAX_PASSES,
+                  use_format=USE_PREAMBLE_FORMAT, slots=DEFAULT_WORKSPACE_SLOTS):
+    """
+    Compiles ``tex_path`` with xelatex in a persistent workspace.
+
+    The workspace ``build_dir/build_name`` keeps .aux/.toc files between
+    builds of the same report, so a rebuild whose cross-references did not
+    change needs a single pass. Further passes run only while the aux files
+    keep changing, up to ``max_passes``. The package preamble is loaded
+    from a precompiled format when possible. Concurrent builds of the same
+    report use up to ``slots`` sibling workspaces instead of queueing.
+    ``build_name`` should name the kind of report rather than its content,
+    so an edited report still finds its aux files; stale workspaces are
+    evicted after the build, see ``evict_workspaces``.
+
+    Returns:
+        (pdf_path, pass_timings) where pdf_path is inside the workspace and
+        pass_timings lists the wall time of each xelatex pass in seconds.
+    """
+    build_dir = build_dir or DEFAULT_BUILD_DIR
+    jobname = build_name
+
+    with open(tex_path, encoding="utf-8") as f:
+        tex_source = f.read()
+
+    with _claim_workspace(build_dir, build_name, slots) as workspace:
+        work_tex = os.path.join(workspace, jobname + ".tex")
+        with open(work_tex, "w", encoding="utf-8") as f:
+            f.write(tex_source)
+        pdf_path = os.path.join(workspace, jobname + ".pdf")
+
+        format_dir = os.path.join(build_dir, FORMAT_DIR)
+        fmt = _preamble_format(tex_source, format_dir, work_tex) if use_format else None
+
+        timings = []
+        for attempt_fmt in ([fmt, None] if fmt else [None]):
+            args, env = [], None
+            if attempt_fmt:
+                args.append(f"-fmt={attempt_fmt}")
+                env = dict(os.environ, TEXFORMATS=format_dir + os.pathsep + os.environ.get("TEXFORMATS", ""))
+
+            if os.path.exists(pdf_path):
+                os.remove(pdf_path)
+            before = _aux_digest(workspace, jobname)
+            try:
+                for n in range(1, max_passes + 1):
+                    start = time.perf_counter()
+                    with trace_stage("xelatex", build=build_name, pass_number=n, format=attempt_fmt) as span:
+                        span.record_file("input", work_tex)
+                        _run_xelatex([*args, f"-jobname={jobname}", jobname + ".tex"], cwd=workspace, env=env)
+                        span.record_file("output", pdf_path)
+                    timings.append(time.perf_counter() - start)
+                    logger.info("xelatex pass %d for %s took %.2fs (format: %s)", n, build_name, timings[-1], attempt_fmt)
+                    after = _aux_digest(workspace, jobname)
+                    if after == before:
+                        break
+                    before = after
+            except subprocess.CalledProcessError:
+                if attempt_fmt is None:
+                    # An error in the document itself does not condemn the format
+                    _remove_aux(workspace, jobname)
+                    raise
+            except subprocess.TimeoutExpired:
+                _remove_aux(workspace, jobname)
+                raise
+
+            if os.path.exists(pdf_path) or attempt_fmt is None:
+                break
+            logger.warning("Compiling %s with format %s failed, retrying without it", build_name, attempt_fmt)
+            _remove_aux(workspace, jobname)
+
+        if not os.path.exists(pdf_path):
+            _remove_aux(workspace, jobname)
+        elif fmt and attempt_fmt is None:
+            # Only the format build failed, so later builds skip the format
+            with _WorkspaceLock(format_dir):
+                open(os.path.join(format_dir, fmt + ".failed"), "w").close()
+                try:
+                    os.remove(os.path.join(format_dir, fmt + ".fmt"))
+                except OSError:
+                    pass
+
+        # Evicting skips the workspace held here, so the PDF stays put
+        evict_workspaces(build_dir)
+        return pdf_path, timings
+
+
+def clear_build_dir(build_dir=DEFAULT_BUILD_DIR):
+    shutil.rmtree(build_dir, ignore_errors=True)
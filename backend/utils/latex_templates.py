@@ -0,0 +1,63 @@
+import functools
+import os
+
+from backend.utils.latex_utils import escape_latex
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates", "latex")
+
+
+class LatexSafe(str):
+    """
+    Text that is already LaTeX, such as pre-rendered table rows; templates
+    output it as is instead of escaping it.
+    """
+
+
+def _finalize(value):
+    # Every \VAR{} is escaped unless it is marked LatexSafe, so user text
+    # cannot reach xelatex unescaped by way of a template
+    if isinstance(value, LatexSafe):
+        return value
+    return escape_latex(str(value))
+
+
+@functools.lru_cache(maxsize=None)
+def get_environment():
+    """
+    Returns the shared Jinja2 environment for the LaTeX templates.
+
+    Delimiters are LaTeX-safe: ``\\BLOCK{...}`` for statements,
+    ``\\VAR{...}`` for values and ``\\#{...}`` for comments, so template
+    braces never clash with LaTeX braces. Templates are compiled once and
+    cached for the life of the process.
+    """
+    import jinja2
+
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+        block_start_string=r"\BLOCK{",
+        block_end_string="}",
+        variable_start_string=r"\VAR{",
+        variable_end_string="}",
+        comment_start_string=r"\#{",
+        comment_end_string="}",
+        trim_blocks=True,
+        lstrip_blocks=True,
+        keep_trailing_newline=True,
+        autoescape=False,
+        auto_reload=False,
+        finalize=_finalize,
+        undefined=jinja2.StrictUndefined,
+    )
+
+
+def render_latex_stream(name, **context):
+    """
+    Renders the template ``name`` chunk by chunk; iterables in ``context``
+    are consumed as the output is produced.
+    """
+    return get_environment().get_template(name).generate(**context)
+
+
+def render_latex(name, **context) -> str:
+    return "".join(render_latex_stream(name, **context))
@@ -1,83 +1,145 @@
-from pylatexenc.latexencode import unicode_to_latex
 from docx import Document
 from docx.shared import Pt
 from docx.oxml.ns import qn
+import logging
 import os
+import re
+import shutil
 import subprocess
-import streamlit as st
 
-def format_as_latex(text_list):
-    # Escape LaTeX special characters and join paragraphs
-    # Only escape actual LaTeX special characters — leave Chinese characters untouched
-    def escape_latex(text):
-        return (text.replace('\\', r'\textbackslash{}')
-                .replace('&', r'\&')
-                .replace('%', r'\%')
-                .replace('$', r'\$')
-                .replace('#', r'\#')
-                .replace('_', r'\_')
-                .replace('{', r'\{')
-                .replace('}', r'\}')
-                .replace('~', r'\textasciitilde{}')
-                .replace('^', r'\textasciicircum{}'))
+from backend.utils.latex_build import ENDOFDUMP, compile_latex
+
+logger = logging.getLogger(__name__)
+
+# Replacement for every character that is not safe in LaTeX text. This is
+# the only LaTeX escaping in the code base: every piece of user text goes
+# through it exactly once. Chinese text passes through unchanged.
+LATEX_ESCAPES = {
+    '\\': r'\textbackslash{}',
+    '&': r'\&',
+    '%': r'\%',
+    '$': r'\$',
+    '#': r'\#',
+    '_': r'\_',
+    '{': r'\{',
+    '}': r'\}',
+    '~': r'\textasciitilde{}',
+    '^': r'\textasciicircum{}',
+    '\n': r'\newline{}',
+    '\r': '',
+    # Other control characters are invalid input to XeLaTeX (^^L even ends the paragraph)
+    **{chr(c): '' for c in (*range(32), 0x7f) if chr(c) not in '\t\n\r'},
+}
+
+# One compiled character class plus a dispatch map. On CJK text this is
+# several times faster than str.translate, which looks up every character,
+# see benchmarks/bench_latex_escape.py.
+_LATEX_SPECIAL = re.compile("[" + "".join(re.escape(c) for c in LATEX_ESCAPES) + "]")
+
+def _latex_replacement(match):
+    return LATEX_ESCAPES[match.group()]
+
+def escape_latex(text):
+    """
+    Escapes LaTeX special characters in plain text, in one pass.
+    """
+    return _LATEX_SPECIAL.sub(_latex_replacement, text)
 
+def format_as_latex(text_list):
+    """
+    Escapes each paragraph and joins them with blank lines.
+    """
     return "\n\n".join(escape_latex(p) for p in text_list)
 
+def escape_latex_column(series):
+    """
+    Escapes LaTeX special characters across a whole pandas string column at once.
+    """
+    return series.str.replace(_LATEX_SPECIAL, _latex_replacement, regex=True)
+
+def latex_longtable_begin(headers, col_spec):
+    """
+    Opens a longtable whose header row repeats on every page.
+
+    Args:
+        headers: Plain header text for each column, escaped here.
+        col_spec: longtable column specification, e.g. ``|p{2cm}|p{4cm}|``.
+    """
+    header_row = " & ".join(rf"\textbf{{{escape_latex(h)}}}" for h in headers) + r" \\ \hline"
+    return "\n".join([
+        rf"\begin{{longtable}}{{{col_spec}}}",
+        r"\hline",
+        header_row,
+        r"\endfirsthead",
+        r"\hline",
+        header_row,
+        r"\endhead",
+    ]) + "\n"
+
+LATEX_LONGTABLE_END = r"\end{longtable}" + "\n"
+
+def latex_longtable_rows(df):
+    """
+    Renders every row of ``df`` as longtable rows, escaping column by column.
+    """
+    if df.empty:
+        return ""
+    rows = None
+    for column in df.columns:
+        escaped = escape_latex_column(df[column])
+        rows = escaped if rows is None else rows + " & " + escaped
+    return "\n".join((rows + r" \\ \hline").tolist()) + "\n"
+
 def format_paragraphs_to_latex(paragraphs, indent=False):
     """
-    Safely include paragraphs in LaTeX using raw Unicode (for XeLaTeX).
+    Escapes plain-text paragraphs and lays them out as LaTeX paragraphs.
+    Unicode text, including CJK, is kept as is for XeLaTeX.
     """
     return "\n\n".join(
-        (r"\par\noindent " if indent else "") + p for p in paragraphs
+        (r"\par\noindent " if indent else "") + escape_latex(p) for p in paragraphs
     )
 
-def latex_vspace_lines(lines=4):
+DEFAULT_FONT_MAIN = 'TeX Gyre Termes'
+DEFAULT_FONT_CJK = 'Noto Sans CJK SC'
+
+def latex_document_context(font_main=DEFAULT_FONT_MAIN, font_cjk=DEFAULT_FONT_CJK):
     """
-    Returns a vertical space block for a given number of lines (approx. 1em per line).
+    Template variables of the shared XeLaTeX document (templates/latex/document.tex.j2).
     """
-    return "\n".join([r"\vspace*{3em}"] * lines)
+    # latex_templates builds on this module
+    from backend.utils.latex_templates import LatexSafe
+    return {"endofdump": LatexSafe(ENDOFDUMP), "font_main": font_main, "font_cjk": font_cjk}
 
-def latex_signature_block(entity_name, lines_before=4):
+def latex_document_wrapper(body: str, font_main=DEFAULT_FONT_MAIN, font_cjk=DEFAULT_FONT_CJK) -> str:
     """
-    Creates a signature block with spacing and organization name.
+    Wraps LaTeX body content in a complete XeLaTeX document structure.
     """
-    spacing = latex_vspace_lines(lines_before)
-    return f"{spacing}\n{entity_name}"
+    from backend.utils.latex_templates import LatexSafe, render_latex
+    return render_latex("document.tex.j2", body=LatexSafe(body), **latex_document_context(font_main, font_cjk))
 
-def latex_document_wrapper(body: str, font_main='TeX Gyre Termes', font_cjk='Noto Sans CJK SC') -> str:
+def render_latex_to_pdf(tex_path, build_name=None):
     """
-    Wraps LaTeX body content in a complete XeLaTeX document structure.
+    Compiles a .tex file with XeLaTeX and returns the path of the PDF next to it.
+
+    Builds run in a persistent workspace named ``build_name`` (default: the
+    .tex file name), see ``latex_build.compile_latex``.
     """
-    return rf"""
-    \documentclass[12pt]{{article}}
-    \usepackage[margin=1in]{{geometry}}
-    \usepackage{{xeCJK}}
-    \usepackage{{fontspec}}
-    \setmainfont{{{font_main}}}
-    \setCJKmainfont{{{font_cjk}}}
-    \clubpenalty=10000
-    \widowpenalty=10000
-    
-    \begin{{document}}
-    
-    {body}
-    
-    \end{{document}}
-    """
-
-def render_latex_to_pdf(tex_path):
     output_dir = os.path.dirname(tex_path)
     os.makedirs(output_dir, exist_ok=True)
+    final_pdf_path = tex_path.replace(".tex", ".pdf")
+    build_name = build_name or os.path.splitext(os.path.basename(tex_path))[0]
     try:
-        subprocess.run(["xelatex", "-output-directory", output_dir, tex_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        pdf_path, _ = compile_latex(tex_path, build_name)
     except subprocess.CalledProcessError as e:
-        st.error("❌ XeLaTeX compilation failed.")
-        st.text(e.stderr.decode("utf-8"))
+        logger.error("XeLaTeX compilation of %s failed: %s", tex_path, (e.stderr or b"").decode("utf-8", "replace"))
         raise
     except subprocess.TimeoutExpired:
-        st.error("❌ XeLaTeX timed out.")
+        logger.error("XeLaTeX timed out compiling %s", tex_path)
         raise
-    return tex_path.replace(".tex", ".pdf")
+    if not os.path.exists(pdf_path):
+        raise RuntimeError(f"XeLaTeX produced no PDF for {tex_path}")
+    shutil.copyfile(pdf_path, final_pdf_path)
+    return final_pdf_path
 
 
 # TODO: split the word generation and pdf generation function into two to make it more structured
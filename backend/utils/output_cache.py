@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from backend import GENERATOR_VERSION
+from backend.utils.latex_utils import latex_document_wrapper
+from backend.utils.tracing import annotate
+
+DEFAULT_CACHE_DIR = os.environ.get("SOC_CACHE_DIR", os.path.join(os.getcwd(), "generated_reports", ".cache"))
+DEFAULT_MAX_BYTES = int(os.environ.get("SOC_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+DEFAULT_TTL_SECONDS = float(os.environ.get("SOC_CACHE_TTL", str(24 * 3600)))
+
+META_FILE = "meta.json"
+
+
+def render_settings():
+    """
+    Settings that change the rendered output without changing the input.
+
+    The empty-body output of ``latex_document_wrapper`` captures its font
+    parameters and preamble, so changing either invalidates the cache.
+    """
+    return {
+        "generator_version": GENERATOR_VERSION,
+        "latex_preamble": hashlib.sha256(latex_document_wrapper("").encode("utf-8")).hexdigest(),
+    }
+
+
+class OutputCache:
+    """
+    Content-addressed on-disk cache of generated DOCX/PDF artifacts.
+
+    Each entry is a directory named after its key holding one file per
+    artifact extension. Entries are evicted least-recently-used first once
+    the total size exceeds ``max_bytes``, and unconditionally after
+    ``ttl_seconds``.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def make_key(self, namespace: str, payloads, settings=None) -> str:
+        """
+        Builds a cache key from the SHA-256 of every input payload plus the
+        render settings.
+        """
+        h = hashlib.sha256(namespace.encode("utf-8"))
+        for payload in payloads:
+            h.update(hashlib.sha256(payload).digest())
+        h.update(json.dumps(settings if settings is not None else render_settings(), sort_keys=True).encode("utf-8"))
+        return h.hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def _is_expired(self, entry_dir, now):
+        try:
+            with open(os.path.join(entry_dir, META_FILE), encoding="utf-8") as f:
+                created = json.load(f)["created"]
+        except (OSError, ValueError, KeyError):
+            return True
+        return now - created > self.ttl_seconds
+
+    def fetch(self, key: str, output_base: str, extensions):
+        """
+        Copies the cached artifacts for ``key`` to ``output_base`` + extension.
+
+        Returns a dict mapping each extension to its output path, or None on
+        a miss.
+        """
+        if not self.enabled:
+            return None
+
+        entry_dir = self._entry_dir(key)
+        sources = {ext: os.path.join(entry_dir, "artifact" + ext) for ext in extensions}
+        with self._lock:
+            if (not os.path.isdir(entry_dir) or self._is_expired(entry_dir, time.time())
+                    or not all(os.path.exists(p) for p in sources.values())):
+                self.misses += 1
+                annotate(cache="miss")
+                return None
+            self.hits += 1
+            annotate(cache="hit")
+            # Directory mtime doubles as the LRU access time
+            os.utime(entry_dir)
+
+        os.makedirs(os.path.dirname(output_base) or ".", exist_ok=True)
+        outputs = {}
+        for ext, src in sources.items():
+            outputs[ext] = output_base + ext
+            shutil.copyfile(src, outputs[ext])
+        return outputs
+
+    def put(self, key: str, artifacts: dict):
+        """
+        Stores ``artifacts`` (extension -> path) under ``key``. Incomplete
+        results, where any artifact is missing, are not cached.
+        """
+        if not self.enabled or not all(os.path.exists(p) for p in artifacts.values()):
+            return
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=self.root)
+        size = 0
+        for ext, path in artifacts.items():
+            dest = os.path.join(tmp_dir, "artifact" + ext)
+            shutil.copyfile(path, dest)
+            size += os.path.getsize(dest)
+        with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "size": size}, f)
+
+        with self._lock:
+            entry_dir = self._entry_dir(key)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(tmp_dir, entry_dir)
+            self._evict()
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, name)
+            if name.startswith(".") or not os.path.isdir(entry_dir):
+                continue
+            if self._is_expired(entry_dir, now):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+            size = sum(os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir))
+            entries.append((os.path.getmtime(entry_dir), size, entry_dir))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+output_cache = OutputCache()
@@ -0,0 +1,11 @@
+from typing import Callable
+
+# Generators report what they are doing through a callback taking one
+# message, so they run the same under the app, the batch CLI or a test.
+ProgressCallback = Callable[[str], None]
+
+
+def null_progress(message: str) -> None:
+    """
+    Default callback: discards the message.
+    """
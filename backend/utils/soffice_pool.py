@@ -0,0 +1,257 @@
+import atexit
+import logging
+import os
+import queue
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+
+try:
+    # pyuno ships with LibreOffice itself, it is not installable from PyPI.
+    import uno
+    from com.sun.star.beans import PropertyValue
+    from com.sun.star.connection import NoConnectException
+except ImportError:
+    uno = None
+
+from backend.utils.tool_runner import TOOL_POLICIES, rlimit_preexec, tool_rlimits
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = int(os.environ.get("SOC_SOFFICE_POOL_SIZE", "2"))
+DEFAULT_MAX_CONVERSIONS = int(os.environ.get("SOC_SOFFICE_MAX_CONVERSIONS", "50"))
+DEFAULT_ACQUIRE_TIMEOUT = float(os.environ.get("SOC_SOFFICE_ACQUIRE_TIMEOUT", "300"))
+
+
+def find_soffice_binary():
+    """
+    Returns the first LibreOffice executable found on PATH, or None.
+    """
+    for name in ("soffice", "libreoffice"):
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _prop(name, value):
+    p = PropertyValue()
+    p.Name = name
+    p.Value = value
+    return p
+
+
+class SofficeWorker:
+    """
+    One warm, headless soffice process with its own user profile directory,
+    driven over a UNO socket connection.
+    """
+
+    def __init__(self, binary=None, startup_timeout=60.0, policy=TOOL_POLICIES["libreoffice"]):
+        if uno is None:
+            raise RuntimeError("pyuno is not available in this interpreter")
+        binary = binary or find_soffice_binary()
+        if binary is None:
+            raise RuntimeError("LibreOffice executable not found on PATH")
+
+        self.conversions = 0
+        self.convert_timeout = policy.timeout
+        self.timed_out = False
+        self.profile_dir = tempfile.mkdtemp(prefix="soffice_profile_")
+        self.port = _free_port()
+        self.process = subprocess.Popen([
+            binary,
+            f"-env:UserInstallation=file://{self.profile_dir}",
+            "--headless",
+            "--invisible",
+            "--nologo",
+            "--nodefault",
+            "--norestore",
+            "--nolockcheck",
+            f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext",
+        ], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+            # Long-lived: only the memory cap applies, CPU time adds up across conversions
+            preexec_fn=rlimit_preexec(tool_rlimits(policy, cpu=False)))
+
+        try:
+            self._desktop = self._connect(startup_timeout)
+        except Exception:
+            self.close()
+            raise
+
+    def _connect(self, timeout):
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_ctx)
+        url = f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+        deadline = time.monotonic() + timeout
+
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"soffice exited during startup (code {self.process.returncode})")
+            try:
+                ctx = resolver.resolve(url)
+                return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+            except NoConnectException:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("Timed out waiting for soffice to accept connections")
+                time.sleep(0.25)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def _on_timeout(self):
+        logger.warning("soffice conversion exceeded %ss, killing worker %d", self.convert_timeout, self.process.pid)
+        self.timed_out = True
+        self.kill()
+
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def convert(self, docx_path: str, output_dir: str) -> str:
+        pdf_path = os.path.join(output_dir, os.path.splitext(os.path.basename(docx_path))[0] + ".pdf")
+        in_url = uno.systemPathToFileUrl(os.path.abspath(docx_path))
+        out_url = uno.systemPathToFileUrl(os.path.abspath(pdf_path))
+
+        # A hung conversion blocks inside UNO; killing soffice makes the call fail
+        watchdog = threading.Timer(self.convert_timeout, self._on_timeout)
+        watchdog.start()
+        try:
+            document = self._desktop.loadComponentFromURL(in_url, "_blank", 0, (_prop("Hidden", True),))
+            if document is None:
+                raise RuntimeError(f"LibreOffice could not open {docx_path}")
+            try:
+                document.storeToURL(out_url, (_prop("FilterName", "writer_pdf_Export"),))
+            finally:
+                document.close(True)
+        except Exception:
+            if self.timed_out:
+                raise subprocess.TimeoutExpired("soffice", self.convert_timeout)
+            raise
+        finally:
+            watchdog.cancel()
+
+        self.conversions += 1
+        return pdf_path
+
+    def close(self):
+        try:
+            self._desktop.terminate()
+        except Exception:
+            pass
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.kill()
+                self.process.wait()
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+class ConverterPool:
+    """
+    A fixed number of converter slots shared by every caller in the process.
+
+    Each slot lazily starts a worker on first use. Callers queue on the idle
+    slots, a worker is recycled after ``max_conversions`` documents, and a
+    worker that crashes mid-conversion is replaced and the document retried
+    once on the fresh worker.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, max_conversions=DEFAULT_MAX_CONVERSIONS,
+                 worker_factory=SofficeWorker, acquire_timeout=DEFAULT_ACQUIRE_TIMEOUT):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.size = size
+        self.max_conversions = max_conversions
+        self.worker_factory = worker_factory
+        self.acquire_timeout = acquire_timeout
+        self._idle = queue.Queue()
+        self._closed = False
+        for _ in range(size):
+            self._idle.put(None)
+
+    def convert(self, docx_path: str, output_dir: str) -> str:
+        if self._closed:
+            raise RuntimeError("Converter pool is closed")
+        try:
+            worker = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise RuntimeError("Timed out waiting for a free LibreOffice worker")
+
+        try:
+            for attempt in range(2):
+                if worker is None or not worker.alive():
+                    self._retire(worker)
+                    try:
+                        worker = self.worker_factory()
+                    except Exception:
+                        # The retired worker must not go back to the idle queue
+                        worker = None
+                        raise
+                try:
+                    pdf_path = worker.convert(docx_path, output_dir)
+                except Exception as e:
+                    # A timed-out document would most likely hang the next worker too
+                    crashed = not worker.alive() and not isinstance(e, subprocess.TimeoutExpired)
+                    self._retire(worker)
+                    worker = None
+                    if crashed and attempt == 0:
+                        logger.warning("soffice worker crashed, retrying %s on a fresh worker", docx_path)
+                        continue
+                    raise
+
+                if worker.conversions >= self.max_conversions:
+                    self._retire(worker)
+                    worker = None
+                return pdf_path
+        finally:
+            self._idle.put(worker)
+
+    def _retire(self, worker):
+        if worker is not None:
+            try:
+                worker.close()
+            except Exception:
+                logger.exception("Failed to shut down soffice worker")
+
+    def close(self):
+        self._closed = True
+        for _ in range(self.size):
+            try:
+                self._retire(self._idle.get(timeout=self.acquire_timeout))
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_converter_pool():
+    """
+    Returns the process-wide converter pool, or None when the pool is
+    disabled (SOC_SOFFICE_POOL_SIZE=0) or pyuno/soffice are unavailable.
+    """
+    global _pool
+    if DEFAULT_POOL_SIZE < 1 or uno is None or find_soffice_binary() is None:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConverterPool()
+            atexit.register(_pool.close)
+        return _pool
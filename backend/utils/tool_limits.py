@@ -0,0 +1,50 @@
+import os
+import threading
+from contextlib import contextmanager
+
+# External tools whose concurrency can be capped, e.g. by the batch CLI
+TOOLS = ("xelatex", "libreoffice", "pandoc")
+
+# Concurrent runs of each tool allowed per process unless the batch CLI
+# installs shared semaphores; 0 lifts the cap
+DEFAULT_TOOL_CONCURRENCY = int(os.environ.get("SOC_TOOL_CONCURRENCY", str(os.cpu_count() or 1)))
+
+
+def default_tool_semaphores(limit=DEFAULT_TOOL_CONCURRENCY):
+    if limit < 1:
+        return {}
+    return {tool: threading.BoundedSemaphore(limit) for tool in TOOLS}
+
+
+_semaphores = default_tool_semaphores()
+
+
+def install_tool_semaphores(semaphores: dict):
+    """
+    Caps concurrent runs of each tool in this process. Pass
+    ``multiprocessing`` semaphores to share the cap across processes.
+    """
+    _semaphores.clear()
+    _semaphores.update(semaphores)
+
+
+def tool_name(cmd):
+    """
+    Returns the tool a command line runs, e.g. "xelatex" for ["/usr/bin/xelatex", ...].
+    """
+    name = os.path.splitext(os.path.basename(cmd[0]))[0]
+    return "libreoffice" if name == "soffice" else name
+
+
+@contextmanager
+def tool_slot(tool):
+    """
+    Holds one of ``tool``'s slots for the duration of the block. Tools
+    without an installed semaphore are not limited.
+    """
+    semaphore = _semaphores.get(tool)
+    if semaphore is None:
+        yield
+        return
+    with semaphore:
+        yield
@@ -0,0 +1,224 @@
+import logging
+import math
+import os
+import signal
+import subprocess
+import tempfile
+import time
+from typing import NamedTuple
+
+from backend.utils.tool_limits import tool_name, tool_slot
+from backend.utils.tracing import annotate, record_child_usage
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Extra attempts after a transient failure (timeout or killed by a signal)
+DEFAULT_RETRIES = int(os.environ.get("SOC_TOOL_RETRIES", "1"))
+RETRY_BACKOFF_SECONDS = 0.5
+# Bytes of a failed run's stderr/stdout kept in logs and error messages
+LOG_TAIL_BYTES = 4096
+
+
+class ToolPolicy(NamedTuple):
+    """
+    Limits for one run of an external tool: wall-clock ``timeout`` in
+    seconds, ``memory_mb`` of writable memory (RLIMIT_DATA, 0 = unlimited)
+    and ``retries`` after a transient failure.
+    """
+    timeout: float
+    memory_mb: int
+    retries: int = DEFAULT_RETRIES
+
+
+def _policy(tool, timeout, memory_mb):
+    # Overridable per tool, e.g. SOC_XELATEX_TIMEOUT, SOC_PANDOC_MEMORY_MB
+    prefix = f"SOC_{tool.upper()}_"
+    return ToolPolicy(float(os.environ.get(prefix + "TIMEOUT", str(timeout))),
+                      int(os.environ.get(prefix + "MEMORY_MB", str(memory_mb))))
+
+
+TOOL_POLICIES = {
+    "xelatex": _policy("xelatex", 300, 2048),
+    "pandoc": _policy("pandoc", 120, 2048),
+    "libreoffice": _policy("libreoffice", 300, 4096),
+}
+DEFAULT_POLICY = ToolPolicy(timeout=300, memory_mb=0)
+
+
+def policy_for(cmd) -> ToolPolicy:
+    return TOOL_POLICIES.get(tool_name(cmd), DEFAULT_POLICY)
+
+
+def tool_rlimits(policy: ToolPolicy, cpu=True) -> dict:
+    """
+    The rlimits for a run under ``policy``. With ``cpu``, CPU time is capped
+    at the timeout so a child orphaned by a crashed server cannot spin forever.
+    """
+    if resource is None:
+        return {}
+    limits = {}
+    if cpu and policy.timeout:
+        limits[resource.RLIMIT_CPU] = math.ceil(policy.timeout)
+    if policy.memory_mb:
+        limits[resource.RLIMIT_DATA] = policy.memory_mb * 1024 * 1024
+    return limits
+
+
+def rlimit_preexec(rlimits):
+    """
+    Returns a ``preexec_fn`` that applies ``rlimits`` in the child before it
+    execs, so the tool is limited from its first instruction; None when
+    there is nothing to apply.
+    """
+    if not rlimits or resource is None:
+        return None
+
+    def preexec():
+        # Runs between fork and exec: no logging, no locks
+        for limit, value in rlimits.items():
+            _, hard = resource.getrlimit(limit)
+            if hard != resource.RLIM_INFINITY:
+                value = min(value, hard)
+            resource.setrlimit(limit, (value, value))
+    return preexec
+
+
+def _kill(proc, group):
+    if group:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+            return
+        except ProcessLookupError:
+            pass
+    proc.kill()
+
+
+def run_subprocess(cmd, stdout=None, stderr=None, timeout=None, check=False, rlimits=None, **kwargs):
+    """
+    ``subprocess.run`` that also charges the child's CPU time and peak RSS
+    to the active span.
+
+    The child is reaped with ``os.wait4`` to read its own resource usage,
+    so captured output goes through temporary files rather than pipes.
+    Falls back to ``subprocess.run`` where wait4 is unavailable. Waits for a
+    free slot first if the tool's concurrency is capped, see ``tool_limits``.
+
+    ``rlimits`` maps ``resource.RLIMIT_*`` constants to limits set in the
+    child before it execs (see ``rlimit_preexec``). With
+    ``start_new_session=True`` a timeout kills the child's whole process
+    group, not just the child.
+    """
+    preexec = rlimit_preexec(rlimits)
+    if preexec is not None:
+        kwargs["preexec_fn"] = preexec
+    with tool_slot(tool_name(cmd)):
+        return _run_subprocess(cmd, stdout, stderr, timeout, check, **kwargs)
+
+
+def _run_subprocess(cmd, stdout, stderr, timeout, check, **kwargs):
+    if not hasattr(os, "wait4"):
+        return subprocess.run(cmd, stdout=stdout, stderr=stderr, timeout=timeout, check=check, **kwargs)
+
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(
+            cmd,
+            stdout=out if stdout == subprocess.PIPE else stdout,
+            stderr=err if stderr == subprocess.PIPE else stderr,
+            **kwargs,
+        )
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        delay = 0.005
+        while True:
+            pid, status, rusage = os.wait4(proc.pid, os.WNOHANG if deadline is not None else 0)
+            if pid:
+                break
+            if time.monotonic() >= deadline:
+                _kill(proc, kwargs.get("start_new_session", False))
+                proc.wait()
+                out.seek(0)
+                err.seek(0)
+                raise subprocess.TimeoutExpired(cmd, timeout, out.read() if stdout == subprocess.PIPE else None,
+                                                err.read() if stderr == subprocess.PIPE else None)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        # Reaped above; tell Popen so it does not wait for the pid again
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+        # ru_maxrss is in kilobytes on Linux
+        record_child_usage(rusage.ru_utime + rusage.ru_stime, rusage.ru_maxrss)
+
+        out.seek(0)
+        err.seek(0)
+        result = subprocess.CompletedProcess(
+            cmd, proc.returncode,
+            out.read() if stdout == subprocess.PIPE else None,
+            err.read() if stderr == subprocess.PIPE else None,
+        )
+    if check:
+        result.check_returncode()
+    return result
+
+
+def _tail(data):
+    return (data or b"")[-LOG_TAIL_BYTES:].decode("utf-8", "replace")
+
+
+def _transient(result):
+    # Killed by a signal: OOM killer, RLIMIT_CPU or the timeout itself
+    return result.returncode < 0
+
+
+def run_tool(cmd, cwd=None, env=None, check=True, policy: ToolPolicy = None):
+    """
+    Runs an external renderer (xelatex, pandoc, libreoffice) under its
+    ToolPolicy.
+
+    The tool gets no stdin, so it fails instead of waiting for input, and
+    runs in its own session so a timeout kills everything it spawned.
+    Output is captured and its tail logged on failure. Runs killed by a
+    timeout or a signal are retried up to ``policy.retries`` times with
+    backoff; a non-zero exit code is not, since it fails the same way again.
+
+    Returns:
+        The ``subprocess.CompletedProcess``, with stdout and stderr as bytes.
+
+    Raises:
+        subprocess.TimeoutExpired: if the last attempt timed out.
+        subprocess.CalledProcessError: with ``check``, if the tool failed.
+    """
+    policy = policy or policy_for(cmd)
+    tool = tool_name(cmd)
+    for attempt in range(policy.retries + 1):
+        if attempt:
+            time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+        try:
+            result = run_subprocess(
+                cmd, cwd=cwd, env=env, stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                timeout=policy.timeout or None, rlimits=tool_rlimits(policy), start_new_session=True,
+            )
+        except subprocess.TimeoutExpired as e:
+            logger.warning("%s timed out after %ss (attempt %d of %d): %s",
+                           tool, policy.timeout, attempt + 1, policy.retries + 1, _tail(e.stderr or e.output))
+            if attempt == policy.retries:
+                annotate(attempts=attempt + 1)
+                raise
+            continue
+
+        if result.returncode == 0:
+            break
+        logger.warning("%s exited with code %d (attempt %d of %d): %s",
+                       tool, result.returncode, attempt + 1, policy.retries + 1,
+                       _tail(result.stderr) or _tail(result.stdout))
+        if not _transient(result):
+            break
+
+    annotate(attempts=attempt + 1)
+    if check:
+        result.check_returncode()
+    return result
@@ -0,0 +1,208 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("backend.trace")
+
+# Directory for Chrome trace files (chrome://tracing, Perfetto); unset disables them
+TRACE_DIR = os.environ.get("SOC_TRACE_DIR")
+
+_usage_lock = threading.Lock()
+
+_current_trace = contextvars.ContextVar("soc_trace", default=None)
+_current_span = contextvars.ContextVar("soc_span", default=None)
+
+
+class Span:
+    """
+    Timing and resource usage of one pipeline stage.
+
+    ``child_cpu_s`` and ``child_peak_rss_kb`` cover external processes started
+    through ``tool_runner.run_subprocess`` while the span was active.
+    """
+
+    def __init__(self, name, parent=None, **attrs):
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.thread_id = threading.get_ident()
+        self.start = time.time()
+        self.wall_s = None
+        self.cpu_s = None
+        self.child_cpu_s = 0.0
+        self.child_peak_rss_kb = 0
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def record_file(self, key, path):
+        """
+        Records the size of ``path``, or of an in-memory buffer, as
+        ``<key>_bytes`` if it exists.
+        """
+        if hasattr(path, "getbuffer"):
+            self.attrs[f"{key}_bytes"] = path.getbuffer().nbytes
+        elif path and os.path.exists(path):
+            self.attrs[f"{key}_bytes"] = os.path.getsize(path)
+
+    def add_child_usage(self, cpu_s, peak_rss_kb):
+        # Stages running on other threads may report to the same parent
+        with _usage_lock:
+            span = self
+            while span is not None:
+                span.child_cpu_s += cpu_s
+                span.child_peak_rss_kb = max(span.child_peak_rss_kb, peak_rss_kb)
+                span = span.parent
+
+    def to_dict(self):
+        record = {
+            "stage": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "start": self.start,
+            "wall_s": round(self.wall_s, 6) if self.wall_s is not None else None,
+            "cpu_s": round(self.cpu_s, 6) if self.cpu_s is not None else None,
+            "child_cpu_s": round(self.child_cpu_s, 6),
+            "child_peak_rss_kb": self.child_peak_rss_kb,
+        }
+        if self.error:
+            record["error"] = self.error
+        record.update(self.attrs)
+        return record
+
+
+class Trace:
+    """
+    Collects the spans of one report generation.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self):
+        """
+        Returns one dict per finished span, in start order.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return [s.to_dict() for s in spans]
+
+    def to_chrome_trace(self):
+        pid = os.getpid()
+        events = []
+        for record in self.summary():
+            events.append({
+                "name": record["stage"],
+                "cat": self.name,
+                "ph": "X",
+                "ts": int(record["start"] * 1e6),
+                "dur": int((record["wall_s"] or 0) * 1e6),
+                "pid": pid,
+                "tid": record.get("thread_id", 0),
+                "args": {k: v for k, v in record.items() if k not in ("stage", "start", "wall_s")},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+        return path
+
+
+@contextmanager
+def start_trace(name, chrome_trace_dir=TRACE_DIR):
+    """
+    Collects every span opened in this context (including stages run on
+    other threads by ``run_stages``) into one ``Trace``. When
+    ``chrome_trace_dir`` is set, a Chrome trace file is written on exit.
+    """
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        if chrome_trace_dir:
+            os.makedirs(chrome_trace_dir, exist_ok=True)
+            path = os.path.join(chrome_trace_dir, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.json")
+            trace.write_chrome_trace(path)
+
+
+@contextmanager
+def trace_stage(name, **attrs):
+    """
+    Times a pipeline stage and emits it as one JSON log line.
+
+    Yields the ``Span`` so callers can attach sizes, e.g.
+    ``span.record_file("output", pdf_path)``.
+    """
+    span = Span(name, parent=_current_span.get(), **attrs)
+    token = _current_span.set(span)
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span.wall_s = time.perf_counter() - wall_start
+        span.cpu_s = time.thread_time() - cpu_start
+        span.attrs.setdefault("thread_id", span.thread_id)
+        _current_span.reset(token)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(span)
+        logger.info(json.dumps(span.to_dict(), ensure_ascii=False))
+
+
+def annotate(**attrs):
+    """
+    Adds attributes, such as input sizes, to the active span if there is one.
+    """
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attrs)
+
+
+def traced(name=None):
+    """
+    Decorator form of ``trace_stage``; the stage name defaults to the
+    function name.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace_stage(name or fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_child_usage(cpu_s, peak_rss_kb):
+    """
+    Charges an external process's CPU time and peak RSS to the active span
+    and its parents, if there is one.
+    """
+    span = _current_span.get()
+    if span is not None:
+        span.add_child_usage(cpu_s, peak_rss_kb)
+
+
+def submit_with_context(executor, fn, *args):
+    """
+    ``executor.submit`` that runs ``fn`` inside a copy of the caller's
+    context, so spans opened on the worker thread join the caller's trace.
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args)
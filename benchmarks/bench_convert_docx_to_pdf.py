@@ -0,0 +1,80 @@
+"""
+Per-document latency of DOCX -> PDF conversion under concurrent load,
+warm converter pool vs. one cold ``libreoffice --headless`` per document.
+
+    python -m benchmarks.bench_convert_docx_to_pdf --concurrency 20
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from docx import Document
+
+from backend.utils.convert_docx_to_pdf import convert_docx_to_pdf_subprocess
+from backend.utils.soffice_pool import ConverterPool, find_soffice_binary, uno
+
+
+def make_sample_docx(path, paragraphs=200):
+    doc = Document()
+    for i in range(paragraphs):
+        doc.add_paragraph(f"第{i}段 管理层认定 sample paragraph {i}.")
+    doc.save(path)
+
+
+def run(convert, docx_paths, out_dir, concurrency):
+    def timed(path):
+        start = time.perf_counter()
+        convert(path, out_dir)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, docx_paths))
+    return latencies, time.perf_counter() - start
+
+
+def report(name, latencies, wall):
+    latencies = sorted(latencies)
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(f"{name:<12} n={len(latencies):<4} mean={statistics.mean(latencies):.2f}s "
+          f"p50={statistics.median(latencies):.2f}s p95={p95:.2f}s wall={wall:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--skip-subprocess", action="store_true")
+    args = parser.parse_args()
+
+    if find_soffice_binary() is None:
+        print("LibreOffice not found on PATH, nothing to benchmark.")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        docx_paths = []
+        for i in range(args.concurrency):
+            path = os.path.join(tmp_dir, f"doc_{i}.docx")
+            make_sample_docx(path)
+            docx_paths.append(path)
+
+        if uno is not None:
+            pool = ConverterPool(size=args.pool_size)
+            try:
+                # Warm every worker once so startup is not counted per document
+                run(pool.convert, docx_paths[:args.pool_size], tmp_dir, args.pool_size)
+                report("pool", *run(pool.convert, docx_paths, tmp_dir, args.concurrency))
+            finally:
+                pool.close()
+        else:
+            print("pyuno not importable, skipping pool run.")
+
+        if not args.skip_subprocess:
+            report("subprocess", *run(convert_docx_to_pdf_subprocess, docx_paths, tmp_dir, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
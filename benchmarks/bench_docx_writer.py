@@ -0,0 +1,70 @@
+"""
+DOCX generation with python-docx objects vs. the streaming OOXML writer,
+for a long Part I & II report and a large Part III & IV control table.
+Peak memory is the Python heap as seen by tracemalloc; lxml's own C
+allocations are not counted, so python-docx's real footprint is larger.
+
+    python -m benchmarks.bench_docx_writer --paragraphs 10000 --rows 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from backend.extract.control_matrix import CONTROL_COLUMNS
+from backend.extract.report_model import Report, make_section
+from backend.output.word_generator import DOCX_WRITERS, generate_controls_docx, render_report_docx
+
+
+def make_report(paragraphs):
+    half = paragraphs // 2
+    text = [f"第{i}段：本公司管理层负责设计、执行和维护有效的内部控制。Management is responsible." for i in range(paragraphs)]
+    return Report((make_section("part_i", text[:half], 1), make_section("part_ii", text[half:], 3)))
+
+
+def make_chunks(rows, chunk_size=2000):
+    df = pd.DataFrame({
+        "control_id": [f"C-{i:05d}" for i in range(rows)],
+        "description": ["系统管理员每季度复核用户访问权限，确保权限与岗位职责相符。"] * rows,
+        "test_procedure": ["检查季度复核记录并抽样核对用户清单与人事记录。"] * rows,
+        "result": ["未发现例外"] * rows,
+        "exceptions": [""] * rows,
+    }, dtype="string")[list(CONTROL_COLUMNS)]
+    return [df.iloc[i:i + chunk_size] for i in range(0, rows, chunk_size)]
+
+
+def measure(fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=10000)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    report = make_report(args.paragraphs)
+    chunks = make_chunks(args.rows)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cases = {
+            f"{args.paragraphs} paragraphs": lambda w: render_report_docx(report, os.path.join(tmp_dir, "report_" + w), w),
+            f"{args.rows} table rows": lambda w: generate_controls_docx(iter(chunks), os.path.join(tmp_dir, "table_" + w), w),
+        }
+        for case, run in cases.items():
+            for writer in DOCX_WRITERS:
+                elapsed, peak = measure(lambda: run(writer))
+                print(f"{case:<18} {writer:<12} {elapsed:7.2f}s  peak {peak / 2**20:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Peak Python memory and time to turn a control workbook into Part III & IV
+LaTeX, loading the whole sheet with pd.read_excel vs. streaming it with
+iter_control_chunks.
+
+    python -m benchmarks.bench_excel_ingestion --rows 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import openpyxl
+import pandas as pd
+
+from backend.extract.control_matrix import iter_control_chunks, normalize_control_matrix
+from backend.output.pdf_generator import iter_controls_latex
+
+
+def make_workbook(path, rows, sheets=2):
+    workbook = openpyxl.Workbook(write_only=True)
+    for s in range(sheets):
+        sheet = workbook.create_sheet(f"Controls {s + 1}")
+        sheet.append(["Control ID", "Description", "Testing Procedures", "Result", "Exceptions"])
+        for i in range(rows // sheets):
+            sheet.append([f"C-{s}-{i:06d}", f"管理层每月复核用户权限 #{i}", f"抽取样本 {i % 25 + 1} 个，检查审批记录",
+                          "有效" if i % 7 else "无效", "" if i % 7 else "发现例外"])
+    workbook.save(path)
+
+
+def render_eager(path, out):
+    frames = [normalize_control_matrix(df) for df in pd.read_excel(path, sheet_name=None).values()]
+    out.writelines(iter_controls_latex(frames))
+
+
+def render_streaming(path, out):
+    out.writelines(iter_controls_latex(iter_control_chunks(path)))
+
+
+def measure(label, fn, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        fn(path, out)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} {elapsed:8.2f}s  peak {peak / 2**20:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "controls.xlsx")
+        make_workbook(path, args.rows)
+        print(f"workbook: {args.rows} rows, {os.path.getsize(path) / 2**20:.1f} MiB")
+        measure("streaming", render_streaming, path)
+        measure("read_excel", render_eager, path)
+
+
+if __name__ == "__main__":
+    main()
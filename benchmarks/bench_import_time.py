@@ -0,0 +1,43 @@
+"""
+Cold import time of the backend entry points, each in a fresh interpreter.
+The streamlit + pandas row is what every worker process and test paid
+before the generators stopped importing them eagerly.
+
+    python -m benchmarks.bench_import_time --repeat 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+TARGETS = (
+    ("backend.soc_report_gen", "import backend.soc_report_gen"),
+    ("backend.batch", "import backend.batch"),
+    ("streamlit + pandas (previous eager imports)", "import streamlit, pandas"),
+)
+
+
+def cold_import(code, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = cold_import("pass", args.repeat)
+    print(f"interpreter startup: {baseline * 1000:.0f} ms (subtracted below)")
+    for label, code in TARGETS:
+        seconds = cold_import(code, args.repeat) - baseline
+        print(f"{label:<45} {seconds * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Part I & II edit-and-regenerate loop: a cold run, a run after editing one
+paragraph of the auditor's report (only that section is rendered again),
+and a run on a re-saved but unchanged letter (nothing is rendered).
+
+    python -m benchmarks.bench_incremental --paragraphs 400
+"""
+import os
+import tempfile
+
+# A private cache, so earlier runs cannot turn the cold run into a hit
+CACHE_DIR = tempfile.mkdtemp(prefix="bench_incremental_")
+os.environ["SOC_CACHE_DIR"] = CACHE_DIR
+
+import argparse
+import shutil
+import time
+
+from docx import Document
+
+from backend.soc_report_gen import PART_I_II_PDF_ENGINES, generate_part_i_ii
+from benchmarks.bench_part_i_ii_pdf import TOOLS
+from benchmarks.corpus import make_ma_ar_docx
+
+
+def edited_copy(path, out_path, edit_last=True, title=None):
+    doc = Document(path)
+    if edit_last:
+        doc.paragraphs[-1].add_run("（已修订）")
+    if title:
+        doc.core_properties.title = title
+    doc.save(out_path)
+    return out_path
+
+
+def timed(path, engine):
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        generate_part_i_ii(f, base_name=f"bench_incremental_{engine}", pdf_engine=engine)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=400)
+    args = parser.parse_args()
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            letter = make_ma_ar_docx(os.path.join(tmp_dir, "letter.docx"), args.paragraphs)
+            edited = edited_copy(letter, os.path.join(tmp_dir, "edited.docx"))
+            resaved = edited_copy(edited, os.path.join(tmp_dir, "resaved.docx"), edit_last=False, title="re-saved")
+            for engine in PART_I_II_PDF_ENGINES:
+                if not TOOLS[engine]():
+                    print(f"{engine}: not installed, skipped")
+                    continue
+                runs = [("cold", letter), ("one AR paragraph edited", edited), ("re-saved, unchanged", resaved)]
+                print(f"{engine:12} " + "  ".join(f"{label} {timed(path, engine):.2f}s" for label, path in runs))
+    finally:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
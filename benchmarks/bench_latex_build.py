@@ -0,0 +1,51 @@
+"""
+XeLaTeX build time for the Part I & II document: cold workspace, warm
+workspace (persisted .aux), and warm workspace plus precompiled preamble
+format. Prints the wall time of every xelatex pass.
+
+    python -m benchmarks.bench_latex_build
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+from backend.utils.latex_build import compile_latex
+from backend.utils.latex_utils import format_paragraphs_to_latex, latex_document_wrapper
+
+
+def make_tex(path, paragraphs):
+    body = r"\section*{第一部分 – 管理层认定}" + "\n\n" + format_paragraphs_to_latex(
+        [f"第{i}段：本公司管理层负责设计、执行和维护有效的内部控制。" for i in range(paragraphs)])
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(latex_document_wrapper(body))
+
+
+def report(label, timings):
+    passes = ", ".join(f"{t:.2f}s" for t in timings)
+    print(f"{label:<20} total {sum(timings):6.2f}s  passes [{passes}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paragraphs", type=int, default=300)
+    args = parser.parse_args()
+
+    if shutil.which("xelatex") is None:
+        print("xelatex not found on PATH, nothing to benchmark.")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tex_path = os.path.join(tmp_dir, "part1_2.tex")
+        make_tex(tex_path, args.paragraphs)
+        build_dir = os.path.join(tmp_dir, "build")
+
+        report("cold", compile_latex(tex_path, "part1_2", build_dir=build_dir, use_format=False)[1])
+        report("warm aux", compile_latex(tex_path, "part1_2", build_dir=build_dir, use_format=False)[1])
+        # First format run includes building the format itself
+        compile_latex(tex_path, "part1_2", build_dir=build_dir, use_format=True)
+        report("warm aux + format", compile_latex(tex_path, "part1_2", build_dir=build_dir, use_format=True)[1])
+
+
+if __name__ == "__main__":
+    main()
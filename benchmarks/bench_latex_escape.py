@@ -0,0 +1,67 @@
+"""
+LaTeX escaping throughput on multi-MB mixed CJK/Latin text: the former
+chain of ten str.replace calls, a str.translate table, and the compiled
+regex with a dispatch map used by latex_utils.escape_latex.
+
+    python -m benchmarks.bench_latex_escape --megabytes 8
+"""
+import argparse
+import random
+import time
+
+from backend.utils.latex_utils import LATEX_ESCAPES, escape_latex
+from benchmarks.corpus import mixed_text
+
+TRANSLATE_TABLE = str.maketrans(LATEX_ESCAPES)
+
+
+def chained_replace(text):
+    # The escape_latex that used to live in format_as_latex (it also
+    # re-escaped the braces of \textbackslash{})
+    return (text.replace('\\', r'\textbackslash{}')
+            .replace('&', r'\&')
+            .replace('%', r'\%')
+            .replace('$', r'\$')
+            .replace('#', r'\#')
+            .replace('_', r'\_')
+            .replace('{', r'\{')
+            .replace('}', r'\}')
+            .replace('~', r'\textasciitilde{}')
+            .replace('^', r'\textasciicircum{}'))
+
+
+def translate(text):
+    return text.translate(TRANSLATE_TABLE)
+
+
+def make_paragraphs(megabytes, seed=0):
+    rng = random.Random(seed)
+    paragraphs, size = [], 0
+    while size < megabytes * 2**20:
+        paragraphs.append(mixed_text(rng, 0.7, phrases=4))
+        size += len(paragraphs[-1].encode("utf-8"))
+    return paragraphs, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paragraphs, size = make_paragraphs(args.megabytes)
+    print(f"{len(paragraphs)} paragraphs, {size / 2**20:.1f} MiB UTF-8")
+    expected = [escape_latex(p) for p in paragraphs]
+    for label, fn in (("str.replace x10", chained_replace), ("str.translate", translate),
+                      ("regex dispatch", escape_latex)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = [fn(p) for p in paragraphs]
+            best = min(best, time.perf_counter() - start)
+        same = "same output" if result == expected else "differs"
+        print(f"{label:<16} {best:7.3f}s  {size / 2**20 / best:8.1f} MiB/s  ({same})")
+
+
+if __name__ == "__main__":
+    main()
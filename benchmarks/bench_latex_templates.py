@@ -0,0 +1,76 @@
+"""
+Part III & IV LaTeX assembly for a large control table: building the
+whole document as one string around the full table vs. streaming the
+cached controls.tex.j2 template to the .tex file one chunk at a time.
+Peak memory is the Python heap as seen by tracemalloc.
+
+    python -m benchmarks.bench_latex_templates --rows 50000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from backend.extract.control_matrix import CONTROL_COLUMNS, CONTROL_HEADERS
+from backend.output.pdf_generator import CONTROL_COL_SPEC, iter_controls_latex
+from backend.utils.latex_utils import (
+    LATEX_LONGTABLE_END,
+    escape_latex,
+    latex_document_wrapper,
+    latex_longtable_begin,
+    latex_longtable_rows,
+)
+from benchmarks.bench_docx_writer import make_chunks
+
+
+def whole_string(chunks, path):
+    df = pd.concat(chunks)
+    body = (rf"\section*{{{escape_latex('第三及第四部分 – 控制描述及测试程序')}}}" + "\n\n" + r"{\small" + "\n"
+            + latex_longtable_begin([CONTROL_HEADERS[c] for c in CONTROL_COLUMNS], CONTROL_COL_SPEC)
+            + latex_longtable_rows(df[list(CONTROL_COLUMNS)]) + LATEX_LONGTABLE_END + "}\n")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(latex_document_wrapper(body))
+
+
+def streamed(chunks, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(iter_controls_latex(iter(chunks)))
+
+
+def measure(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.rows, args.chunk_size)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Templates compile once per process; keep that out of the timings
+        streamed(make_chunks(1), os.path.join(tmp_dir, "warmup.tex"))
+        for label, fn in (("whole string", whole_string), ("template stream", streamed)):
+            path = os.path.join(tmp_dir, label.replace(" ", "_") + ".tex")
+            elapsed, peak = measure(lambda: fn(chunks, path), args.repeat)
+            size = os.path.getsize(path)
+            print(f"{args.rows} rows  {label:<16} {elapsed:7.2f}s  peak {peak / 2**20:7.1f} MB  "
+                  f"({size / 2**20:.1f} MB .tex)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+MA/AR section extraction on a long engagement letter: python-docx object
+model vs. streaming word/document.xml with iterparse. Peak memory is the
+Python heap as seen by tracemalloc; lxml's own C allocations are not counted.
+
+    python -m benchmarks.bench_ma_ar_parser --paragraphs 9000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from docx import Document
+
+from backend.extract.ma_ar_parser import extract_ma_ar_sections, extract_ma_ar_sections_xml
+
+
+def make_letter(path, paragraphs):
+    doc = Document()
+    doc.add_paragraph("前言")
+    half = paragraphs // 2
+    for i in range(paragraphs):
+        if i == 1:
+            doc.add_paragraph("第一部分 管理层认定")
+        elif i == half:
+            doc.add_paragraph("第二部分 独立服务审计师报告")
+        else:
+            p = doc.add_paragraph(f"第{i}段：本公司管理层负责设计、执行和维护有效的内部控制。")
+            p.add_run(" Management is responsible for the controls described herein.").bold = i % 2 == 0
+    doc.save(path)
+
+
+def object_model(path):
+    return extract_ma_ar_sections(Document(path))
+
+
+def streaming(path):
+    return extract_ma_ar_sections_xml(path)[:2]
+
+
+def measure(label, fn, path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(path)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<14} best {best:7.3f}s  peak {peak / 2**20:7.1f} MiB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paragraphs", type=int, default=9000, help="~30 paragraphs per page")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "letter.docx")
+        make_letter(path, args.paragraphs)
+        expected = measure("python-docx", object_model, path, args.repeat)
+        actual = measure("iterparse", streaming, path, args.repeat)
+        assert actual == expected, "parsers disagree"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Part I & II generation per PDF engine: LibreOffice rendering the generated
+DOCX vs. XeLaTeX laying out the extracted sections directly. Peak RSS is
+the largest external process (soffice/xelatex) as seen by the trace; the
+warm soffice pool is not a child process, so it reports 0.
+
+    python -m benchmarks.bench_part_i_ii_pdf --paragraphs 400 --repeat 3
+"""
+import os
+
+# Measure generation, not cache hits
+os.environ.setdefault("SOC_CACHE_MAX_BYTES", "0")
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+
+from backend.soc_report_gen import PART_I_II_PDF_ENGINES, generate_part_i_ii
+from backend.utils.soffice_pool import find_soffice_binary
+from backend.utils.tracing import start_trace
+from benchmarks.bench_ma_ar_parser import make_letter
+
+TOOLS = {"libreoffice": find_soffice_binary, "xelatex": lambda: shutil.which("xelatex")}
+
+
+def run_engine(engine, path, repeat):
+    timings, peak_rss_kb, stages = [], 0, {}
+    for n in range(repeat):
+        with open(path, "rb") as f, start_trace(f"bench_{engine}", chrome_trace_dir=None) as trace:
+            start = time.perf_counter()
+            generate_part_i_ii(f, base_name=f"bench_Part_I_II_{engine}", pdf_engine=engine)
+            timings.append(time.perf_counter() - start)
+        for span in trace.summary():
+            peak_rss_kb = max(peak_rss_kb, span["child_peak_rss_kb"])
+            if n == repeat - 1 and span["parent"] == "part_i_ii":
+                stages[span["stage"]] = span["wall_s"]
+    return timings, peak_rss_kb, stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    available = [e for e in PART_I_II_PDF_ENGINES if TOOLS[e]()]
+    for engine in PART_I_II_PDF_ENGINES:
+        if engine not in available:
+            print(f"{engine}: not installed, skipped")
+    if not available:
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "letter.docx")
+        make_letter(path, args.paragraphs)
+        for engine in available:
+            timings, peak_rss_kb, stages = run_engine(engine, path, args.repeat)
+            # The first run includes pool start-up or the preamble format build
+            steady = timings[1:] or timings
+            print(f"{engine:12} first {timings[0]:.2f}s  median {statistics.median(steady):.2f}s  "
+                  f"peak child RSS {peak_rss_kb / 1024:.0f} MB")
+            print("             " + "  ".join(f"{name} {seconds:.2f}s" for name, seconds in stages.items()))
+
+
+if __name__ == "__main__":
+    main()
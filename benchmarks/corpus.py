@@ -0,0 +1,113 @@
+"""
+Synthetic, reproducible inputs for the benchmarks: MA & AR engagement
+letters (.docx) and control workbooks (.xlsx) of any size, with a
+configurable mix of Chinese and English text. The same size, mix and seed
+always produce the same content.
+
+    python -m benchmarks.corpus --paragraphs 10000 --rows 10000 --out corpus/
+"""
+import argparse
+import os
+import random
+
+# Sentence fragments the generated text is assembled from
+CJK_PHRASES = (
+    "本公司管理层负责设计、执行和维护有效的内部控制",
+    "系统管理员每季度复核用户访问权限",
+    "变更须经变更管理委员会审批后方可上线",
+    "备份数据每日异地存储并定期进行恢复测试",
+    "服务审计师依据鉴证业务准则执行了测试",
+    "确保权限与岗位职责相符",
+)
+LATIN_PHRASES = (
+    "Management is responsible for the controls described herein",
+    "access rights are reviewed quarterly by the system owner",
+    "changes are approved by the CAB before release",
+    "backups are replicated off-site & restored twice a year",
+    "sampled 25 items (100% coverage of new hires)",
+    "see section 4.2_b for exceptions",
+)
+
+
+def mixed_text(rng, cjk_ratio, phrases=2):
+    """
+    One paragraph of ``phrases`` fragments, each Chinese with probability
+    ``cjk_ratio``.
+    """
+    parts = []
+    for _ in range(phrases):
+        if rng.random() < cjk_ratio:
+            parts.append(rng.choice(CJK_PHRASES) + "。")
+        else:
+            parts.append(rng.choice(LATIN_PHRASES) + ".")
+    return " ".join(parts)
+
+
+def make_ma_ar_docx(path, paragraphs, cjk_ratio=0.7, seed=0):
+    """
+    Writes an engagement letter with ``paragraphs`` body paragraphs split
+    evenly between Part I (MA) and Part II (AR), with signature lines at
+    the end of each part.
+
+    Returns:
+        ``path``.
+    """
+    from docx import Document
+
+    rng = random.Random(seed)
+    doc = Document()
+    doc.add_paragraph("致：客户管理层")
+    half = max(paragraphs // 2, 1)
+    for title, count in (("第一部分 管理层认定", half), ("第二部分 独立服务审计师报告", max(paragraphs - half, 1))):
+        doc.add_paragraph(title)
+        for i in range(count):
+            p = doc.add_paragraph(f"{i + 1}. ")
+            p.add_run(mixed_text(rng, cjk_ratio)).bold = rng.random() < 0.1
+    doc.save(path)
+    return path
+
+
+def make_control_workbook(path, rows, cjk_ratio=0.7, seed=0, sheets=1):
+    """
+    Writes a control matrix workbook with ``rows`` controls spread over
+    ``sheets`` sheets.
+
+    Returns:
+        ``path``.
+    """
+    import openpyxl
+
+    rng = random.Random(seed)
+    workbook = openpyxl.Workbook(write_only=True)
+    for s in range(sheets):
+        sheet = workbook.create_sheet(f"Controls {s + 1}")
+        sheet.append(["Control ID", "Description", "Testing Procedures", "Result", "Exceptions"])
+        for i in range(s, rows, sheets):
+            effective = rng.random() > 0.1
+            sheet.append([f"C-{i:06d}", mixed_text(rng, cjk_ratio), mixed_text(rng, cjk_ratio, phrases=1),
+                          "有效" if effective else "无效", "" if effective else mixed_text(rng, cjk_ratio, phrases=1)])
+    workbook.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--cjk-ratio", type=float, default=0.7, help="share of Chinese fragments, 0..1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=".")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for path in (
+        make_ma_ar_docx(os.path.join(args.out, f"ma_ar_{args.paragraphs}.docx"), args.paragraphs,
+                        args.cjk_ratio, args.seed),
+        make_control_workbook(os.path.join(args.out, f"controls_{args.rows}.xlsx"), args.rows,
+                              args.cjk_ratio, args.seed),
+    ):
+        print(f"{path}: {os.path.getsize(path) / 2**20:.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+"""
+Load test: N simulated app sessions generating reports at the same time.
+
+Each session plays what an auditor does in the app, one step after the
+other: Part I & II from an MA & AR letter, Part III & IV from a control
+workbook, then the final report from those two parts. Every upload is
+unique and carries a session token, so nothing is a cache hit, and every
+output is checked for the token of the session that asked for it. A
+missing output, or one holding another session's token, counts as a file
+collision.
+
+Jobs run on a JobManager pool like the app's (--workers 0 runs them on
+the session threads). --output isolated gives each job an artifact-store
+workspace, as the app does; --output shared writes Part I & II to the
+common generated_reports folder, as the CLI and batch runs do.
+--renderer stub replaces xelatex and LibreOffice with a sleep that
+writes a one-page PDF, so the tool runs without TeX or LibreOffice.
+
+The exit status is 1 when the error rate exceeds --max-error-rate, when
+a collision was seen, or when the p95 scenario latency exceeds --max-p95.
+
+    python -m benchmarks.load_test --sessions 8 --iterations 3
+    python -m benchmarks.load_test --sessions 8 --output shared --json load.json
+    python -m benchmarks.load_test --sessions 4 --renderer real --paragraphs 200 --rows 500
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+import zipfile
+from collections import Counter
+
+from benchmarks.corpus import make_control_workbook, make_ma_ar_docx
+
+OPERATIONS = ("part_i_ii", "part_iii_iv", "final_report")
+PERCENTILES = (50, 90, 95, 99)
+TOKEN_PATTERN = re.compile(rb"LT-[0-9a-f]{8}-s\d+i\d+")
+
+
+# === Stub renderer ===
+def stub_pdf(path, note):
+    """
+    Writes a minimal one-page PDF whose uncompressed content stream holds
+    ``note`` as a comment, so the tokens survive PDF merging.
+    """
+    content = b"% " + note + b"\n"
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>",
+               b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+               b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R >>",
+               b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+def _source_tokens(path):
+    if path.endswith(".docx"):
+        with zipfile.ZipFile(path) as package:
+            data = package.read("word/document.xml")
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+    # The source name keeps the stub PDFs of different parts distinct
+    return b" ".join(sorted(set(TOKEN_PATTERN.findall(data))) + [os.path.basename(path).encode()])
+
+
+@contextlib.contextmanager
+def _swapped(module, name, value):
+    original = getattr(module, name)
+    setattr(module, name, value)
+    try:
+        yield
+    finally:
+        setattr(module, name, original)
+
+
+@contextlib.contextmanager
+def _working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+@contextlib.contextmanager
+def stub_renderers(seconds):
+    """
+    Replaces LibreOffice and xelatex with a ``seconds`` sleep that holds the
+    tool's concurrency slot, like the real tools, and writes a stub PDF.
+    """
+    from backend import soc_report_gen
+    from backend.output import pdf_generator
+    from backend.utils.tool_limits import tool_slot
+
+    def convert_docx_to_pdf(docx_path, output_dir):
+        with tool_slot("libreoffice"):
+            time.sleep(seconds)
+        name = os.path.splitext(os.path.basename(docx_path))[0] + ".pdf"
+        return stub_pdf(os.path.join(output_dir, name), _source_tokens(docx_path))
+
+    def render_latex_to_pdf(tex_path, build_name=None):
+        with tool_slot("xelatex"):
+            time.sleep(seconds)
+        return stub_pdf(os.path.splitext(tex_path)[0] + ".pdf", _source_tokens(tex_path))
+
+    with _swapped(soc_report_gen, "convert_docx_to_pdf", convert_docx_to_pdf), \
+            _swapped(pdf_generator, "render_latex_to_pdf", render_latex_to_pdf):
+        yield
+
+
+# === Synthetic uploads ===
+def make_inputs(directory, token, paragraphs, rows, seed):
+    """
+    Writes an MA & AR letter and a control workbook that both carry ``token``.
+
+    Returns:
+        (letter path, workbook path)
+    """
+    import openpyxl
+    from docx import Document
+
+    letter = make_ma_ar_docx(os.path.join(directory, f"{token}.docx"), paragraphs, seed=seed)
+    doc = Document(letter)
+    doc.paragraphs[-1].insert_paragraph_before(f"会话 {token}")
+    doc.save(letter)
+
+    workbook = make_control_workbook(os.path.join(directory, f"{token}.xlsx"), rows, seed=seed)
+    wb = openpyxl.load_workbook(workbook)
+    wb.worksheets[0].append([token, f"会话 {token}", "检查", "有效", ""])
+    wb.save(workbook)
+    return letter, workbook
+
+
+def output_tokens(path):
+    """
+    Returns the session tokens found in a generated .docx or stub .pdf.
+    """
+    if path.endswith(".docx"):
+        with zipfile.ZipFile(path) as package:
+            data = package.read("word/document.xml")
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+    return {token.decode("ascii") for token in TOKEN_PATTERN.findall(data)}
+
+
+def check_outputs(paths, token, check_pdf=True):
+    """
+    Returns a description per output that is missing or does not belong
+    to ``token``; real PDFs compress their text, so only stub PDFs are read.
+    """
+    problems = []
+    for path in paths:
+        if path.endswith(".pdf") and not check_pdf:
+            continue
+        if not path or not os.path.exists(path):
+            problems.append(f"{path}: missing")
+            continue
+        try:
+            found = output_tokens(path)
+        except (OSError, KeyError, zipfile.BadZipFile) as e:
+            problems.append(f"{path}: unreadable ({e})")
+            continue
+        if found != {token}:
+            problems.append(f"{path}: expected {token}, found {', '.join(sorted(found)) or 'no token'}")
+    return problems
+
+
+class _PeakRss:
+    """
+    Samples this process's resident set size in the background.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current_kb():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+        except (OSError, ValueError):
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, self.current_kb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, self.current_kb())
+
+
+# === Sessions ===
+class _Session:
+    def __init__(self, harness, index):
+        self.harness = harness
+        self.session_id = f"load{index}"
+        self.index = index
+
+    def run_job(self, operation, fn):
+        # Like the app: a job per step, generated in a workspace of its own
+        job_id = uuid.uuid4().hex
+        harness = self.harness
+        if harness.output == "isolated":
+            def job():
+                with harness.store.workspace(self.session_id, job_id) as work_dir:
+                    outputs = fn(work_dir)
+                    return harness.store.publish(self.session_id, job_id,
+                                                 {os.path.basename(path): path for path in outputs})
+        else:
+            def job():
+                return {os.path.basename(path): path for path in fn(None)}
+
+        start = time.perf_counter()
+        error = None
+        try:
+            if harness.job_manager is None:
+                published = job()
+            else:
+                submitted = harness.job_manager.submit(self.session_id, operation, job)
+                submitted.future.result()
+                if submitted.error is not None:
+                    raise submitted.error
+                published = submitted.result
+        except Exception as e:
+            published, error = None, f"{type(e).__name__}: {e}"
+            harness.log_error(operation, traceback.format_exc())
+        harness.record(operation, time.perf_counter() - start, error)
+        return published
+
+    def scenario(self, iteration, letter, workbook):
+        from backend.soc_report_gen import generate_final_report, generate_part_i_ii, generate_part_iii_iv
+
+        harness = self.harness
+        token = harness.token(self.index, iteration)
+
+        def part_i_ii(work_dir):
+            with open(letter, "rb") as f:
+                if work_dir is None:
+                    # The shared folder and fixed name of the CLI and batch defaults
+                    return generate_part_i_ii(f, pdf_engine=harness.pdf_engine)
+                return generate_part_i_ii(f, pdf_engine=harness.pdf_engine, output_dir=work_dir)
+
+        def part_iii_iv(work_dir):
+            with open(workbook, "rb") as f:
+                base = generate_part_iii_iv(f, output_dir=work_dir)
+            return base + ".pdf", base + ".docx"
+
+        start = time.perf_counter()
+        parts = {}
+        for operation, fn, name in (("part_i_ii", part_i_ii, "Part_I_II"),
+                                    ("part_iii_iv", part_iii_iv, "Part_III_IV")):
+            published = self.run_job(operation, fn)
+            if published is None:
+                harness.record("scenario", time.perf_counter() - start, "step failed")
+                return
+            paths = sorted(published.values())
+            harness.check(operation, paths, token)
+            parts[name] = paths
+            time.sleep(harness.think_time)
+
+        def final_report(work_dir):
+            files = []
+            for name, paths in parts.items():
+                for path in paths:
+                    with open(path, "rb") as f:
+                        upload = io.BytesIO(f.read())
+                    # Uploaded under the names the app offers for download
+                    upload.name = name + os.path.splitext(path)[1]
+                    files.append(upload)
+            base = generate_final_report([f for f in files if f.name.endswith(".docx")],
+                                         pdf_files=[f for f in files if f.name.endswith(".pdf")],
+                                         output_dir=work_dir)
+            return base + ".pdf", base + ".docx"
+
+        published = self.run_job("final_report", final_report)
+        if published is not None:
+            harness.check("final_report", sorted(published.values()), token)
+        harness.record("scenario", time.perf_counter() - start, None if published is not None else "step failed")
+
+    def run(self, inputs):
+        time.sleep(self.harness.ramp_up * self.index / max(self.harness.sessions, 1))
+        for iteration, (letter, workbook) in enumerate(inputs):
+            self.scenario(iteration, letter, workbook)
+
+
+class LoadTest:
+    """
+    Runs ``sessions`` concurrent sessions of ``iterations`` scenarios each
+    and collects latencies, errors and collisions.
+    """
+
+    def __init__(self, sessions=4, iterations=2, paragraphs=60, rows=200, renderer="stub", stub_seconds=0.2,
+                 output="isolated", workers=None, pdf_engine="libreoffice", think_time=0.0, ramp_up=0.0,
+                 cache=True, log=print):
+        self.sessions = sessions
+        self.iterations = iterations
+        self.paragraphs = paragraphs
+        self.rows = rows
+        self.renderer = renderer
+        self.stub_seconds = stub_seconds
+        self.output = output
+        self.workers = workers
+        self.pdf_engine = pdf_engine
+        self.think_time = think_time
+        self.ramp_up = ramp_up
+        self.cache = cache
+        self.log = log
+        self.run_id = uuid.uuid4().hex[:8]
+        self.latencies = {name: [] for name in OPERATIONS + ("scenario",)}
+        self.errors = Counter()
+        self.error_types = Counter()
+        self.collisions = []
+        self.store = None
+        self.job_manager = None
+        self._lock = threading.Lock()
+
+    def token(self, session, iteration):
+        return f"LT-{self.run_id}-s{session}i{iteration}"
+
+    def record(self, operation, seconds, error):
+        with self._lock:
+            self.latencies[operation].append(seconds)
+            if error:
+                self.errors[operation] += 1
+                if operation != "scenario":
+                    self.error_types[error.split(":")[0]] += 1
+
+    def log_error(self, operation, details):
+        if self.log:
+            self.log(f"{operation} failed:\n{details}")
+
+    def check(self, operation, paths, token):
+        problems = check_outputs(paths, token, check_pdf=self.renderer == "stub")
+        if problems:
+            with self._lock:
+                self.collisions.extend(f"{operation}: {p}" for p in problems)
+
+    def run(self):
+        """
+        Returns:
+            The summary dict, see ``summarize``.
+        """
+        from backend import soc_report_gen
+        from backend.utils.artifact_store import ArtifactStore
+        from backend.utils.job_queue import DEFAULT_MAX_WORKERS, JobManager
+        from backend.utils.output_cache import OutputCache
+
+        with contextlib.ExitStack() as stack:
+            work_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="soc_load_"))
+            inputs_dir = os.path.join(work_dir, "inputs")
+            os.makedirs(inputs_dir)
+            inputs = [[make_inputs(inputs_dir, self.token(s, i), self.paragraphs, self.rows, seed=s * 1000 + i)
+                       for i in range(self.iterations)] for s in range(self.sessions)]
+
+            # generated_reports and the cache are relative to the working directory
+            stack.enter_context(_working_directory(work_dir))
+            cache_root = os.path.join(work_dir, "cache")
+            cache = OutputCache(root=cache_root) if self.cache else OutputCache(root=cache_root, max_bytes=0)
+            stack.enter_context(_swapped(soc_report_gen, "output_cache", cache))
+            if self.renderer == "stub":
+                stack.enter_context(stub_renderers(self.stub_seconds))
+            self.store = ArtifactStore(root=os.path.join(work_dir, "sessions"))
+            workers = DEFAULT_MAX_WORKERS if self.workers is None else self.workers
+            if workers:
+                self.job_manager = JobManager(max_workers=workers, per_session_limit=2)
+                stack.callback(self.job_manager.shutdown)
+
+            sessions = [_Session(self, s) for s in range(self.sessions)]
+            threads = [threading.Thread(target=session.run, args=(inputs[s],), name=f"load-session-{s}")
+                       for s, session in enumerate(sessions)]
+            with _PeakRss() as rss:
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                wall = time.perf_counter() - start
+
+        return self.summarize(wall, rss.peak_kb, workers)
+
+    def summarize(self, wall_seconds, peak_rss_kb, workers):
+        def stats(samples):
+            if not samples:
+                return {}
+            ordered = sorted(samples)
+            result = {f"p{p}_s": ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+                      for p in PERCENTILES}
+            result.update(mean_s=statistics.fmean(ordered), max_s=ordered[-1])
+            return result
+
+        operations = {name: dict(count=len(samples), errors=self.errors[name], **stats(samples))
+                      for name, samples in self.latencies.items()}
+        total = sum(operations[name]["count"] for name in OPERATIONS)
+        failed = sum(operations[name]["errors"] for name in OPERATIONS)
+        completed = operations["scenario"]["count"] - operations["scenario"]["errors"]
+        return {
+            "meta": {"sessions": self.sessions, "iterations": self.iterations, "paragraphs": self.paragraphs,
+                     "rows": self.rows, "renderer": self.renderer, "stub_seconds": self.stub_seconds,
+                     "output": self.output, "workers": workers, "pdf_engine": self.pdf_engine,
+                     "cache": self.cache},
+            "wall_s": wall_seconds,
+            "throughput": {"scenarios_per_min": completed / wall_seconds * 60 if wall_seconds else 0.0,
+                           "operations_per_s": (total - failed) / wall_seconds if wall_seconds else 0.0},
+            "operations": operations,
+            "error_rate": failed / total if total else 0.0,
+            "error_types": dict(self.error_types),
+            "collisions": list(self.collisions),
+            "peak_rss_mb": peak_rss_kb / 1024,
+            "peak_children_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        }
+
+
+def format_summary(summary):
+    meta = summary["meta"]
+    lines = [f"{meta['sessions']} sessions x {meta['iterations']} scenarios, renderer {meta['renderer']}"
+             + (f" ({meta['stub_seconds']:.2f}s)" if meta["renderer"] == "stub" else "")
+             + f", output {meta['output']}, {meta['workers'] or 'no'} job workers",
+             f"{'operation':<14}{'count':>6}{'errors':>7}" + "".join(f"{'p%d' % p:>9}" for p in PERCENTILES)
+             + f"{'max':>9}"]
+    for name, op in summary["operations"].items():
+        row = f"{name:<14}{op['count']:>6}{op['errors']:>7}"
+        if op["count"]:
+            row += "".join(f"{op[f'p{p}_s']:>8.2f}s" for p in PERCENTILES) + f"{op['max_s']:>8.2f}s"
+        lines.append(row)
+    throughput = summary["throughput"]
+    lines.append(f"throughput: {throughput['scenarios_per_min']:.1f} scenarios/min, "
+                 f"{throughput['operations_per_s']:.2f} operations/s over {summary['wall_s']:.1f}s")
+    errors = ", ".join(f"{name} {count}" for name, count in summary["error_types"].items())
+    lines.append(f"error rate: {summary['error_rate']:.1%}" + (f" ({errors})" if errors else ""))
+    lines.append(f"file collisions: {len(summary['collisions'])}")
+    lines.extend(f"  {c}" for c in summary["collisions"][:10])
+    lines.append(f"peak RSS: {summary['peak_rss_mb']:.0f} MB, largest child process "
+                 f"{summary['peak_children_rss_mb']:.0f} MB")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=2, help="scenarios per session")
+    parser.add_argument("--paragraphs", type=int, default=60, help="MA & AR paragraphs per letter")
+    parser.add_argument("--rows", type=int, default=200, help="controls per workbook")
+    parser.add_argument("--renderer", choices=("stub", "real"), default="stub")
+    parser.add_argument("--stub-seconds", type=float, default=0.2, help="time one stub render takes")
+    parser.add_argument("--output", choices=("isolated", "shared"), default="isolated")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="job pool size (default SOC_JOB_WORKERS; 0 runs jobs on the session threads)")
+    parser.add_argument("--pdf-engine", default="libreoffice", help="Part I & II PDF engine")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds between a session's steps")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which sessions start")
+    parser.add_argument("--no-cache", action="store_true", help="disable the output cache")
+    parser.add_argument("--json", help="also write the summary to this file")
+    parser.add_argument("--max-error-rate", type=float, default=0.0)
+    parser.add_argument("--max-p95", type=float, default=None, help="seconds, for the whole scenario")
+    parser.add_argument("--quiet", action="store_true", help="do not print tracebacks of failed steps")
+    args = parser.parse_args()
+
+    summary = LoadTest(sessions=args.sessions, iterations=args.iterations, paragraphs=args.paragraphs,
+                       rows=args.rows, renderer=args.renderer, stub_seconds=args.stub_seconds, output=args.output,
+                       workers=args.workers, pdf_engine=args.pdf_engine, think_time=args.think_time,
+                       ramp_up=args.ramp_up, cache=not args.no_cache, log=None if args.quiet else print).run()
+    print(format_summary(summary))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    p95 = summary["operations"]["scenario"].get("p95_s", 0.0)
+    if (summary["error_rate"] > args.max_error_rate or summary["collisions"]
+            or (args.max_p95 is not None and p95 > args.max_p95)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
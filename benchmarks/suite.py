@@ -0,0 +1,220 @@
+"""
+Times each stage of the report pipeline on synthetic inputs of several
+sizes and compares the results with a saved baseline.
+
+In-process stages (parsing, DOCX writing, LaTeX assembly) run at every
+size; the external renderers (xelatex, LibreOffice, pandoc) only up to
+--external-max and only when installed. Timings are the best of --repeat
+runs. Baselines are specific to the machine they were recorded on.
+
+    python -m benchmarks.suite --sizes 10,1000,10000 --save
+    python -m benchmarks.suite --sizes 10,1000,10000 --compare    # exit 1 on a slowdown
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import make_control_workbook, make_ma_ar_docx
+
+DEFAULT_BASELINE = os.path.join(".benchmarks", "baseline.json")
+# A stage regresses when it is this much slower than the baseline...
+DEFAULT_THRESHOLD = 1.25
+# ...and slower by at least this many seconds, so timer noise on tiny inputs is ignored
+MIN_DELTA_SECONDS = 0.005
+
+
+class Bench:
+    """
+    One timed stage. ``setup(ctx)`` builds the arguments outside the timed
+    region, ``run(*args)`` is timed; ``external`` names the tool it needs.
+    """
+
+    def __init__(self, name, run, setup=lambda ctx: (), external=None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.external = external
+
+
+def _drain(chunks):
+    for _ in chunks:
+        pass
+
+
+def _controls_latex(path):
+    from backend.output.pdf_generator import iter_controls_latex
+    from backend.extract.control_matrix import iter_control_chunks
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        out.writelines(iter_controls_latex(iter_control_chunks(path)))
+
+
+def _report_latex(report):
+    from backend.output.pdf_generator import build_report_latex
+    from backend.utils.latex_utils import latex_document_wrapper
+    return latex_document_wrapper(build_report_latex(report))
+
+
+def _write_report_tex(ctx):
+    from backend.extract.report_model import parse_ma_ar_report
+    tex_path = os.path.join(ctx["tmp_dir"], "report.tex")
+    with open(tex_path, "w", encoding="utf-8") as f:
+        f.write(_report_latex(parse_ma_ar_report(ctx["ma_ar"])))
+    return tex_path, os.path.join(ctx["tmp_dir"], "latex_build")
+
+
+def _xelatex(tex_path, build_dir):
+    from backend.utils.latex_build import compile_latex
+    compile_latex(tex_path, "report", build_dir=build_dir)
+
+
+def _report_docx(ctx):
+    from backend.output.word_generator import generate_ma_ar_docx
+    return generate_ma_ar_docx(ctx["ma_ar"], None, os.path.join(ctx["tmp_dir"], "render_input")), ctx["tmp_dir"]
+
+
+def _libreoffice(docx_path, out_dir):
+    from backend.utils.convert_docx_to_pdf import convert_docx_to_pdf_subprocess
+    convert_docx_to_pdf_subprocess(docx_path, out_dir)
+
+
+def _pandoc(tex_path, _build_dir):
+    from backend.soc_report_gen import convert_tex_to_docx
+    convert_tex_to_docx(tex_path)
+
+
+def _final_report_parts(ctx):
+    from backend.extract.control_matrix import iter_control_chunks
+    from backend.output.word_generator import generate_controls_docx
+    controls = generate_controls_docx(iter_control_chunks(ctx["controls"]), os.path.join(ctx["tmp_dir"], "part_iii_iv"))
+    parts = []
+    for path in (ctx["ma_ar"], controls):
+        with open(path, "rb") as f:
+            parts.append((os.path.basename(path), f.read()))
+    return (parts,)
+
+
+def _benches():
+    from backend.extract.control_matrix import iter_control_chunks
+    from backend.extract.ma_ar_parser import extract_ma_ar_sections_xml
+    from backend.extract.report_model import parse_ma_ar_report
+    from backend.output.part_ingest import ingest_parts
+    from backend.output.word_generator import generate_controls_docx, generate_ma_ar_docx
+
+    return (
+        Bench("extract_ma_ar_sections", extract_ma_ar_sections_xml, lambda ctx: (ctx["ma_ar"],)),
+        Bench("parse_ma_ar", parse_ma_ar_report, lambda ctx: (ctx["ma_ar"],)),
+        Bench("generate_ma_ar_docx", generate_ma_ar_docx,
+              lambda ctx: (ctx["ma_ar"], None, os.path.join(ctx["tmp_dir"], "ma_ar_out"))),
+        Bench("report_latex", _report_latex, lambda ctx: (parse_ma_ar_report(ctx["ma_ar"]),)),
+        Bench("control_chunks", lambda path: _drain(iter_control_chunks(path)), lambda ctx: (ctx["controls"],)),
+        Bench("controls_latex", _controls_latex, lambda ctx: (ctx["controls"],)),
+        Bench("controls_docx", lambda path, base: generate_controls_docx(iter_control_chunks(path), base),
+              lambda ctx: (ctx["controls"], os.path.join(ctx["tmp_dir"], "controls_out"))),
+        Bench("ingest_parts", ingest_parts, _final_report_parts),
+        Bench("xelatex_report", _xelatex, _write_report_tex, external="xelatex"),
+        Bench("libreoffice_report", _libreoffice, _report_docx, external="libreoffice"),
+        Bench("pandoc_report", _pandoc, _write_report_tex, external="pandoc"),
+    )
+
+
+def time_bench(bench, ctx, repeat):
+    args = bench.setup(ctx)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        bench.run(*args)
+        samples.append(time.perf_counter() - start)
+    return {"best_s": min(samples), "median_s": statistics.median(samples)}
+
+
+def run_suite(sizes, repeat=3, cjk_ratio=0.7, seed=0, external_max=1000, only=None, log=print):
+    """
+    Runs every stage at every size.
+
+    Returns:
+        A dict with the run's ``meta`` and ``results`` keyed by
+        "stage[size]".
+    """
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ctx = {
+                "tmp_dir": tmp_dir,
+                "ma_ar": make_ma_ar_docx(os.path.join(tmp_dir, "ma_ar.docx"), size, cjk_ratio, seed),
+                "controls": make_control_workbook(os.path.join(tmp_dir, "controls.xlsx"), size, cjk_ratio, seed),
+            }
+            for bench in _benches():
+                if only and bench.name not in only:
+                    continue
+                if bench.external and (size > external_max or shutil.which(bench.external) is None):
+                    continue
+                key = f"{bench.name}[{size}]"
+                results[key] = time_bench(bench, ctx, repeat)
+                log(f"{key:<34} best {results[key]['best_s']:8.4f}s  median {results[key]['median_s']:8.4f}s")
+    return {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(), "sizes": list(sizes),
+                 "repeat": repeat, "cjk_ratio": cjk_ratio, "seed": seed},
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD, min_delta=MIN_DELTA_SECONDS):
+    """
+    Returns (key, baseline_s, current_s) for every stage whose best time
+    regressed past ``threshold`` times its baseline.
+    """
+    regressions = []
+    for key, result in current["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        before, after = base["best_s"], result["best_s"]
+        if after > before * threshold and after - before >= min_delta:
+            regressions.append((key, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,10000",
+                        help="comma-separated paragraph/row counts, e.g. 10,1000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cjk-ratio", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--external-max", type=int, default=1000,
+                        help="largest size the external renderers are run at")
+    parser.add_argument("--stage", action="append", help="only run this stage (repeatable)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="fail if a stage is slower than the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    current = run_suite([int(s) for s in args.sizes.split(",")], args.repeat, args.cjk_ratio, args.seed,
+                        args.external_max, args.stage)
+
+    if args.compare:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        for key, before, after in regressions:
+            print(f"REGRESSION {key}: {before:.4f}s -> {after:.4f}s ({after / before:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No stage slower than {args.threshold:.2f}x the baseline")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+import time
+
+import pytest
+
+from backend.utils.artifact_store import WORK_DIR, ArtifactStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(root=str(tmp_path / "store"), max_bytes=10_000, ttl_seconds=3600)
+
+
+def publish(store, session_id, job_id, size=100):
+    with store.workspace(session_id, job_id) as work_dir:
+        paths = {}
+        for name in ("report.pdf", "report.docx"):
+            paths[name] = os.path.join(work_dir, name)
+            with open(paths[name], "wb") as f:
+                f.write(b"x" * size)
+        return store.publish(session_id, job_id, paths)
+
+
+def test_sessions_and_jobs_are_isolated(store):
+    a = publish(store, "session_a", "job1")
+    b = publish(store, "session_b", "job1", size=200)
+    assert a["report.pdf"] != b["report.pdf"]
+    with store.open("session_a", "job1", "report.pdf") as f:
+        assert len(f.read()) == 100
+    with store.open("session_b", "job1", "report.pdf") as f:
+        assert len(f.read()) == 200
+    # Workspaces are gone once the outputs are published
+    assert os.listdir(os.path.join(store.root, WORK_DIR)) == []
+
+    store.remove("session_a")
+    assert store.open("session_a", "job1", "report.pdf") is None
+    assert store.path("session_b", "job1", "report.docx") == b["report.docx"]
+
+
+def test_republish_replaces_job_outputs(store):
+    publish(store, "s", "job", size=100)
+    publish(store, "s", "job", size=300)
+    assert os.path.getsize(store.path("s", "job", "report.pdf")) == 300
+    assert os.listdir(os.path.join(store.root, "s")) == ["job"]
+
+
+def test_lru_eviction_over_size_cap(store):
+    now = time.time()
+    for i in range(3):
+        publish(store, "s", f"job{i}", size=1_500)
+        os.utime(os.path.join(store.root, "s", f"job{i}"), (now - 100 + i, now - 100 + i))
+    # Reading job0 makes job1 the least recently used
+    assert store.path("s", "job0", "report.pdf")
+    publish(store, "s", "job3", size=1_500)
+
+    assert store.path("s", "job1", "report.pdf") is None
+    assert store.path("s", "job0", "report.pdf")
+    assert store.path("s", "job3", "report.pdf")
+    assert store.total_bytes() <= store.max_bytes
+
+
+def test_ttl_expiry_and_janitor(store):
+    publish(store, "old", "job")
+    publish(store, "new", "job")
+    past = time.time() - 2 * store.ttl_seconds
+    os.utime(os.path.join(store.root, "old", "job"), (past, past))
+
+    store.start_janitor(interval=0.01)
+    try:
+        deadline = time.time() + 5
+        while os.path.exists(os.path.join(store.root, "old")) and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        store.stop_janitor()
+    assert not os.path.exists(os.path.join(store.root, "old"))
+    assert store.path("new", "job", "report.pdf")
+
+
+def test_rejects_ids_that_escape_the_root(store):
+    with pytest.raises(ValueError):
+        store.path("..", "job", "report.pdf")
+    with pytest.raises(ValueError):
+        store.remove("s", "../other")
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend import batch, soc_report_gen
+
+
+def write(path, data=b"x"):
+    path.write_bytes(data)
+    return path
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    write(tmp_path / "a.docx")
+    write(tmp_path / "a.xlsx")
+    write(tmp_path / "b.xlsx")
+    path = tmp_path / "manifest.csv"
+    path.write_text("name,ma_ar,controls\nclient_a,a.docx,a.xlsx\nclient_b,,b.xlsx\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def fake_generators(monkeypatch):
+    # Like the real generators, outputs are named after the inputs
+    def make(output_dir, base):
+        for ext in (".pdf", ".docx"):
+            with open(os.path.join(output_dir, base + ext), "wb") as f:
+                f.write(base.encode())
+        return os.path.join(output_dir, base)
+
+    def digest(f):
+        return hashlib.sha256(f.read()).hexdigest()[:8]
+
+    monkeypatch.setattr(soc_report_gen, "generate_part_i_ii",
+                        lambda f, output_dir: tuple(make(output_dir, "Part_I_II") + ext for ext in (".pdf", ".docx")))
+    monkeypatch.setattr(soc_report_gen, "generate_part_iii_iv",
+                        lambda f, output_dir: make(output_dir, f"part3_4_{digest(f)}"))
+    monkeypatch.setattr(soc_report_gen, "generate_final_report",
+                        lambda files, pdf_files, output_dir: make(output_dir, f"final_{len(files)}"))
+    return make
+
+
+def test_load_manifest_resolves_relative_paths(manifest, tmp_path):
+    entries = batch.load_manifest(str(manifest))
+    assert [e["name"] for e in entries] == ["client_a", "client_b"]
+    assert entries[0]["ma_ar"] == str(tmp_path / "a.docx")
+    assert entries[1]["ma_ar"] is None
+
+
+def test_load_manifest_json_and_validation(tmp_path):
+    write(tmp_path / "a.docx")
+    path = tmp_path / "m.json"
+    path.write_text(json.dumps([{"name": "x", "ma_ar": "a.docx"}]))
+    assert batch.load_manifest(str(path))[0]["controls"] is None
+
+    for rows, message in (([{"name": "x"}], "needs"),
+                          ([{"name": "x", "ma_ar": "missing.docx"}], "not found"),
+                          ([{"name": "../x", "ma_ar": "a.docx"}], "invalid name"),
+                          ([{"name": "x", "ma_ar": "a.docx"}] * 2, "duplicate")):
+        path.write_text(json.dumps(rows))
+        with pytest.raises(ValueError, match=message):
+            batch.load_manifest(str(path))
+
+
+def test_run_batch_generates_then_resumes(manifest, tmp_path, fake_generators):
+    out = tmp_path / "out"
+    entries = batch.load_manifest(str(manifest))
+
+    results = batch.run_batch(entries, str(out), jobs=2)
+    assert sorted(r["status"] for r in results) == [batch.DONE, batch.DONE]
+    assert sorted(os.listdir(out / "client_a")) == sorted(
+        p + e for p in batch.PARTS for e in batch.EXTENSIONS)
+    assert (out / "client_a" / "SOC_Report.pdf").read_bytes().startswith(b"final_2")
+    # The final report needs both parts
+    assert sorted(os.listdir(out / "client_b")) == ["Part_III_IV.docx", "Part_III_IV.pdf"]
+
+    # An interrupted engagement only regenerates what is missing
+    os.remove(out / "client_b" / "Part_III_IV.docx")
+    results = batch.run_batch(entries, str(out), jobs=2)
+    assert {r["name"]: r["status"] for r in results} == {"client_a": batch.SKIPPED, "client_b": batch.DONE}
+
+
+def test_failures_are_reported_not_raised(manifest, tmp_path, fake_generators, monkeypatch):
+    def boom(f, output_dir):
+        raise RuntimeError("bad workbook")
+    monkeypatch.setattr(soc_report_gen, "generate_part_iii_iv", boom)
+
+    results = batch.run_batch(batch.load_manifest(str(manifest)), str(tmp_path / "out"), jobs=2)
+    assert all(r["status"] == batch.FAILED for r in results)
+    assert "bad workbook" in batch.format_summary(results, 1.0)
+
+
+def test_concurrent_identical_jobs_do_not_share_outputs(manifest, tmp_path, fake_generators, monkeypatch):
+    out = tmp_path / "out"
+    entry = batch.load_manifest(str(manifest))[0]
+    both_running = threading.Barrier(2, timeout=10)
+    generate = soc_report_gen.generate_part_iii_iv
+
+    def in_step(f, output_dir):
+        # Both jobs have written the same file name before either publishes it
+        output_base = generate(f, output_dir)
+        both_running.wait()
+        return output_base
+    monkeypatch.setattr(soc_report_gen, "generate_part_iii_iv", in_step)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(lambda _: batch.run_report(entry, str(out)), range(2)))
+    assert [r["status"] for r in results] == [batch.DONE, batch.DONE], results
+    # Scratch folders are gone and every output is complete
+    assert sorted(os.listdir(out / "client_a")) == sorted(p + e for p in batch.PARTS for e in batch.EXTENSIONS)
+    assert (out / "client_a" / "Part_III_IV.pdf").read_bytes().startswith(b"part3_4_")
+
+
+def test_summary_reports_throughput():
+    results = [{"name": "a", "status": batch.DONE}, {"name": "b", "status": batch.DONE},
+               {"name": "c", "status": batch.SKIPPED}]
+    assert batch.format_summary(results, 30.0).startswith("2 generated, 1 skipped, 0 failed in 30.0s (4.0 reports/min)")
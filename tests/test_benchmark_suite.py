@@ -0,0 +1,33 @@
+from benchmarks.corpus import make_control_workbook, make_ma_ar_docx
+from benchmarks.suite import compare, run_suite
+from backend.extract.control_matrix import iter_control_chunks
+from backend.extract.ma_ar_parser import extract_ma_ar_sections_xml
+
+
+def test_corpus_is_parseable_and_reproducible(tmp_path):
+    path = make_ma_ar_docx(str(tmp_path / "a.docx"), 40, cjk_ratio=0.5, seed=3)
+    ma_text, ar_text, _ = extract_ma_ar_sections_xml(path)
+    # Each section keeps its heading paragraph
+    assert len(ma_text) == 21 and len(ar_text) == 21
+    assert any("本公司" in t or "系统" in t for t in ma_text + ar_text)
+    assert any("Management" in t or "CAB" in t for t in ma_text + ar_text)
+
+    again = make_ma_ar_docx(str(tmp_path / "b.docx"), 40, cjk_ratio=0.5, seed=3)
+    assert extract_ma_ar_sections_xml(again)[:2] == (ma_text, ar_text)
+
+    workbook = make_control_workbook(str(tmp_path / "c.xlsx"), 25, sheets=2)
+    assert sum(len(chunk) for chunk in iter_control_chunks(workbook)) == 25
+
+
+def test_compare_flags_only_real_slowdowns():
+    baseline = {"results": {"a[10]": {"best_s": 1.0}, "b[10]": {"best_s": 0.001}, "c[10]": {"best_s": 1.0}}}
+    current = {"results": {"a[10]": {"best_s": 1.5}, "b[10]": {"best_s": 0.003}, "c[10]": {"best_s": 1.1},
+                           "new[10]": {"best_s": 9.0}}}
+    # b doubled but only by 2 ms; c is within the threshold; new has no baseline
+    assert compare(current, baseline) == [("a[10]", 1.0, 1.5)]
+
+
+def test_suite_runs_selected_stages():
+    result = run_suite([10], repeat=1, only=["extract_ma_ar_sections", "controls_docx"], log=lambda line: None)
+    assert set(result["results"]) == {"extract_ma_ar_sections[10]", "controls_docx[10]"}
+    assert result["meta"]["sizes"] == [10]
@@ -0,0 +1,115 @@
+import datetime
+import os
+
+import openpyxl
+import pandas as pd
+import pytest
+from docx import Document
+
+from backend.extract.control_matrix import (
+    CONTROL_COLUMNS,
+    control_cells_text,
+    iter_control_chunks,
+    normalize_control_matrix,
+)
+from backend.output.pdf_generator import build_controls_latex
+from backend.output.word_generator import generate_controls_docx
+
+
+@pytest.fixture
+def workbook_df():
+    return pd.DataFrame({
+        "Control ID": [1.0, 2.0, None],
+        "控制描述": ["权限复核 & 审批_1", "{备份}每日 100%", None],
+        "Testing Procedures": ["抽样检查\n核对日志", "检查备份记录", None],
+        "测试结果": ["有效", "有效", None],
+    })
+
+
+def test_normalize_control_matrix(workbook_df):
+    df = normalize_control_matrix(workbook_df)
+
+    assert list(df.columns) == list(CONTROL_COLUMNS)
+    assert len(df) == 2  # the empty row is dropped
+    # Integer IDs stay numbers (Excel reads them as floats once a cell is blank)
+    assert str(df["control_id"].dtype) == "Int64" and df["control_id"].tolist() == [1, 2]
+    assert df["exceptions"].tolist() == ["", ""]
+    assert control_cells_text(df)["control_id"].tolist() == ["1", "2"]
+
+
+def test_normalize_keeps_dates_typed_and_formats_mixed_columns():
+    df = normalize_control_matrix(pd.DataFrame({
+        "Control ID": [1.0, "CC-2", 3],
+        "Result": [datetime.datetime(2024, 12, 31), datetime.datetime(2025, 1, 2, 9, 30), None],
+    }))
+    assert df["control_id"].tolist() == ["1", "CC-2", "3"]
+    assert pd.api.types.is_datetime64_any_dtype(df["result"])
+    assert control_cells_text(df)["result"].tolist() == ["2024-12-31", "2025-01-02 09:30", ""]
+
+
+def test_repeated_headers_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="'ID' and 'Control ID'"):
+        normalize_control_matrix(pd.DataFrame([[1, 2, "x"]], columns=["ID", "Control ID", "Description"]))
+
+    workbook = openpyxl.Workbook()
+    workbook.active.title = "Controls"
+    workbook.active.append(["Control ID", "Description", "Description"])
+    workbook.active.append([1, "a", "b"])
+    workbook.save(tmp_path / "dup.xlsx")
+    with pytest.raises(ValueError, match="Sheet 'Controls'"):
+        list(iter_control_chunks(str(tmp_path / "dup.xlsx")))
+
+
+def test_normalize_rejects_unknown_columns():
+    with pytest.raises(ValueError):
+        normalize_control_matrix(pd.DataFrame({"foo": [1], "bar": [2]}))
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    workbook = openpyxl.Workbook()
+    cover = workbook.active
+    cover.title = "封面"
+    cover.append(["SOC 报告"])
+    controls = workbook.create_sheet("Controls")
+    controls.append(["Control ID", "Description", "Result"])
+    for i in range(25):
+        controls.append([i + 1, f"控制 {i + 1}", "有效"])
+    path = tmp_path / "controls.xlsx"
+    workbook.save(path)
+    return str(path)
+
+
+def test_iter_control_chunks_streams_matching_sheets(workbook_path):
+    chunks = list(iter_control_chunks(workbook_path, chunk_size=10))
+
+    assert [len(c) for c in chunks] == [10, 10, 5]
+    assert chunks[0]["control_id"].tolist()[:2] == [1, 2]
+    assert all(list(c.columns) == list(CONTROL_COLUMNS) for c in chunks)
+
+
+def test_iter_control_chunks_sheet_selection(workbook_path):
+    assert sum(len(c) for c in iter_control_chunks(workbook_path, sheet_name="Controls")) == 25
+    with pytest.raises(ValueError):
+        list(iter_control_chunks(workbook_path, sheet_name="封面"))
+    with pytest.raises(ValueError):
+        list(iter_control_chunks(workbook_path, sheet_name="Missing"))
+
+
+def test_controls_latex_escapes_cells(workbook_df):
+    tex = build_controls_latex(normalize_control_matrix(workbook_df))
+
+    assert r"\begin{longtable}" in tex
+    assert r"权限复核 \& 审批\_1" in tex
+    assert r"\{备份\}每日 100\%" in tex
+    assert r"抽样检查\newline{}核对日志" in tex
+
+
+def test_controls_docx_table(workbook_df, tmp_path):
+    docx_path = generate_controls_docx([normalize_control_matrix(workbook_df)], str(tmp_path / "Part_III_IV"))
+
+    assert os.path.exists(docx_path)
+    table = Document(docx_path).tables[0]
+    assert len(table.rows) == 3  # header + two controls
+    assert table.rows[1].cells[1].text == "权限复核 & 审批_1"
+    assert table.rows[1].cells[2].text == "抽样检查\n核对日志"
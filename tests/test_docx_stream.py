@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+import zipfile
+
+import pandas as pd
+import pytest
+from docx import Document
+
+from backend.extract.control_matrix import CONTROL_COLUMNS
+from backend.extract.report_model import Report, make_section
+from backend.output.word_generator import generate_controls_docx, render_report_docx
+
+REPORT = Report((
+    make_section("part_i", ["第一部分 管理层认定", "  A & B <c>\t制表 ", "末段"], 1),
+    make_section("part_ii", ["第二部分 审计师报告", "意见", "事务所", "北京", "2025年1月1日"], 3),
+))
+
+
+def layout(path):
+    doc = Document(path)
+    paragraphs = [
+        (p.text, p.alignment, p.paragraph_format.first_line_indent,
+         [(r.bold, r.font.size) for r in p.runs], "w:br" in p._p.xml and 'w:type="page"' in p._p.xml)
+        for p in doc.paragraphs
+    ]
+    tables = [[[c.text for c in row.cells] for row in t.rows] for t in doc.tables]
+    normal = doc.styles["Normal"]
+    return paragraphs, tables, (normal.font.name, normal.font.size, normal.element.rPr.rFonts.xml)
+
+
+@pytest.mark.parametrize("writer", ["stream", "python-docx"])
+def test_writers_produce_valid_packages(tmp_path, writer):
+    path = render_report_docx(REPORT, str(tmp_path / writer), writer=writer)
+    with zipfile.ZipFile(path) as package:
+        assert package.testzip() is None
+        assert "word/document.xml" in package.namelist()
+
+
+def test_stream_writer_matches_python_docx_for_reports(tmp_path):
+    stream = render_report_docx(REPORT, str(tmp_path / "stream"), writer="stream")
+    reference = render_report_docx(REPORT, str(tmp_path / "reference"), writer="python-docx")
+    assert layout(stream) == layout(reference)
+
+
+def test_stream_writer_matches_python_docx_for_control_tables(tmp_path):
+    chunks = [pd.DataFrame([[f"C-{i}", "描述 & <x>", "程序\n第二行", "有效", ""] for i in range(n)],
+                           columns=list(CONTROL_COLUMNS), dtype="string") for n in (3, 0, 2)]
+    stream = generate_controls_docx(iter(chunks), str(tmp_path / "stream"), writer="stream")
+    reference = generate_controls_docx(iter(chunks), str(tmp_path / "reference"), writer="python-docx")
+    assert layout(stream) == layout(reference)
+    assert len(layout(stream)[1][0]) == 6
+
+
+def test_failed_stream_leaves_no_file(tmp_path):
+    def broken_chunks():
+        raise RuntimeError("bad workbook")
+        yield
+
+    with pytest.raises(RuntimeError):
+        generate_controls_docx(broken_chunks(), str(tmp_path / "out"), writer="stream")
+    assert not (tmp_path / "out.docx").exists()
+
+
+def test_concurrent_stream_writers_produce_valid_packages(tmp_path):
+    # Writers share the cached template parts; each package must still be intact
+    def write(i):
+        report = Report((make_section("part_i", ["第一部分 管理层认定", f"段落 {i}"] + ["段落"] * (i % 7), 1),))
+        return render_report_docx(report, str(tmp_path / f"report_{i}"), writer="stream")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        paths = list(executor.map(write, range(64)))
+    for i, path in enumerate(paths):
+        with zipfile.ZipFile(path) as package:
+            assert package.testzip() is None
+        assert f"段落 {i}" in [p.text for p in Document(path).paragraphs]
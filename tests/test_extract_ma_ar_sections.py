@@ -2,7 +2,7 @@ import os
 import shutil
 import pytest
 from docx import Document
-from backend.extract.ma_ar_parser import extract_ma_ar_sections
+from backend.extract.ma_ar_parser import extract_ma_ar_sections, extract_ma_ar_sections_xml
 from tests.utils.test_helpers import save_sections_to_docx
 from backend.output.word_generator import generate_ma_ar_docx
 
@@ -40,6 +40,30 @@ def test_extract_sections(test_docx_file):
     assert "管理层的第一段" in "".join(ma)
     assert "审计师报告的第一段" in "".join(ar)
 
+def test_extract_sections_xml_matches_object_model(test_docx_file):
+    ma, ar, (ma_offsets, ar_offsets) = extract_ma_ar_sections_xml(test_docx_file)
+
+    assert (ma, ar) == extract_ma_ar_sections(Document(test_docx_file))
+    assert ma_offsets == [1, 2, 3]
+    assert ar_offsets == [4, 5]
+
+def test_extract_sections_xml_skips_tables_and_keeps_run_text(clean_output_dir):
+    path = os.path.join(clean_output_dir, "tables.docx")
+    doc = Document()
+    doc.add_paragraph("第一部分 管理层认定")
+    paragraph = doc.add_paragraph("甲")
+    paragraph.add_run("乙\t丙").add_break()
+    # Paragraphs inside tables are not part of Document.paragraphs
+    doc.add_table(rows=1, cols=1).cell(0, 0).text = "审计师报告（表格内）"
+    doc.add_paragraph("第二部分 审计师报告")
+    doc.add_paragraph("结论")
+    doc.save(path)
+
+    ma, ar, _ = extract_ma_ar_sections_xml(path)
+    assert (ma, ar) == extract_ma_ar_sections(Document(path))
+    assert ma[1] == "甲乙\t丙"
+    assert ar == ["第二部分 审计师报告", "结论"]
+
 def test_generate_ma_ar_docx(test_docx_file, clean_output_dir):
     base_output_path = os.path.join(clean_output_dir, "Part_I_II")
     with open(test_docx_file, "rb") as f:
@@ -0,0 +1,12 @@
+import subprocess
+import sys
+
+HEAVY_MODULES = ("streamlit", "pandas", "openpyxl", "pylatexenc")
+
+
+def test_backend_imports_without_ui_or_dataframe_libraries():
+    # Fresh interpreter: other tests have already imported pandas here
+    code = ("import sys, backend.soc_report_gen, backend.batch; "
+            f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
@@ -0,0 +1,174 @@
+import io
+
+import pytest
+from docx import Document
+
+from backend import soc_report_gen
+from backend.extract.report_model import parse_ma_ar_report
+from backend.output.word_generator import render_report_docx
+from backend.utils.output_cache import OutputCache
+
+pypdf = pytest.importorskip("pypdf")
+
+
+def ma_ar_docx(opinion, title=None):
+    doc = Document()
+    if title:
+        doc.core_properties.title = title
+    for text in ("第一部分 管理层认定", "本公司管理层负责。", "签字人",
+                 "第二部分 独立服务审计师报告", opinion, "会计师事务所", "北京", "2024年12月31日"):
+        doc.add_paragraph(text)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def blank_pdf(path, pages=1):
+    writer = pypdf.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+@pytest.fixture
+def conversions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(soc_report_gen, "output_cache", OutputCache(root=str(tmp_path / "cache")))
+    converted = []
+
+    def convert(docx_path, output_dir):
+        converted.append(Document(docx_path).paragraphs[0].text)
+        return blank_pdf(docx_path[:-5] + ".pdf")
+
+    monkeypatch.setattr(soc_report_gen, "convert_docx_to_pdf", convert)
+    return converted
+
+
+@pytest.fixture
+def xelatex_sections(monkeypatch):
+    from backend.output import pdf_generator
+
+    rendered = []
+
+    def fake_xelatex(tex_path, build_name=None):
+        source = open(tex_path, encoding="utf-8").read()
+        rendered.append(next(t for t in ("管理层认定", "独立服务审计师报告") if t in source))
+        return blank_pdf(tex_path[:-4] + ".pdf")
+
+    monkeypatch.setattr(pdf_generator, "render_latex_to_pdf", fake_xelatex)
+    return rendered
+
+
+def test_part_i_ii_rerenders_only_changed_sections(conversions, xelatex_sections):
+    def generate(opinion, **kwargs):
+        return soc_report_gen.generate_part_i_ii(ma_ar_docx(opinion, **kwargs), pdf_engine="xelatex")
+
+    pdf_path, docx_path = generate("审计意见")
+    assert sorted(xelatex_sections) == ["独立服务审计师报告", "管理层认定"]
+    assert len(pypdf.PdfReader(pdf_path).pages) == 2
+
+    # Only the auditor's report changed
+    xelatex_sections.clear()
+    pdf_path, docx_path = generate("审计意见（修订）")
+    assert xelatex_sections == ["独立服务审计师报告"]
+    # Stitched from section fragments, yet paragraph for paragraph a single render
+    single = render_report_docx(parse_ma_ar_report(ma_ar_docx("审计意见（修订）")), "single")
+    assert [p.text for p in Document(docx_path).paragraphs] == [p.text for p in Document(single).paragraphs]
+    assert len(pypdf.PdfReader(pdf_path).pages) == 2
+
+    # New bytes, same content: nothing is rendered
+    xelatex_sections.clear()
+    generate("审计意见", title="re-saved")
+    assert xelatex_sections == [] and conversions == []
+
+
+def test_libreoffice_converts_part_i_ii_once(conversions):
+    # Per-section fragments would cost one soffice conversion per section
+    soc_report_gen.generate_part_i_ii(ma_ar_docx("审计意见"))
+    soc_report_gen.generate_part_i_ii(ma_ar_docx("审计意见（修订）"))
+    assert conversions == ["第一部分 – 管理层认定"] * 2
+
+
+def test_part_iii_iv_streams_the_workbook_once_per_output(tmp_path, monkeypatch):
+    openpyxl = pytest.importorskip("openpyxl")
+    monkeypatch.setattr(soc_report_gen, "output_cache", OutputCache(root=str(tmp_path / "cache")))
+    rendered, streams = [], []
+    iter_control_chunks = soc_report_gen.iter_control_chunks
+    monkeypatch.setattr(soc_report_gen, "iter_control_chunks",
+                        lambda source: streams.append(source) or iter_control_chunks(source))
+
+    def fake_output(ext):
+        def generate(chunks, output_base, *args):
+            list(chunks)
+            rendered.append(ext)
+            open(output_base + ext, "wb").close()
+            return output_base + ext
+        return generate
+
+    monkeypatch.setattr(soc_report_gen, "generate_controls_pdf", fake_output(".pdf"))
+    monkeypatch.setattr(soc_report_gen, "generate_controls_docx", fake_output(".docx"))
+
+    wb = openpyxl.Workbook()
+    wb.active.append(["Control ID", "Description", "Testing Procedures", "Result", "Exceptions"])
+    wb.active.append(["C-001", "复核用户权限", "检查复核记录", "有效", ""])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+
+    for _ in range(2):
+        soc_report_gen.generate_part_iii_iv(io.BytesIO(buffer.getvalue()), output_dir=str(tmp_path))
+    # Cold: one pass per output and no separate fingerprint pass; warm: none
+    assert len(streams) == 2
+    assert sorted(rendered) == [".docx", ".pdf"]
+
+
+def test_final_report_converts_only_changed_parts(conversions):
+    from tests.test_report_merger import docx_bytes, part_i_ii, part_iii_iv
+
+    def named(data, name):
+        f = io.BytesIO(data)
+        f.name = name
+        return f
+
+    part_iii = docx_bytes(part_iii_iv)
+    soc_report_gen.generate_final_report([named(docx_bytes(part_i_ii), "a.docx"), named(part_iii, "b.docx")])
+    assert sorted(conversions) == ["第一部分 管理层认定", "第三部分 系统描述"]
+
+    conversions.clear()
+    edited = docx_bytes(lambda doc: (part_i_ii(doc), doc.add_paragraph("补充说明")))
+    output_base = soc_report_gen.generate_final_report([named(edited, "a.docx"), named(part_iii, "b.docx")])
+    assert conversions == ["第一部分 管理层认定"]
+    reader = pypdf.PdfReader(output_base + ".pdf")
+    assert len(reader.pages) == 2 and len(reader.outline) == 4
+
+
+def test_xelatex_sections_merge_like_a_single_render(tmp_path, monkeypatch):
+    from backend.output import pdf_generator
+    from tests.test_report_merger import text_pdf
+
+    monkeypatch.chdir(tmp_path)
+
+    def fake_xelatex(tex_path):
+        # Like the article class: a page number in the footer unless \pagestyle{empty}
+        source = open(tex_path, encoding="utf-8").read()
+        numbered = r"\pagestyle{empty}" not in source
+        pages = source.count(r"\newpage") + 1
+        pdf_path = tex_path[:-4] + ".pdf"
+        with open(pdf_path, "wb") as f:
+            f.write(text_pdf(*(f"page {n + 1}" if numbered else "text" for n in range(pages))))
+        return pdf_path
+
+    monkeypatch.setattr(pdf_generator, "render_latex_to_pdf", fake_xelatex)
+
+    def page_texts(cache):
+        monkeypatch.setattr(soc_report_gen, "output_cache", cache)
+        pdf_path, _ = soc_report_gen.generate_part_i_ii(ma_ar_docx("审计意见"), pdf_engine="xelatex",
+                                                        output_dir=str(tmp_path / str(cache.enabled)))
+        return [page.extract_text() for page in pypdf.PdfReader(pdf_path).pages]
+
+    merged = page_texts(OutputCache(root=str(tmp_path / "cache")))
+    single = page_texts(OutputCache(root=str(tmp_path / "cache"), max_bytes=0))
+    # Fragments do not restart the page numbering
+    assert merged == single == ["text", "text"]
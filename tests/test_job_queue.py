@@ -0,0 +1,96 @@
+import os
+import threading
+
+import pytest
+
+from backend.utils.job_queue import CANCELLED, DONE, FAILED, JobLimitError, JobManager
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=1, per_session_limit=2)
+    yield manager
+    manager.shutdown()
+
+
+def test_job_completes_with_result(manager):
+    job = manager.submit("s1", "Part I & II", lambda x: x * 2, 21)
+    job.future.result(timeout=5)
+    assert manager.get(job.id).status == DONE
+    assert job.result == 42
+
+
+def test_job_failure_is_captured(manager):
+    def boom():
+        raise RuntimeError("xelatex failed")
+
+    job = manager.submit("s1", "Part III & IV", boom)
+    job.future.result(timeout=5)
+    assert job.status == FAILED
+    assert "xelatex" in str(job.error)
+
+
+def test_cancel_pending_and_running_jobs(manager):
+    release = threading.Event()
+    running = manager.submit("s1", "running", release.wait, 5)
+    pending = manager.submit("s2", "pending", lambda: "never")
+
+    assert manager.cancel(pending.id)
+    assert pending.status == CANCELLED
+
+    assert manager.cancel(running.id)
+    release.set()
+    running.future.result(timeout=5)
+    assert running.status == CANCELLED
+    assert running.result is None
+
+
+def test_per_session_limit(manager):
+    release = threading.Event()
+    manager.submit("s1", "a", release.wait, 5)
+    manager.submit("s1", "b", release.wait, 5)
+    with pytest.raises(JobLimitError):
+        manager.submit("s1", "c", release.wait, 5)
+    # Other sessions are unaffected
+    manager.submit("s2", "d", release.wait, 5)
+    release.set()
+
+
+def test_progress_callback_updates_job(manager):
+    def work(progress):
+        progress("Processing Part I & II...")
+        return "ok"
+
+    job = manager.submit("s1", "Part I & II", work, with_progress=True)
+    job.future.result(timeout=5)
+    assert job.result == "ok"
+    assert job.progress == "Processing Part I & II..."
+
+
+def test_section_reset_mid_run_leaves_the_store_empty(manager, tmp_path):
+    from backend.utils.artifact_store import ArtifactStore
+
+    store = ArtifactStore(root=str(tmp_path / "store"))
+    started, release = threading.Event(), threading.Event()
+
+    def generate(session_id, artifact_id, cancel_event):
+        # Like app.publish_outputs: render in a workspace, then publish
+        with store.workspace(session_id, artifact_id) as work_dir:
+            path = os.path.join(work_dir, "report.pdf")
+            with open(path, "wb") as f:
+                f.write(b"%PDF")
+            started.set()
+            release.wait(5)
+            return store.publish(session_id, artifact_id, {"report.pdf": path}, cancel_event=cancel_event)
+
+    job = manager.submit("s1", "Part I & II", generate, "s1", "a1", with_cancel_event=True)
+    assert started.wait(5)
+    # What app.reset_section does while the job is still rendering
+    manager.cancel(job.id)
+    store.remove("s1", "a1")
+    release.set()
+    job.future.result(timeout=5)
+
+    assert job.status == CANCELLED
+    assert store.path("s1", "a1", "report.pdf") is None
+    assert not os.path.exists(os.path.join(store.root, "s1", "a1"))
@@ -0,0 +1,169 @@
+import os
+import stat
+import subprocess
+import sys
+
+import pytest
+
+from backend.utils import latex_build
+from backend.utils.latex_build import ENDOFDUMP, compile_latex, evict_workspaces
+
+# Stand-in for xelatex: logs each call, writes <jobname>.aux with the
+# content of the last "%aux:" line of the .tex file (a fixed one when
+# there is none) and a dummy PDF.
+# Format builds (-ini) fail unless the file has a "%fmt-ok" line; "%fail"
+# fails every build and "%fmt-broken" only builds that use the format.
+FAKE_XELATEX = f"""#!{sys.executable}
+import os, sys
+args = sys.argv[1:]
+with open(os.environ["FAKE_XELATEX_LOG"], "a") as log:
+    log.write(" ".join(args) + "\\n")
+jobname = next(a.split("=", 1)[1] for a in args if a.startswith("-jobname="))
+source = open(args[-1], encoding="utf-8").read()
+if "-ini" in args:
+    if "%fmt-ok" not in source:
+        sys.exit(1)
+    open(jobname + ".fmt", "w").write("fmt")
+    sys.exit(0)
+if "%fail" in source or "%fmt-broken" in source and any(a.startswith("-fmt=") for a in args):
+    sys.stderr.write("! Undefined control sequence.")
+    sys.exit(1)
+aux = ([l for l in source.splitlines() if l.startswith("%aux:")] or ["%aux:none"])[-1]
+previous = open(jobname + ".aux").read() if os.path.exists(jobname + ".aux") else ""
+# Like LaTeX, the aux file only settles on the pass after it was written
+open(jobname + ".aux", "w").write(aux if previous.startswith(aux[:5]) else aux[:5])
+open(jobname + ".pdf", "wb").write(b"%PDF-1.5")
+"""
+
+
+@pytest.fixture
+def fake_xelatex(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "xelatex"
+    script.write_text(FAKE_XELATEX)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    log = tmp_path / "calls.log"
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_XELATEX_LOG", str(log))
+
+    def calls():
+        return log.read_text().splitlines() if log.exists() else []
+    return calls
+
+
+def write_tex(path, aux):
+    path.write_text(f"\\documentclass{{article}}\n{ENDOFDUMP}\n%aux:{aux}\n", encoding="utf-8")
+    return str(path)
+
+
+def test_passes_stop_when_aux_is_stable(tmp_path, fake_xelatex):
+    build_dir = str(tmp_path / "build")
+    tex = write_tex(tmp_path / "part3_4.tex", "refs-v1")
+
+    pdf_path, timings = compile_latex(tex, "part3_4", build_dir=build_dir, use_format=False)
+    assert os.path.exists(pdf_path)
+    assert len(timings) == 3  # aux written, aux settled, unchanged
+
+    # Same report again: persistent aux means one pass is enough
+    _, timings = compile_latex(tex, "part3_4", build_dir=build_dir, use_format=False)
+    assert len(timings) == 1
+
+
+def test_failed_format_build_falls_back(tmp_path, fake_xelatex):
+    build_dir = str(tmp_path / "build")
+    tex = write_tex(tmp_path / "part1_2.tex", "refs")
+
+    pdf_path, _ = compile_latex(tex, "part1_2", build_dir=build_dir, use_format=True)
+    assert os.path.exists(pdf_path)
+    ini_calls = [c for c in fake_xelatex() if "-ini" in c]
+    assert len(ini_calls) == 1
+    assert not any("-fmt=" in c for c in fake_xelatex())
+
+    # The failure is remembered, so the format is not rebuilt on every run
+    compile_latex(tex, "part1_2", build_dir=build_dir, use_format=True)
+    assert len([c for c in fake_xelatex() if "-ini" in c]) == 1
+
+
+def test_failed_build_raises_and_drops_aux(tmp_path, fake_xelatex):
+    build_dir = str(tmp_path / "build")
+    tex = write_tex(tmp_path / "part3_4.tex", "refs")
+    compile_latex(tex, "part3_4", build_dir=build_dir, use_format=False)
+
+    with open(tex, "a", encoding="utf-8") as f:
+        f.write("%fail\n")
+    with pytest.raises(subprocess.CalledProcessError) as exc:
+        compile_latex(tex, "part3_4", build_dir=build_dir, use_format=False)
+    assert b"Undefined control sequence" in exc.value.stderr
+    assert not os.path.exists(os.path.join(build_dir, "part3_4", "part3_4.aux"))
+
+
+def test_document_error_keeps_the_format(tmp_path, fake_xelatex):
+    build_dir = str(tmp_path / "build")
+    tex = write_tex(tmp_path / "part1_2.tex", "refs")
+    with open(tex, "a", encoding="utf-8") as f:
+        f.write("%fmt-ok\n%fail\n")
+
+    with pytest.raises(subprocess.CalledProcessError):
+        compile_latex(tex, "part1_2", build_dir=build_dir, use_format=True)
+    formats = os.listdir(os.path.join(build_dir, "formats"))
+    assert any(name.endswith(".fmt") for name in formats)
+    assert not any(name.endswith(".failed") for name in formats)
+
+
+def test_format_that_breaks_a_good_document_is_dropped(tmp_path, fake_xelatex):
+    build_dir = str(tmp_path / "build")
+    tex = write_tex(tmp_path / "part1_2.tex", "refs")
+    with open(tex, "a", encoding="utf-8") as f:
+        f.write("%fmt-ok\n%fmt-broken\n")
+
+    pdf_path, _ = compile_latex(tex, "part1_2", build_dir=build_dir, use_format=True)
+    assert os.path.exists(pdf_path)
+    formats = os.listdir(os.path.join(build_dir, "formats"))
+    assert not any(name.endswith(".fmt") for name in formats)
+    assert any(name.endswith(".failed") for name in formats)
+
+
+def test_edited_report_rebuilds_in_one_pass(tmp_path, fake_xelatex, monkeypatch):
+    from backend.extract.report_model import Report, make_section
+    from backend.output.pdf_generator import render_report_pdf
+
+    monkeypatch.setattr(latex_build, "DEFAULT_BUILD_DIR", str(tmp_path / "build"))
+
+    def passes(paragraph):
+        before = len(fake_xelatex())
+        render_report_pdf(Report((make_section("part_i", ["第一部分", paragraph], 1),)), str(tmp_path / "out"))
+        return len([c for c in fake_xelatex()[before:] if "-ini" not in c])
+
+    assert passes("第一版") == 3
+    # The edit does not move any reference, so the kept aux files settle it at once
+    assert passes("第二版，内容有改动") == 1
+
+
+def test_stale_and_surplus_workspaces_are_evicted(tmp_path, fake_xelatex):
+    build_dir = tmp_path / "build"
+    for age, name in enumerate(["part1_2", "part1_2-1", "part3_4", "old"]):
+        (build_dir / name).mkdir(parents=True)
+        os.utime(build_dir / name, (1e9, 1e9) if name == "old" else None)
+        mtime = os.path.getmtime(build_dir / name) - age
+        os.utime(build_dir / name, (mtime, mtime))
+    (build_dir / "formats").mkdir()
+
+    removed = evict_workspaces(str(build_dir), max_workspaces=2, ttl_seconds=3600)
+    # Past the TTL, then least recently used first; formats are shared and kept
+    assert sorted(removed) == ["old", "part3_4"]
+    assert sorted(os.listdir(build_dir)) == ["formats", "part1_2", "part1_2-1"]
+
+
+def test_workspace_in_use_is_not_evicted(tmp_path, fake_xelatex):
+    build_dir = str(tmp_path / "build")
+    tex = write_tex(tmp_path / "part3_4.tex", "refs")
+    os.makedirs(os.path.join(build_dir, "stale"))
+    os.utime(os.path.join(build_dir, "stale"), (1e9, 1e9))
+
+    with latex_build._claim_workspace(build_dir, "part1_2", 1) as held:
+        compile_latex(tex, "part3_4", build_dir=build_dir, use_format=False)
+        assert evict_workspaces(build_dir, max_workspaces=0) == ["part3_4"]
+        assert os.path.isdir(held)
+    # compile_latex evicts on its own once it is done
+    assert not os.path.exists(os.path.join(build_dir, "stale"))
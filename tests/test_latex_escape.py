@@ -0,0 +1,73 @@
+import random
+import re
+
+import pandas as pd
+
+from backend.extract.report_model import Report, make_section
+from backend.output.pdf_generator import build_report_latex
+from backend.utils.latex_utils import (
+    escape_latex,
+    format_as_latex,
+    format_paragraphs_to_latex,
+    latex_longtable_rows,
+)
+
+# Everything escape_latex may emit besides plain characters
+ESCAPE_TOKENS = re.compile(
+    r"\\(?:textbackslash\{\}|textasciitilde\{\}|textasciicircum\{\}|newline\{\}|[&%$#_{}])")
+UNESCAPE = {r"\textbackslash{}": "\\", r"\textasciitilde{}": "~", r"\textasciicircum{}": "^", r"\newline{}": "\n"}
+SPECIAL = set("\\&%$#_{}~^")
+ALPHABET = "\\&%$#_{}~^[]*\n\r\t\x00\x0c\x1b\x7f aZ9.-管理层认定审计师报告–“”"
+
+
+def random_text(rng, length=40):
+    return "".join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def assert_safe(escaped):
+    bare = ESCAPE_TOKENS.sub("", escaped)
+    assert not SPECIAL & set(bare), escaped
+    assert not any(ord(c) < 32 and c != "\t" or c == "\x7f" for c in bare), escaped
+
+
+def unescape(escaped):
+    return ESCAPE_TOKENS.sub(lambda m: UNESCAPE.get(m.group(), m.group()[1:]), escaped)
+
+
+def test_escape_fuzz_is_safe_and_lossless():
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = random_text(rng)
+        escaped = escape_latex(text)
+        assert_safe(escaped)
+        # Only carriage returns and control characters are dropped
+        assert unescape(escaped) == "".join(c for c in text if c in "\t\n" or 32 <= ord(c) != 0x7f)
+
+
+def test_every_latex_output_path_escapes():
+    rng = random.Random(1)
+    paragraphs = [random_text(rng) for _ in range(50)]
+
+    for body in (format_as_latex(paragraphs), format_paragraphs_to_latex(paragraphs),
+                 format_paragraphs_to_latex(paragraphs, indent=True)):
+        assert_safe(body.replace("\n\n", "").replace(r"\par\noindent ", ""))
+
+    cells = pd.DataFrame({"a": paragraphs[:25], "b": paragraphs[25:]}, dtype="string")
+    for row in latex_longtable_rows(cells).splitlines():
+        assert row.endswith(r" \\ \hline")
+        for cell in row[:-len(r" \\ \hline")].split(" & "):
+            assert_safe(cell)
+
+    report = Report((make_section("part_i", paragraphs, 2),))
+    body = build_report_latex(report)
+    text = body.split("\n\n", 1)[1]
+    for line in text.split("\n"):
+        if not line.startswith((r"\vspace*", r"\begin{flushright}", r"\end{flushright}")):
+            assert_safe(line)
+
+
+def test_old_chained_escapes_are_matched():
+    # The former replace chain mangled the braces of \textbackslash{}
+    assert escape_latex("a\\b") == r"a\textbackslash{}b"
+    assert escape_latex("50% of R&D_1 costs $5 #2 {x} ~ ^") == \
+        r"50\% of R\&D\_1 costs \$5 \#2 \{x\} \textasciitilde{} \textasciicircum{}"
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from backend.extract.control_matrix import CONTROL_COLUMNS
+from backend.output.pdf_generator import build_controls_latex, iter_controls_latex
+from backend.utils.latex_templates import LatexSafe, get_environment, render_latex
+
+
+def test_values_are_escaped_unless_latex_safe():
+    env = get_environment()
+    assert env.from_string(r"\VAR{x}").render(x="R&D 100%") == r"R\&D 100\%"
+    assert env.from_string(r"\VAR{x}").render(x=LatexSafe(r"\textbf{R}")) == r"\textbf{R}"
+    # Template compilation is cached for the process
+    assert env.get_template("controls.tex.j2") is env.get_template("controls.tex.j2")
+
+
+def test_controls_stream_consumes_chunks_lazily():
+    consumed = []
+
+    def chunks():
+        for i in range(3):
+            consumed.append(i)
+            yield pd.DataFrame({c: [f"{c}_{i}"] for c in CONTROL_COLUMNS}, dtype="string")
+
+    stream = iter_controls_latex(chunks())
+    head = next(stream)
+    assert head.startswith(r"\documentclass") and consumed == []
+    body = head + "".join(stream)
+    assert consumed == [0, 1, 2]
+    assert body.index(r"control\_id\_0") < body.index(r"control\_id\_2") < body.index(r"\end{longtable}")
+
+
+def test_controls_table_has_no_blank_lines():
+    df = pd.DataFrame({c: ["a", "b"] for c in CONTROL_COLUMNS}, dtype="string")
+    latex = build_controls_latex(df)
+    table = latex[latex.index(r"\begin{longtable}"):latex.index(r"\end{longtable}")]
+    assert "\n\n" not in table
+    assert latex.endswith("\\end{longtable}\n}\n\n\\end{document}\n")
+
+
+def test_document_template_fills_fonts():
+    latex = render_latex("document.tex.j2", body=LatexSafe("BODY"), endofdump=LatexSafe(r"\endofdump"),
+                         font_main="Main Font", font_cjk="CJK Font")
+    assert r"\setmainfont{Main Font}" in latex and "CJK Font" in latex and "BODY" in latex
@@ -0,0 +1,25 @@
+from benchmarks.load_test import LoadTest, check_outputs, stub_pdf
+
+
+def test_isolated_sessions_run_clean():
+    harness = LoadTest(sessions=3, iterations=1, paragraphs=10, rows=10, stub_seconds=0, workers=2, log=None)
+    summary = harness.run()
+
+    assert summary["error_rate"] == 0.0 and not summary["error_types"]
+    assert summary["collisions"] == []
+    assert {name: op["count"] for name, op in summary["operations"].items()} == \
+        {"part_i_ii": 3, "part_iii_iv": 3, "final_report": 3, "scenario": 3}
+    assert summary["throughput"]["scenarios_per_min"] > 0
+    assert summary["peak_rss_mb"] > 0
+
+
+def test_check_outputs_flags_foreign_and_missing_outputs(tmp_path):
+    own = stub_pdf(str(tmp_path / "own.pdf"), b"LT-0123abcd-s0i0")
+    foreign = stub_pdf(str(tmp_path / "foreign.pdf"), b"LT-0123abcd-s1i0")
+    missing = str(tmp_path / "missing.pdf")
+
+    assert check_outputs([own], "LT-0123abcd-s0i0") == []
+    problems = check_outputs([own, foreign, missing], "LT-0123abcd-s0i0")
+    assert problems == [f"{foreign}: expected LT-0123abcd-s0i0, found LT-0123abcd-s1i0", f"{missing}: missing"]
+    # Real PDFs are not read
+    assert check_outputs([foreign], "LT-0123abcd-s0i0", check_pdf=False) == []
@@ -0,0 +1,61 @@
+import os
+import time
+
+import pytest
+
+from backend.utils.output_cache import OutputCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return OutputCache(root=str(tmp_path / "cache"), max_bytes=10_000, ttl_seconds=3600)
+
+
+def write_artifacts(tmp_path, name, size=100):
+    paths = {}
+    for ext in (".pdf", ".docx"):
+        path = tmp_path / f"{name}{ext}"
+        path.write_bytes(b"x" * size)
+        paths[ext] = str(path)
+    return paths
+
+
+def test_key_depends_on_input_and_settings(cache):
+    key = cache.make_key("part_i_ii", [b"abc"], {"font_cjk": "Noto Sans CJK SC"})
+    assert key == cache.make_key("part_i_ii", [b"abc"], {"font_cjk": "Noto Sans CJK SC"})
+    assert key != cache.make_key("part_i_ii", [b"abd"], {"font_cjk": "Noto Sans CJK SC"})
+    assert key != cache.make_key("part_i_ii", [b"abc"], {"font_cjk": "Noto Serif CJK SC"})
+    assert key != cache.make_key("part_iii_iv", [b"abc"], {"font_cjk": "Noto Sans CJK SC"})
+
+
+def test_hit_and_miss_counters(cache, tmp_path):
+    key = cache.make_key("part_i_ii", [b"abc"])
+    out_base = str(tmp_path / "out" / "Part_I_II")
+    assert cache.fetch(key, out_base, (".pdf", ".docx")) is None
+
+    cache.put(key, write_artifacts(tmp_path, "src"))
+    outputs = cache.fetch(key, out_base, (".pdf", ".docx"))
+    assert outputs == {".pdf": out_base + ".pdf", ".docx": out_base + ".docx"}
+    assert os.path.getsize(outputs[".pdf"]) == 100
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_lru_eviction_over_size_cap(cache, tmp_path):
+    for i in range(3):
+        cache.put(f"key{i}", write_artifacts(tmp_path, f"src{i}", size=1_500))
+        # Make access order unambiguous on coarse-grained filesystems
+        os.utime(os.path.join(cache.root, f"key{i}"), (i, i))
+    # Touch key0 so key1 becomes the least recently used entry
+    assert cache.fetch("key0", str(tmp_path / "o"), (".pdf",))
+    cache.put("key3", write_artifacts(tmp_path, "src3", size=1_500))
+
+    remaining = sorted(os.listdir(cache.root))
+    assert "key1" not in remaining
+    assert "key0" in remaining and "key3" in remaining
+
+
+def test_ttl_expiry(tmp_path):
+    cache = OutputCache(root=str(tmp_path / "cache"), max_bytes=10_000, ttl_seconds=0.05)
+    cache.put("key", write_artifacts(tmp_path, "src"))
+    time.sleep(0.1)
+    assert cache.fetch("key", str(tmp_path / "o"), (".pdf",)) is None
@@ -0,0 +1,76 @@
+import io
+import os
+
+import pytest
+
+from backend import soc_report_gen
+from backend.extract.report_model import Report, make_section
+from backend.output import pdf_generator
+from backend.output.pdf_generator import build_report_latex, render_report_pdf
+from backend.utils.output_cache import OutputCache
+
+
+def test_ma_ar_latex_matches_docx_layout():
+    ma = ["第一段 100% 完成", "  签字人 A  "]
+    ar = ["审计意见 R&D", "会计师事务所", "北京", "2024年12月31日"]
+    body = build_report_latex(Report((make_section("part_i", ma, 1), make_section("part_ii", ar, 3))))
+
+    assert body.index("管理层认定") < body.index(r"\newpage") < body.index("独立服务审计师报告")
+    assert r"第一段 100\% 完成" in body and r"审计意见 R\&D" in body
+    # Signers are stripped like the DOCX runs; the AR signature keeps its three lines
+    assert "签字人 A\n" in body and "  签字人" not in body
+    assert r"会计师事务所\newline{}北京\newline{}2024年12月31日" in body
+    # Right-aligned like the DOCX signature paragraphs
+    assert body.count(r"\begin{flushright}") == 2
+    assert "\\begin{flushright}\n会计师事务所" in body
+
+
+@pytest.fixture
+def fake_outputs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(soc_report_gen, "output_cache", OutputCache(root=str(tmp_path / "cache"), max_bytes=0))
+    calls = []
+
+    def write(path):
+        open(path, "wb").close()
+        return path
+
+    monkeypatch.setattr(soc_report_gen, "parse_ma_ar_report", lambda src: calls.append("parse") or Report(()))
+    monkeypatch.setattr(soc_report_gen, "render_report_docx",
+                        lambda report, base: calls.append("docx") or write(base + ".docx"))
+    monkeypatch.setattr(soc_report_gen, "render_report_pdf",
+                        lambda report, base, progress: calls.append("xelatex") or write(base + ".pdf"))
+    monkeypatch.setattr(soc_report_gen, "convert_docx_to_pdf",
+                        lambda docx, out: calls.append("libreoffice") or write(docx[:-5] + ".pdf"))
+    return calls
+
+
+@pytest.mark.parametrize("engine", soc_report_gen.PART_I_II_PDF_ENGINES)
+def test_pdf_engine_is_selectable(fake_outputs, engine):
+    pdf_path, docx_path = soc_report_gen.generate_part_i_ii(io.BytesIO(b"docx"), pdf_engine=engine)
+    assert pdf_path.endswith("Part_I_II.pdf") and docx_path.endswith("Part_I_II.docx")
+    # The upload is parsed once for both outputs
+    assert sorted(fake_outputs) == sorted(["parse", "docx", engine])
+
+
+def test_unknown_pdf_engine_is_rejected(fake_outputs):
+    with pytest.raises(ValueError, match="Unknown PDF engine"):
+        soc_report_gen.generate_part_i_ii(io.BytesIO(b"docx"), pdf_engine="reportlab")
+
+
+def test_xelatex_workspace_is_shared_by_report_versions(tmp_path, monkeypatch):
+    builds = []
+
+    def fake_render(tex_path):
+        builds.append(os.path.basename(tex_path))
+        pdf_path = tex_path[:-4] + ".pdf"
+        open(pdf_path, "wb").close()
+        return pdf_path
+
+    monkeypatch.setattr(pdf_generator, "render_latex_to_pdf", fake_render)
+    first = Report((make_section("part_i", ["第一部分", "甲"], 1),))
+    second = Report((make_section("part_i", ["第一部分", "乙"], 1),))
+    for report in (first, second):
+        render_report_pdf(report, str(tmp_path / "out"))
+    # An edited report builds where the previous version left its aux files
+    assert builds == ["part1_2.tex", "part1_2.tex"]
\ No newline at end of file
@@ -0,0 +1,70 @@
+import io
+import time
+import zipfile
+
+import pytest
+
+from backend.output.part_ingest import PartValidationError, ingest_parts
+from tests.test_report_merger import docx_bytes, part_i_ii, part_iii_iv
+
+
+def pdf_bytes(pages=1):
+    pypdf = pytest.importorskip("pypdf")
+    writer = pypdf.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_parts_are_parsed_and_ordered():
+    parts = ingest_parts([("Part_III_IV.docx", docx_bytes(part_iii_iv)), ("Part_I_II.docx", docx_bytes(part_i_ii))],
+                         [("Part_I_II.pdf", pdf_bytes(2))])
+    assert [p.stem for p in parts.docx] == ["Part_I_II", "Part_III_IV"]
+    assert parts.docx[0].sections == ("part_i", "part_ii")
+    assert list(parts.pdf) == ["Part_I_II"] and len(parts.docx[0].digest) == 64
+
+
+def test_every_problem_is_reported_at_once():
+    damaged = io.BytesIO()
+    with zipfile.ZipFile(damaged, "w") as z:
+        z.writestr("hello.txt", "not a document")
+    no_heading = docx_bytes(lambda doc: doc.add_paragraph("正文"))
+    part = docx_bytes(part_i_ii)
+    other_copy = docx_bytes(lambda doc: (part_i_ii(doc), doc.add_paragraph("修订版")))
+
+    with pytest.raises(PartValidationError) as e:
+        ingest_parts([("a.docx", b"PK\x03\x04 truncated"), ("b.docx", damaged.getvalue()), ("c.docx", no_heading),
+                      ("d.docx", b""), ("e.docx", part), ("f.docx", part), ("g.docx", other_copy)],
+                     [("h.pdf", b"<html>"), ("i.pdf", pdf_bytes())])
+    assert dict(e.value.problems) == {
+        "a.docx": "not a valid .docx file (corrupt or not a zip archive)",
+        "b.docx": "not a Word document",
+        "c.docx": "no report section heading (Part I–V) found",
+        "d.docx": "the file is empty",
+        "f.docx": "same file as e.docx",
+        "g.docx": "第二部分 – 独立服务审计师报告 is also in e.docx",
+        "h.pdf": "not a PDF file",
+        "i.pdf": "no Word part with the same file name",
+    }
+    # The Part I heading of g.docx is reported too
+    assert len(e.value.problems) == 9 and isinstance(e.value, ValueError)
+
+
+def test_missing_parts_are_named():
+    with pytest.raises(PartValidationError) as e:
+        ingest_parts([("Part_I_II.docx", docx_bytes(part_i_ii))])
+    assert e.value.problems == [("", "Missing 第三部分 – 系统描述, 第四部分 – 控制目标、控制活动及测试结果")]
+
+
+def test_empty_upload_is_rejected():
+    with pytest.raises(PartValidationError, match="No report parts"):
+        ingest_parts([], [("a.pdf", b"%PDF-1.4")])
+
+
+def test_bad_part_is_rejected_quickly():
+    start = time.perf_counter()
+    with pytest.raises(PartValidationError):
+        ingest_parts([("a.docx", b"not a zip")] * 20)
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,292 @@
+import base64
+import io
+import zipfile
+
+import pytest
+from docx import Document
+from lxml import etree
+
+from backend.output.report_merger import W_NS, merge_docx, merge_pdfs, order_parts
+
+PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg==")
+
+
+def docx_bytes(build):
+    doc = Document()
+    build(doc)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def text_pdf(*pages):
+    """
+    A PDF with one Helvetica text line per page, readable by extract_text.
+    """
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>",
+               3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    for i, text in enumerate(pages):
+        page, content = 4 + 2 * i, 5 + 2 * i
+        stream = b"BT /F1 12 Tf 20 100 Td (%s) Tj ET" % text.encode("ascii")
+        objects[page] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 200] /Contents %d 0 R "
+                         b"/Resources << /Font << /F1 3 0 R >> >> >>" % content)
+        objects[content] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        kids.append(b"%d 0 R" % page)
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(pages))
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offsets[n] for n in sorted(objects))
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def part_i_ii(doc):
+    doc.sections[0].header.paragraphs[0].text = "页眉 I&II"
+    doc.add_paragraph("第一部分 管理层认定")
+    doc.add_paragraph("列表项", style="List Number")
+    doc.add_picture(io.BytesIO(PNG))
+    doc.add_paragraph("第二部分 审计师报告")
+
+
+def part_iii_iv(doc):
+    doc.add_paragraph("第三部分 系统描述")
+    doc.add_paragraph("编号项", style="List Number")
+    doc.add_picture(io.BytesIO(PNG))
+    doc.add_paragraph("第四部分 控制目标")
+    doc.add_table(rows=1, cols=2).cell(0, 0).text = "C-001"
+
+
+@pytest.fixture
+def merged(tmp_path):
+    # Deliberately out of order: the merger sorts parts by section
+    payloads = [docx_bytes(part_iii_iv), docx_bytes(part_i_ii)]
+    plan = order_parts(payloads)
+    assert [i for i, _ in plan] == [1, 0]
+    assert plan[0][1] == ["part_i", "part_ii"]
+    path = merge_docx([payloads[i] for i, _ in plan], str(tmp_path / "final.docx"))
+    return path
+
+
+def test_merged_docx_keeps_content_in_report_order(merged):
+    doc = Document(merged)
+    texts = [p.text for p in doc.paragraphs if p.text]
+    assert [t for t in texts if t.startswith("第")] == ["第一部分 管理层认定", "第二部分 审计师报告",
+                                                     "第三部分 系统描述", "第四部分 控制目标"]
+    assert doc.tables[0].cell(0, 0).text == "C-001"
+    # Each part keeps its own section (and header)
+    assert len(doc.sections) == 2
+    assert doc.sections[0].header.paragraphs[0].text == "页眉 I&II"
+
+
+def test_merged_docx_fixes_up_relationships_numbering_and_bookmarks(merged):
+    with zipfile.ZipFile(merged) as package:
+        assert package.testzip() is None
+        document = etree.fromstring(package.read("word/document.xml"))
+        rels = etree.fromstring(package.read("word/_rels/document.xml.rels"))
+        numbering = etree.fromstring(package.read("word/numbering.xml"))
+        names = package.namelist()
+
+    ns = {"w": W_NS, "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+          "a": "http://schemas.openxmlformats.org/drawingml/2006/main"}
+    rel_ids = {r.get("Id"): r.get("Target") for r in rels}
+    embeds = document.xpath("//a:blip/@r:embed", namespaces=ns)
+    assert len(embeds) == 2 and all(e in rel_ids and rel_ids[e].lstrip("/") and
+                                    ("word/" + rel_ids[e]) in names for e in embeds)
+
+    num_ids = document.xpath("//w:numPr/w:numId/@w:val", namespaces=ns)
+    defined = set(numbering.xpath("//w:num/@w:numId", namespaces=ns))
+    assert all(n in defined for n in num_ids)
+
+    bookmarks = document.xpath("//w:bookmarkStart/@w:name", namespaces=ns)
+    assert {"_soc_part_i", "_soc_part_ii", "_soc_part_iii", "_soc_part_iv"} <= set(bookmarks)
+    ids = document.xpath("//w:bookmarkStart/@w:id", namespaces=ns)
+    assert len(ids) == len(set(ids))
+    # Section headings are listed in Word's navigation pane, like the PDF bookmarks
+    headings = document.xpath("//w:p[w:pPr/w:outlineLvl/@w:val='0']", namespaces=ns)
+    assert ["".join(p.xpath(".//w:t/text()", namespaces=ns)) for p in headings] == \
+        ["第一部分 管理层认定", "第二部分 审计师报告", "第三部分 系统描述", "第四部分 控制目标"]
+    assert not document.xpath("//w:hyperlink", namespaces=ns)
+
+
+NOTE_CT = "application/vnd.openxmlformats-officedocument.wordprocessingml.%s+xml"
+NOTE_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/%s"
+
+
+def with_notes(data, label):
+    """
+    Adds a footnote and a comment, both reading ``label``, to the first
+    paragraph of a .docx payload.
+    """
+    w = f'xmlns:w="{W_NS}"'
+    parts = {
+        "word/footnotes.xml": f'<w:footnotes {w}><w:footnote w:type="separator" w:id="-1"><w:p><w:r><w:separator/>'
+                              f'</w:r></w:p></w:footnote><w:footnote w:type="continuationSeparator" w:id="0"><w:p>'
+                              f'<w:r><w:continuationSeparator/></w:r></w:p></w:footnote><w:footnote w:id="1"><w:p>'
+                              f'<w:r><w:t>{label}</w:t></w:r></w:p></w:footnote></w:footnotes>',
+        "word/comments.xml": f'<w:comments {w}><w:comment w:id="0" w:author="QA"><w:p><w:r><w:t>{label}</w:t>'
+                             f'</w:r></w:p></w:comment></w:comments>',
+    }
+    with zipfile.ZipFile(io.BytesIO(data)) as package:
+        files = {name: package.read(name) for name in package.namelist()}
+    files.update({name: xml.encode() for name, xml in parts.items()})
+    files["[Content_Types].xml"] = files["[Content_Types].xml"].replace(b"</Types>", b"".join(
+        b'<Override PartName="/%s" ContentType="%s"/>' % (name.encode(), (NOTE_CT % kind).encode())
+        for name, kind in (("word/footnotes.xml", "footnotes"), ("word/comments.xml", "comments"))) + b"</Types>")
+    files["word/_rels/document.xml.rels"] = files["word/_rels/document.xml.rels"].replace(
+        b"</Relationships>", b'<Relationship Id="rIdFn" Type="%s" Target="footnotes.xml"/>'
+        b'<Relationship Id="rIdCm" Type="%s" Target="comments.xml"/></Relationships>'
+        % ((NOTE_REL % "footnotes").encode(), (NOTE_REL % "comments").encode()))
+    document = etree.fromstring(files["word/document.xml"])
+    paragraph = document.find(f".//{{{W_NS}}}p")
+    for xml in ('<w:commentRangeStart w:id="0"/>', '<w:r><w:footnoteReference w:id="1"/></w:r>',
+                '<w:commentRangeEnd w:id="0"/>', '<w:r><w:commentReference w:id="0"/></w:r>'):
+        paragraph.append(etree.fromstring(f"<w:root {w}>{xml}</w:root>")[0])
+    files["word/document.xml"] = etree.tostring(document)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as package:
+        for name, content in files.items():
+            package.writestr(name, content)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("first_has_notes", [True, False])
+def test_merged_docx_keeps_footnotes_and_comments(tmp_path, first_has_notes):
+    first = docx_bytes(part_i_ii)
+    if first_has_notes:
+        first = with_notes(first, "注一")
+    path = merge_docx([first, with_notes(docx_bytes(part_iii_iv), "注三")], str(tmp_path / "final.docx"))
+
+    with zipfile.ZipFile(path) as package:
+        document = etree.fromstring(package.read("word/document.xml"))
+        footnotes = etree.fromstring(package.read("word/footnotes.xml"))
+        comments = etree.fromstring(package.read("word/comments.xml"))
+    ns = {"w": W_NS}
+
+    def notes(container, tag):
+        return {n.get(f"{{{W_NS}}}id"): "".join(n.xpath(".//w:t/text()", namespaces=ns))
+                for n in container.iter(f"{{{W_NS}}}{tag}") if n.get(f"{{{W_NS}}}type") is None}
+
+    labels = ["注一", "注三"] if first_has_notes else ["注三"]
+    # Every reference resolves to its own part's note
+    refs = document.xpath("//w:footnoteReference/@w:id", namespaces=ns)
+    assert [notes(footnotes, "footnote")[i] for i in refs] == labels
+    refs = document.xpath("//w:commentReference/@w:id", namespaces=ns)
+    assert [notes(comments, "comment")[i] for i in refs] == labels
+    assert document.xpath("//w:commentRangeStart/@w:id", namespaces=ns) == refs
+    # Separators exist once
+    assert len(footnotes.xpath("//w:footnote[@w:type]", namespaces=ns)) == 2
+
+
+def test_merge_pdfs_concatenates_pages_with_bookmarks(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+
+    def pdf(pages):
+        writer = pypdf.PdfWriter()
+        for _ in range(pages):
+            writer.add_blank_page(width=200, height=200)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        return buffer.getvalue()
+
+    path = merge_pdfs([pdf(2), pdf(3)], str(tmp_path / "final.pdf"),
+                      outline=[("第一部分", 0, None), ("第三部分", 1, None)])
+    reader = pypdf.PdfReader(path)
+    assert len(reader.pages) == 5
+    assert [(o.title, reader.get_destination_page_number(o)) for o in reader.outline] == [("第一部分", 0), ("第三部分", 2)]
+
+
+def test_merge_pdfs_bookmarks_section_headings(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+    part = text_pdf("Part III Description of the System", "Part IV Tests of Controls", "Appendix")
+    path = merge_pdfs([text_pdf("Cover"), part], str(tmp_path / "final.pdf"),
+                      outline=[("III", 1, "part_iii"), ("IV", 1, "part_iv"), ("V", 1, "part_v")])
+    reader = pypdf.PdfReader(path)
+    # Part V has no heading in the text, so it stays on the page of Part IV
+    assert [reader.get_destination_page_number(o) for o in reader.outline] == [1, 2, 2]
+
+
+def test_final_report_merges_parts_and_their_pdfs(tmp_path, monkeypatch):
+    pypdf = pytest.importorskip("pypdf")
+    import tempfile
+
+    from backend import soc_report_gen
+    from backend.utils.output_cache import OutputCache
+
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(soc_report_gen, "output_cache", OutputCache(root=str(tmp_path / "cache"), max_bytes=0))
+
+    def named(data, name):
+        f = io.BytesIO(data)
+        f.name = name
+        return f
+
+    files = [named(docx_bytes(part_iii_iv), "Part_III_IV.docx"), named(docx_bytes(part_i_ii), "Part_I_II.docx")]
+    pdfs = [named(text_pdf("Part III Description of the System", "Controls", "Part IV Tests of Controls"),
+                  "Part_III_IV.pdf"),
+            named(text_pdf("Part I Management Assertion", "Part II Service Auditor's Report"), "Part_I_II.pdf")]
+    output_base = soc_report_gen.generate_final_report(files, pdf_files=pdfs)
+
+    reader = pypdf.PdfReader(output_base + ".pdf")
+    assert len(reader.pages) == 5
+    # Each bookmark lands on the page holding its section heading
+    assert [reader.get_destination_page_number(o) for o in reader.outline] == [0, 1, 2, 4]
+    assert Document(output_base + ".docx").paragraphs[0].text == "第一部分 管理层认定"
+
+
+def test_generated_part_iii_iv_is_listed_as_both_sections(tmp_path, monkeypatch):
+    pypdf = pytest.importorskip("pypdf")
+    openpyxl = pytest.importorskip("openpyxl")
+    import tempfile
+
+    from backend import soc_report_gen
+    from backend.extract.section_index import SECTION_TITLES
+    from backend.output.report_merger import docx_paragraph_texts, open_docx, part_sections
+    from backend.utils.output_cache import OutputCache
+
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(soc_report_gen, "output_cache", OutputCache(root=str(tmp_path / "cache"), max_bytes=0))
+
+    def blank_pdf(path):
+        writer = pypdf.PdfWriter()
+        writer.add_blank_page(width=200, height=200)
+        with open(path, "wb") as f:
+            writer.write(f)
+        return path
+
+    # Only the PDF renderers are stubbed; the DOCX is what the app writes
+    monkeypatch.setattr(soc_report_gen, "generate_controls_pdf", lambda chunks, base, *args: blank_pdf(base + ".pdf"))
+    monkeypatch.setattr(soc_report_gen, "convert_docx_to_pdf",
+                        lambda docx_path, output_dir: blank_pdf(docx_path[:-5] + ".pdf"))
+
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["Control ID", "Description", "Testing Procedures", "Result"])
+    workbook.active.append(["C-001", "复核用户权限", "检查复核记录", "有效"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    output_base = soc_report_gen.generate_part_iii_iv(buffer, output_dir=str(tmp_path))
+    with open(output_base + ".docx", "rb") as f:
+        generated = f.read()
+    assert part_sections(docx_paragraph_texts(open_docx(generated))) == ["part_iii", "part_iv"]
+
+    def named(data, name):
+        f = io.BytesIO(data)
+        f.name = name
+        return f
+
+    final = soc_report_gen.generate_final_report([named(docx_bytes(part_i_ii), "Part_I_II.docx"),
+                                                  named(generated, "Part_III_IV.docx")])
+    # The combined heading carries the bookmarks of both sections
+    heading = next(p for p in Document(final + ".docx").paragraphs if p.text.startswith("第三及第四部分"))
+    names = heading._p.xpath("./w:bookmarkStart/@w:name")
+    assert names == ["_soc_part_iii", "_soc_part_iv"]
+    assert heading._p.xpath("./w:pPr/w:outlineLvl/@w:val") == ["0"]
+    titles = [o.title for o in pypdf.PdfReader(final + ".pdf").outline]
+    assert titles == [SECTION_TITLES[s] for s in ("part_i", "part_ii", "part_iii", "part_iv")]
@@ -0,0 +1,42 @@
+import pytest
+from docx import Document
+
+from backend.extract.report_model import Paragraph, Report, parse_ma_ar_report
+from backend.output.word_generator import render_report_docx
+
+
+@pytest.fixture
+def ma_ar_docx(tmp_path):
+    doc = Document()
+    for text in ("第一部分 管理层认定", "管理层声明", "某某公司管理层",
+                 "第二部分 审计师报告", "审计意见", "某某会计师事务所", "北京", "2025年1月1日"):
+        doc.add_paragraph(text)
+    path = tmp_path / "ma_ar.docx"
+    doc.save(path)
+    return str(path)
+
+
+def test_parse_splits_sections_and_signatures(ma_ar_docx):
+    report = parse_ma_ar_report(ma_ar_docx)
+    ma, ar = report.section("part_i"), report.section("part_ii")
+    assert ma.title == "第一部分 – 管理层认定"
+    assert [p.text for p in ma.paragraphs] == ["第一部分 管理层认定", "管理层声明"]
+    assert ma.signature == ("某某公司管理层",)
+    assert ar.signature == ("某某会计师事务所", "北京", "2025年1月1日")
+    assert report.paragraph_count == 8
+
+
+def test_nodes_are_immutable_and_round_trip(ma_ar_docx):
+    report = parse_ma_ar_report(ma_ar_docx)
+    with pytest.raises(AttributeError):
+        report.sections[0].paragraphs[0].text = "changed"
+    assert not hasattr(Paragraph("x"), "__dict__")
+    assert Report.from_dict(report.to_dict()) == report
+    hash(report)
+
+
+def test_docx_renders_from_report(ma_ar_docx, tmp_path):
+    path = render_report_docx(parse_ma_ar_report(ma_ar_docx), str(tmp_path / "out"))
+    texts = [p.text for p in Document(path).paragraphs if p.text]
+    assert texts[0] == "第一部分 – 管理层认定"
+    assert texts[-1] == "某某会计师事务所\n北京\n2025年1月1日"
@@ -0,0 +1,64 @@
+import os
+
+from docx import Document
+
+from backend.extract.section_index import (
+    MarkerMatcher,
+    build_section_index,
+    extract_report_sections,
+)
+
+COMBINED = [
+    "SOC 1 类型二报告",
+    "第一部分 – 管理层认定",
+    "我们已编制后附的系统描述。",
+    "第二部分 – 对管理层认定的独立服务审计师报告",
+    "我们接受委托，对后附第三部分所述系统进行鉴证。",
+    "Section III – Description of the System",
+    "公司概况。",
+    "Part IV: Control Objectives and Tests of Controls",
+    "控制 1.1 用户权限复核。",
+    "第一部分 中提及的内容",  # back-reference, must not reopen Part I
+    "第五部分 其他信息",
+    "管理层对例外事项的回应。",
+]
+
+
+def test_matcher_finds_all_markers_with_word_boundaries():
+    matcher = MarkerMatcher()
+    sections = {section for _, section, _ in matcher.find("Part IV – Control Objectives")}
+    assert sections == {"part_iv"}
+    assert matcher.find("Departure II") == []
+    assert {s for _, s, _ in matcher.find("Management’s Assertion")} == {"part_i"}
+
+
+def test_section_index_one_pass():
+    index = build_section_index(COMBINED)
+
+    assert index.labels[0] is None
+    assert index.boundaries == {
+        "part_i": (1, 3),
+        "part_ii": (3, 5),
+        "part_iii": (5, 7),
+        "part_iv": (7, 10),
+        "part_v": (10, 12),
+    }
+    assert index.slice(COMBINED, "part_iv") == COMBINED[7:10]
+
+
+def test_long_paragraphs_are_not_headings():
+    paragraphs = ["第一部分 管理层认定", "本段落较长，" * 20 + "详见第四部分。", "正文"]
+    index = build_section_index(paragraphs)
+    assert set(index.boundaries) == {"part_i"}
+
+
+def test_extract_report_sections_from_docx(tmp_path):
+    path = os.path.join(tmp_path, "combined.docx")
+    doc = Document()
+    for text in COMBINED:
+        doc.add_paragraph(text)
+    doc.save(path)
+
+    sections = extract_report_sections(path)
+    assert list(sections) == ["part_i", "part_ii", "part_iii", "part_iv", "part_v"]
+    assert sections["part_iii"] == ["Section III – Description of the System", "公司概况。"]
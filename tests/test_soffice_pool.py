@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+
+import pytest
+
+from backend.utils.soffice_pool import ConverterPool
+
+
+class FakeWorker:
+    started = 0
+
+    def __init__(self, crash_on_convert=False):
+        FakeWorker.started += 1
+        self.conversions = 0
+        self.closed = False
+        self.crash_on_convert = crash_on_convert
+        self._alive = True
+
+    def alive(self):
+        return self._alive
+
+    def convert(self, docx_path, output_dir):
+        if self.crash_on_convert:
+            self._alive = False
+            raise RuntimeError("soffice died")
+        time.sleep(0.01)
+        self.conversions += 1
+        return os.path.join(output_dir, "out.pdf")
+
+    def close(self):
+        self.closed = True
+        self.close_calls = getattr(self, "close_calls", 0) + 1
+
+
+@pytest.fixture(autouse=True)
+def reset_counter():
+    FakeWorker.started = 0
+
+
+def test_worker_recycled_after_max_conversions():
+    pool = ConverterPool(size=1, max_conversions=2, worker_factory=FakeWorker)
+    for _ in range(5):
+        assert pool.convert("a.docx", "out").endswith("out.pdf")
+    # 5 conversions with K=2 need three workers
+    assert FakeWorker.started == 3
+    pool.close()
+
+
+def test_crashed_worker_is_replaced_and_retried():
+    workers = []
+
+    def factory():
+        worker = FakeWorker(crash_on_convert=not workers)
+        workers.append(worker)
+        return worker
+
+    pool = ConverterPool(size=1, worker_factory=factory)
+    assert pool.convert("a.docx", "out").endswith("out.pdf")
+    assert len(workers) == 2
+    assert workers[0].closed
+    pool.close()
+
+
+def test_failed_restart_does_not_return_retired_worker():
+    workers = []
+
+    def factory():
+        if len(workers) == 1:
+            workers.append(None)
+            raise RuntimeError("soffice did not start")
+        workers.append(FakeWorker())
+        return workers[-1]
+
+    pool = ConverterPool(size=1, worker_factory=factory)
+    pool.convert("a.docx", "out")
+    dead = workers[0]
+    dead._alive = False
+    with pytest.raises(RuntimeError, match="did not start"):
+        pool.convert("a.docx", "out")
+    # The slot starts a fresh worker instead of handing back the closed one
+    assert pool.convert("a.docx", "out").endswith("out.pdf")
+    assert dead.close_calls == 1 and workers[2].conversions == 1
+    pool.close()
+
+
+def test_concurrent_requests_share_bounded_workers():
+    pool = ConverterPool(size=2, worker_factory=FakeWorker)
+    threads = [threading.Thread(target=pool.convert, args=("a.docx", "out")) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert FakeWorker.started == 2
+    pool.close()
+
+
+def test_subprocess_fallback_uses_its_own_profile(tmp_path, monkeypatch):
+    from backend.utils import convert_docx_to_pdf as converter
+
+    profiles = []
+
+    def fake_run_tool(cmd):
+        profiles.append(next(a for a in cmd if a.startswith("-env:UserInstallation=")))
+        open(os.path.join(cmd[cmd.index("--outdir") + 1], "a.pdf"), "wb").close()
+
+    monkeypatch.setattr(converter, "run_tool", fake_run_tool)
+    for _ in range(2):
+        converter.convert_docx_to_pdf_subprocess(str(tmp_path / "a.docx"), str(tmp_path))
+    assert len(set(profiles)) == 2
+    # Throwaway profiles are removed with the call
+    assert not any(os.path.exists(p.split("file://", 1)[1]) for p in profiles)
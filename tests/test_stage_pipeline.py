@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from backend.soc_report_gen import PipelineError, Stage, run_stages
+
+
+def test_independent_stages_run_concurrently():
+    start = time.perf_counter()
+    results = run_stages({
+        "pdf": Stage(lambda: time.sleep(0.3) or "out.pdf"),
+        "docx": Stage(lambda: time.sleep(0.3) or "out.docx"),
+    })
+    assert results == {"pdf": "out.pdf", "docx": "out.docx"}
+    assert time.perf_counter() - start < 0.55
+
+
+def test_dependency_results_are_passed_in_order():
+    results = run_stages({
+        "docx": Stage(lambda: "Part_I_II.docx"),
+        "pdf": Stage(lambda docx: docx.replace(".docx", ".pdf"), deps=("docx",)),
+    })
+    assert results["pdf"] == "Part_I_II.pdf"
+
+
+def test_errors_are_aggregated_and_dependents_skipped():
+    def fail(message):
+        raise RuntimeError(message)
+
+    with pytest.raises(PipelineError) as excinfo:
+        run_stages({
+            "docx": Stage(lambda: fail("python-docx failed")),
+            "pdf": Stage(lambda docx: docx, deps=("docx",)),
+            "latex": Stage(lambda: fail("xelatex failed")),
+            "ok": Stage(lambda: "fine"),
+        })
+    assert set(excinfo.value.errors) == {"docx", "latex"}
+    assert excinfo.value.skipped == ("pdf",)
+
+
+def test_stage_timeout():
+    with pytest.raises(PipelineError) as excinfo:
+        run_stages({"slow": Stage(lambda: time.sleep(2), timeout=0.1)})
+    assert isinstance(excinfo.value.errors["slow"], TimeoutError)
+
+
+def test_dependency_cycle_is_rejected():
+    with pytest.raises(ValueError):
+        run_stages({"a": Stage(lambda b: b, deps=("b",)), "b": Stage(lambda a: a, deps=("a",))})
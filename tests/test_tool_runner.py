@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from backend.utils import tool_runner
+from backend.utils.tool_runner import ToolPolicy, run_subprocess, run_tool
+from backend.utils.tracing import start_trace, trace_stage
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(tool_runner, "RETRY_BACKOFF_SECONDS", 0)
+
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+
+def test_timeout_kills_the_whole_process_group(tmp_path):
+    pid_file = tmp_path / "grandchild.pid"
+    code = ("import subprocess, sys, time;"
+            "p = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']);"
+            f"open({str(pid_file)!r}, 'w').write(str(p.pid));"
+            "time.sleep(60)")
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_tool(python(code), policy=ToolPolicy(timeout=1, memory_mb=0, retries=0))
+    assert time.monotonic() - start < 10
+
+    grandchild = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            os.kill(grandchild, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("grandchild survived the timeout")
+
+
+def test_signal_deaths_are_retried(tmp_path):
+    marker = tmp_path / "attempted"
+    # Killed by SIGKILL on the first run, succeeds on the second
+    code = ("import os, signal, sys;"
+            f"m = {str(marker)!r};"
+            "first = not os.path.exists(m); open(m, 'w').close();"
+            "os.kill(os.getpid(), signal.SIGKILL) if first else print('ok')")
+    result = run_tool(python(code), policy=ToolPolicy(timeout=30, memory_mb=0, retries=1))
+    assert result.stdout.strip() == b"ok"
+
+
+def test_exit_codes_are_checked_but_not_retried(tmp_path):
+    log = tmp_path / "runs"
+    code = f"import sys; open({str(log)!r}, 'a').write('x'); sys.stderr.write('broken input'); sys.exit(3)"
+    with pytest.raises(subprocess.CalledProcessError) as exc:
+        run_tool(python(code), policy=ToolPolicy(timeout=30, memory_mb=0, retries=2))
+    assert exc.value.returncode == 3
+    assert exc.value.stderr == b"broken input"
+    assert log.read_text() == "x"
+
+    result = run_tool(python("import sys; sys.exit(1)"), check=False,
+                      policy=ToolPolicy(timeout=30, memory_mb=0, retries=0))
+    assert result.returncode == 1
+
+
+def test_tool_has_no_stdin():
+    result = run_tool(python("import sys; print(repr(sys.stdin.read()))"),
+                      policy=ToolPolicy(timeout=10, memory_mb=0, retries=0))
+    assert result.stdout.strip() == b"''"
+
+
+@pytest.mark.skipif(tool_runner.resource is None, reason="needs resource")
+def test_memory_limit_is_enforced():
+    # Set before exec, so even an allocation on the first line is limited
+    code = "b = bytearray(512 * 2**20)"
+    result = run_tool(python(code), check=False, policy=ToolPolicy(timeout=30, memory_mb=256, retries=0))
+    assert result.returncode != 0
+    assert b"MemoryError" in result.stderr
+
+
+def test_child_process_usage_is_charged_to_span():
+    with start_trace("t", chrome_trace_dir=None) as trace:
+        with trace_stage("child"):
+            # Allocate ~50 MB in the child so its peak RSS is clearly visible
+            result = run_subprocess([sys.executable, "-c", "b = bytearray(50 * 2**20); print('ok')"],
+                                    stdout=subprocess.PIPE, check=True)
+    assert result.stdout.strip() == b"ok"
+    (span,) = trace.summary()
+    assert span["child_peak_rss_kb"] > 50 * 1024
+    assert span["child_cpu_s"] > 0
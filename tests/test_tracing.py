@@ -0,0 +1,45 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.utils.tracing import start_trace, submit_with_context, trace_stage, traced
+
+
+def test_spans_nest_and_collect_into_trace(tmp_path):
+    @traced("inner")
+    def inner():
+        return 1
+
+    with start_trace("part_i_ii", chrome_trace_dir=str(tmp_path)) as trace:
+        with trace_stage("outer", input_bytes=10) as span:
+            inner()
+            span.set(output_bytes=20)
+
+    summary = trace.summary()
+    assert [s["stage"] for s in summary] == ["outer", "inner"]
+    assert summary[0]["input_bytes"] == 10 and summary[0]["output_bytes"] == 20
+    assert summary[1]["parent"] == "outer"
+    assert summary[0]["wall_s"] >= summary[1]["wall_s"]
+
+    chrome = json.loads(next(tmp_path.iterdir()).read_text())
+    assert {e["name"] for e in chrome["traceEvents"]} == {"outer", "inner"}
+    assert all(e["ph"] == "X" for e in chrome["traceEvents"])
+
+
+def test_spans_on_worker_threads_join_the_trace():
+    with start_trace("t", chrome_trace_dir=None) as trace:
+        with trace_stage("parent"), ThreadPoolExecutor(2) as executor:
+            futures = [submit_with_context(executor, traced(f"stage{n}")(lambda: None)) for n in range(2)]
+            for f in futures:
+                f.result()
+    summary = {s["stage"]: s for s in trace.summary()}
+    assert set(summary) == {"parent", "stage0", "stage1"}
+    assert summary["stage0"]["parent"] == "parent"
+
+
+def test_stage_emits_json_log(caplog):
+    with caplog.at_level(logging.INFO, logger="backend.trace"):
+        with trace_stage("pandoc", output_bytes=5):
+            pass
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["stage"] == "pandoc" and record["output_bytes"] == 5
@@ -0,0 +1,41 @@
+import io
+import os
+import tempfile
+
+import pytest
+
+from backend import soc_report_gen
+from backend.utils.output_cache import OutputCache
+
+
+@pytest.fixture
+def isolated_tmp(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(soc_report_gen, "output_cache", OutputCache(root=str(tmp_path / "cache"), max_bytes=0))
+    return tmp_path
+
+
+def test_part_iii_iv_reads_upload_in_memory(isolated_tmp, monkeypatch):
+    seen = []
+
+    def fake_output(ext):
+        def generate(chunks, output_base, *args):
+            seen.append(chunks)
+            with open(output_base + ext, "wb") as f:
+                f.write(b"out")
+            return output_base + ext
+        return generate
+
+    # The streamed workbook is never opened here, so any bytes will do
+    monkeypatch.setattr(soc_report_gen, "iter_control_chunks", lambda source: source)
+    monkeypatch.setattr(soc_report_gen, "generate_controls_pdf", fake_output(".pdf"))
+    monkeypatch.setattr(soc_report_gen, "generate_controls_docx", fake_output(".docx"))
+
+    upload = io.BytesIO(b"PK fake workbook")
+    output_base = soc_report_gen.generate_part_iii_iv(upload)
+
+    # Each stage gets its own in-memory stream; nothing but the outputs touches disk
+    assert all(isinstance(s, io.BytesIO) and s.getvalue() == b"PK fake workbook" for s in seen)
+    assert seen[0] is not seen[1]
+    assert sorted(os.listdir(isolated_tmp)) == sorted(os.path.basename(output_base) + ext for ext in (".docx", ".pdf"))
+    assert upload.tell() == 0